@@ -0,0 +1,12 @@
+import os
+import sys
+
+# ✅ 각 서비스 모듈을 컨테이너와 같은 방식(PYTHONPATH)으로 import 할 수 있도록 경로 추가
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for path in (
+    ROOT,
+    os.path.join(ROOT, "server-query"),
+    os.path.join(ROOT, "server-collect_data"),
+):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+
+from fetcher import fetch_ohlcv
+from indicators.calculate import calculate_indicators
+from benchmarks.conftest import BENCH_ROWS
+from benchmarks.synthetic import generate_ohlcv
+
+
+@pytest.mark.parametrize("n_rows", BENCH_ROWS, ids=lambda n: f"rows={n}")
+def test_calculate_indicators(benchmark, n_rows):
+    df = generate_ohlcv(n_rows)
+    result = benchmark(calculate_indicators, df)
+    assert len(result) == n_rows
+
+
+def test_save_to_db(benchmark, dataset, monkeypatch):
+    # 바이낸스 대신 마지막 캔들 이후 1000개를 합성해서 돌려준다
+    def fake_fetch(symbol, interval, limit=1000, start_time=None):
+        return generate_ohlcv(limit, interval, start=pd.Timestamp(start_time))
+
+    monkeypatch.setattr(fetch_ohlcv, "fetch_from_binance", fake_fetch)
+    benchmark.pedantic(fetch_ohlcv.save_to_db, args=("BTC", "15m"), rounds=3)
@@ -0,0 +1,67 @@
+
+import pytest
+
+import backtest_guard
+from backtest_kernel import load_series
+from filtered_func import (
+    calculate_statics,
+    run_conditional_lateral_backtest,
+    save_result_to_table,
+)
+from get_data import OHLCV_COLUMNS, get_data_from_table, stream_data_from_table
+
+STRATEGY = "rsi < 35"
+
+
+@pytest.fixture(autouse=True)
+def no_entry_limit(monkeypatch):
+    # 진입 수 제한 없이 쿼리 자체의 비용을 잰다
+    monkeypatch.setattr(backtest_guard, "MAX_ENTRIES", 10**9)
+
+
+@pytest.mark.parametrize("interval", ["15m", "1h"])
+def test_backtest(benchmark, dataset, interval):
+    df = benchmark.pedantic(
+        run_conditional_lateral_backtest,
+        args=("BTC", interval, STRATEGY, 2.0),
+        rounds=3,
+    )
+    assert not df.empty
+
+
+def test_calculate_statics(benchmark, dataset):
+    save_result_to_table(run_conditional_lateral_backtest("BTC", "15m", STRATEGY, 2.0))
+    stats = benchmark(calculate_statics)
+    assert stats["total_count"] > 0
+
+
+def test_get_data_from_table(benchmark, dataset):
+    rows = benchmark(get_data_from_table, "btc_15m", OHLCV_COLUMNS, "timestamp")
+    assert len(rows) > 0
+
+
+def test_stream_data_from_table(benchmark, dataset):
+    def consume():
+        return sum(
+            1 for _ in stream_data_from_table("btc_15m", OHLCV_COLUMNS, "timestamp")
+        )
+
+    assert benchmark(consume) > 0
+
+
+@pytest.fixture
+def hot_btc(dataset, hot_tables):
+    # btc_15m 을 공유 메모리 캐시(임시 디렉토리)에 적재한 상태
+    stats = hot_tables("btc_15m").warm_up()
+    assert stats["tables"]["btc_15m"]["rows"] == dataset
+    return dataset
+
+
+def test_get_data_from_table_hot(benchmark, hot_btc):
+    rows = benchmark(get_data_from_table, "btc_15m", OHLCV_COLUMNS, "timestamp")
+    assert len(rows) == hot_btc
+
+
+def test_load_series_hot(benchmark, hot_btc):
+    series = benchmark(load_series, "btc_15m", ("rsi",))
+    assert series["close"].size == hot_btc
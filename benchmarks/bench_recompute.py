@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+from shared.connect_db import engine
+from fetcher.recompute_indicators import (
+    INDICATOR_COLUMNS,
+    TABLE_COLUMNS,
+    chunk_rows_for,
+    recompute_all,
+    recompute_chunks,
+    recompute_table,
+)
+from indicators.calculate import calculate_indicators
+from benchmarks.conftest import BENCH_ROWS
+from benchmarks.synthetic import generate_ohlcv
+
+
+@pytest.mark.parametrize("n_rows", BENCH_ROWS, ids=lambda n: f"rows={n}")
+def test_recompute_chunks(benchmark, n_rows):
+    # 겹치는 구간을 붙여 청크별로 계산해도 전체를 한 번에 계산한 것과 같아야 한다
+    df = generate_ohlcv(n_rows)
+    chunks = [df.iloc[i : i + 3000] for i in range(0, n_rows, 3000)]
+
+    def run():
+        return pd.concat(list(recompute_chunks(chunks, overlap=2000)), ignore_index=True)
+
+    result = benchmark(run)
+    expected = calculate_indicators(df)
+    np.testing.assert_allclose(
+        result[INDICATOR_COLUMNS].to_numpy(),
+        expected[INDICATOR_COLUMNS].to_numpy(),
+        rtol=1e-9,
+        atol=1e-9,
+    )
+
+
+def test_chunk_rows_for():
+    assert chunk_rows_for(memory_mb=512, workers=4, overlap=2000) == 128 * 1024 - 2000
+    with pytest.raises(ValueError):
+        chunk_rows_for(memory_mb=1, workers=4, overlap=2000)
+
+
+def read_table(table_name):
+    with engine.connect() as conn:
+        return pd.read_sql(
+            text(f'SELECT * FROM "{table_name}" ORDER BY timestamp'), conn
+        )
+
+
+def test_recompute_table(benchmark, dataset):
+    # 수집기의 짧은 창 계산처럼 최근 구간의 지표가 어긋난 상태를 만들고 전체 재계산으로 교체
+    with engine.begin() as conn:
+        conn.execute(text("""
+            UPDATE "btc_15m" SET ema_99 = ema_99 + 1, rsi = NULL
+            WHERE timestamp >= (
+                SELECT timestamp FROM "btc_15m" ORDER BY timestamp DESC OFFSET 99 LIMIT 1
+            )
+        """))
+        conn.execute(text('CREATE INDEX IF NOT EXISTS "btc_15m_close_bench" ON "btc_15m" (close)'))
+
+    report = benchmark.pedantic(
+        recompute_table, args=("BTC", "15m", 4000), rounds=1
+    )
+    assert report["swapped"] and report["rows"] == dataset
+    assert report["columns"]["ema_99"]["max_abs_diff"] == pytest.approx(1, abs=0.01)
+    assert report["columns"]["rsi"]["null_mismatch"] == 100
+    # 적재 때는 float64 가격으로 계산했으므로 REAL 로 저장된 가격에서 다시 계산한 만큼의 차이만 있다
+    assert report["columns"]["ema_7"]["max_abs_diff"] < 0.01
+
+    stored = read_table("btc_15m")
+    expected = calculate_indicators(stored[TABLE_COLUMNS[:6]])
+    np.testing.assert_allclose(
+        stored[INDICATOR_COLUMNS].to_numpy(dtype="float64"),
+        expected[INDICATOR_COLUMNS].to_numpy(),
+        rtol=1e-6,
+    )
+    with engine.connect() as conn:
+        indexes = conn.execute(text("""
+            SELECT indexname FROM pg_indexes WHERE tablename = 'btc_15m' ORDER BY indexname
+        """)).scalars().all()
+        shadow = conn.execute(text("SELECT to_regclass('btc_15m__recompute')")).scalar()
+    assert indexes == ["btc_15m_close_bench", "btc_15m_pkey"]
+    assert shadow is None
+
+    # 두 테이블을 프로세스 풀에서 확인만 -> 어긋난 값이 남아 있지 않다
+    # (청크 경계가 다르면 REAL 반올림이 1ulp 바뀌는 정도는 허용)
+    results = recompute_all([("BTC", "15m"), ("BTC", "1h")], workers=2, dry_run=True)
+    assert [r["table"] for r in results] == ["btc_15m", "btc_1h"]
+    assert not any(r["swapped"] for r in results)
+    for result in results:
+        for drift in result["columns"].values():
+            assert drift["max_abs_diff"] < 0.01 and drift["null_mismatch"] == 0
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fetcher import agg_trades
+from fetcher.trade_aggregate import trades_to_candles, volume_at_price
+from fetcher.trade_store import PRICE_SCALE, QTY_SCALE, TradeStore
+from benchmarks.replay_server import (
+    KlineStore,
+    ReplayState,
+    TradeTape,
+    VirtualClock,
+    serve_in_thread,
+)
+from benchmarks.synthetic import generate_agg_trades
+
+START = pd.Timestamp("2024-01-01 20:00", tz="UTC")
+START_MS = int(START.value // 1_000_000)
+TRADE_ROWS = [100_000, 1_000_000]
+
+
+def scaled_trades(n_trades: int, seed: int = 0) -> dict[str, np.ndarray]:
+    raw = generate_agg_trades(n_trades, START_MS, seed=seed)
+    return {
+        **raw,
+        "price": np.rint(raw["price"] * PRICE_SCALE).astype("int64"),
+        "qty": np.rint(raw["qty"] * QTY_SCALE).astype("int64"),
+    }
+
+
+@pytest.mark.parametrize("n_trades", TRADE_ROWS, ids=lambda n: f"trades={n}")
+def test_trades_to_candles(benchmark, n_trades):
+    trades = scaled_trades(n_trades)
+    candles = benchmark(trades_to_candles, trades, "15m")
+
+    expected = (
+        pd.DataFrame(
+            {
+                "price": trades["price"] / PRICE_SCALE,
+                "qty": trades["qty"] / QTY_SCALE,
+            },
+            index=pd.to_datetime(trades["time"], unit="ms", utc=True),
+        )
+        .resample("15min")
+        .agg({"price": ["first", "max", "min", "last"], "qty": "sum"})
+        .dropna()
+    )
+    assert len(candles) == len(expected)
+    np.testing.assert_allclose(
+        candles[["open", "high", "low", "close", "volume"]].to_numpy(),
+        expected.to_numpy(),
+    )
+    assert candles["trades"].sum() == n_trades
+
+
+@pytest.mark.parametrize("n_trades", TRADE_ROWS, ids=lambda n: f"trades={n}")
+def test_volume_at_price(benchmark, n_trades):
+    trades = scaled_trades(n_trades)
+    profile = benchmark(volume_at_price, trades, 10.0)
+    assert profile["price"].is_monotonic_increasing
+    assert profile["volume"].sum() == pytest.approx(trades["qty"].sum() / QTY_SCALE)
+    np.testing.assert_allclose(
+        profile["buy_volume"] + profile["sell_volume"], profile["volume"]
+    )
+
+
+def test_trade_store_read(benchmark, tmp_path):
+    # 20시부터 36시간 (60건/분) 나눠서 추가 -> 3일치 part, 지난 2일은 하나로 합친다
+    trades = scaled_trades(60 * 60 * 36)
+    store = TradeStore(str(tmp_path))
+    for chunk in np.array_split(np.arange(trades["id"].size), 20):
+        store.append("BTC", {name: col[chunk] for name, col in trades.items()})
+    assert store.append("BTC", trades) == 0
+    assert store.last_id("BTC") == trades["id"][-1]
+    assert store.compact_closed_days("BTC") == 2
+    assert [len(store.index("BTC", day)) > 1 for day in store.days("BTC")] == [
+        False,
+        False,
+        True,
+    ]
+
+    start, end = START_MS + 3 * 3_600_000, START_MS + 6 * 3_600_000
+    window = benchmark(store.read, "BTC", start, end)
+    lo, hi = np.searchsorted(trades["time"], [start, end])
+    for name, col in trades.items():
+        np.testing.assert_array_equal(window[name], col[lo:hi])
+
+
+def test_collect_agg_trades(benchmark, tmp_path, monkeypatch):
+    # 재생 서버의 합성 체결을 fromId 로 끝까지 수집 (처음에는 1시간 전부터)
+    tape = TradeTape.synthetic(
+        START - pd.Timedelta(hours=2), START + pd.Timedelta(hours=1), ("BTC",)
+    )
+    clock = VirtualClock(START, speed=0)
+    server = serve_in_thread(ReplayState(KlineStore(), clock, trades=tape))
+    monkeypatch.setattr(
+        agg_trades,
+        "AGG_TRADES_URL",
+        f"http://127.0.0.1:{server.server_port}/api/v3/aggTrades",
+    )
+    store = TradeStore(str(tmp_path))
+    try:
+        saved = benchmark.pedantic(
+            agg_trades.collect_agg_trades,
+            args=("BTC", store),
+            kwargs={"start_time": START_MS - 3_600_000},
+            rounds=1,
+        )
+    finally:
+        server.shutdown()
+
+    times = tape.tapes["BTCUSDT"]["time"]
+    first = np.searchsorted(times, START_MS - 3_600_000)
+    last = np.searchsorted(times, clock.now_ms(), side="right")
+    assert saved == last - first
+    stored = store.read("BTC", 0, clock.now_ms() + 1)
+    np.testing.assert_array_equal(stored["id"], np.arange(first, last))
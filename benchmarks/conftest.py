@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+from shared.connect_db import POSTGRES_DB
+from benchmarks.loader import load_dataset
+from testing.query_fixtures import hot_tables  # noqa: F401
+
+# 15m 기준 행 수 (쉼표로 여러 크기 지정, 예: BENCH_ROWS=10000,1000000)
+BENCH_ROWS = [int(n) for n in os.getenv("BENCH_ROWS", "10000,100000").split(",")]
+
+
+@pytest.fixture(scope="session")
+def bench_db():
+    # 벤치마크는 BTC 테이블을 덮어쓰므로 명시적으로 지정한 DB 에서만 실행
+    if os.getenv("BENCH_DATABASE") != POSTGRES_DB:
+        pytest.skip(
+            "BENCH_DATABASE 가 .env 의 POSTGRES_DB 와 같을 때만 DB 벤치마크 실행"
+        )
+
+
+@pytest.fixture(scope="session", params=BENCH_ROWS, ids=lambda n: f"rows={n}")
+def dataset(request, bench_db):
+    load_dataset(request.param, symbols=("BTC",), intervals=("15m", "1h"))
+    return request.param
@@ -0,0 +1,128 @@
+import argparse
+import io
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from shared.connect_db import engine
+from shared.symbols_intervals import BASE_INTERVAL, INTERVALS, SYMBOLS
+from fetcher.catalog import CATALOG_TABLE, ensure_catalog_table, update_catalog
+from fetcher.fetch_ohlcv import create_dynamic_table
+from indicators.calculate import calculate_indicators
+from benchmarks.synthetic import generate_ohlcv, resample_ohlcv
+
+COPY_CHUNK_ROWS = 500_000
+
+TABLE_COLUMNS = [
+    "timestamp",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "rsi",
+    "rsi_signal",
+    "ema_7",
+    "ema_25",
+    "ema_99",
+    "macd",
+    "macd_signal",
+    "boll_ma",
+    "boll_upper",
+    "boll_lower",
+    "volume_ma_20",
+]
+
+
+def copy_frame(table_name: str, df: pd.DataFrame):
+    # INSERT 대신 COPY 로 적재 (청크 단위로 CSV 변환)
+    cols = ", ".join(f'"{c}"' for c in TABLE_COLUMNS)
+    sql = f"COPY \"{table_name}\" ({cols}) FROM STDIN WITH (FORMAT csv, NULL '')"
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            for start in range(0, len(df), COPY_CHUNK_ROWS):
+                buf = io.StringIO()
+                df.iloc[start : start + COPY_CHUNK_ROWS].to_csv(
+                    buf,
+                    columns=TABLE_COLUMNS,
+                    header=False,
+                    index=False,
+                    date_format="%Y-%m-%d %H:%M:%S+00:00",
+                )
+                buf.seek(0)
+                cur.copy_expert(sql, buf)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def load_table(symbol: str, interval: str, df: pd.DataFrame, indicators: bool = True):
+    # 기존 테이블을 지우고 수집기와 같은 스키마로 다시 만든다
+    table_name = f"{symbol}_{interval}".lower()
+    df = calculate_indicators(df) if indicators else df.reindex(columns=TABLE_COLUMNS)
+
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP TABLE IF EXISTS "{table_name}"'))
+    create_dynamic_table(symbol, interval)
+    copy_frame(table_name, df)
+
+    with engine.begin() as conn:
+        conn.execute(text(f'ANALYZE "{table_name}"'))
+        # 카탈로그 행을 지우면 update_catalog 가 전체 스캔으로 다시 채운다
+        ensure_catalog_table(conn)
+        conn.execute(
+            text(f"""
+            DELETE FROM {CATALOG_TABLE} WHERE symbol = :symbol AND interval = :interval
+        """),
+            {"symbol": symbol.upper(), "interval": interval},
+        )
+        update_catalog(conn, symbol, interval, df[["timestamp"]])
+    return table_name
+
+
+def load_dataset(
+    n_rows: int,
+    symbols=("BTC",),
+    intervals=INTERVALS,
+    indicators: bool = True,
+    seed: int = 0,
+) -> dict[str, int]:
+    # 기준 간격(15m)에 n_rows 를 만들고 상위 간격은 이를 묶어서 만든다
+    loaded = {}
+    for i, symbol in enumerate(symbols):
+        base = generate_ohlcv(n_rows, BASE_INTERVAL, seed=seed + i)
+        for interval in intervals:
+            df = base if interval == BASE_INTERVAL else resample_ohlcv(base, interval)
+            table_name = load_table(symbol, interval, df, indicators)
+            loaded[table_name] = len(df)
+    return loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="합성 OHLCV 데이터를 DB 에 적재 (기존 테이블 덮어씀)"
+    )
+    parser.add_argument(
+        "--rows", type=int, default=100_000, help="15m 기준 행 수 (10^4 ~ 10^7)"
+    )
+    parser.add_argument("--symbols", nargs="+", default=["BTC"], choices=SYMBOLS)
+    parser.add_argument("--intervals", nargs="+", default=INTERVALS, choices=INTERVALS)
+    parser.add_argument(
+        "--no-indicators", action="store_true", help="지표 컬럼은 비워둔다"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    loaded = load_dataset(
+        args.rows, args.symbols, args.intervals, not args.no_indicators, args.seed
+    )
+    for table_name, rows in loaded.items():
+        print(f"{table_name}: {rows} rows")
+    print(f"✅ 적재 완료 ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
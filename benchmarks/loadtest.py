@@ -0,0 +1,355 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+from shared.symbols_intervals import INTERVALS, SYMBOLS
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Streamlit 페이지별 요청 흐름과 기본 비율
+DEFAULT_WEIGHTS = {"chart": 5, "time_range": 3, "stats": 3, "backtest": 0.5}
+CHART_INDICATORS = ["ema_7", "ema_25", "ema_99", "rsi", "macd", "boll"]
+BACKTEST_STRATEGIES = ["rsi < 30", "rsi < 35 and close > ema_99", "macd > macd_signal"]
+
+
+class Recorder:
+    # 엔드포인트(라우트 템플릿)별 지연 시간/오류 기록
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def request(self, client, label, method, url, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            await response.aread()
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        self.latencies[label].append(time.perf_counter() - started)
+        self.statuses[label][status] += 1
+        if response is None or response.status_code >= 500:
+            self.errors[label] += 1
+        return response
+
+
+class Scenarios:
+    def __init__(self, recorder: Recorder, symbols, intervals, rng: random.Random):
+        self.rec = recorder
+        self.symbols = symbols
+        self.intervals = intervals
+        self.rng = rng
+
+    def pair(self):
+        return self.rng.choice(self.symbols), self.rng.choice(self.intervals)
+
+    async def chart(self, client):
+        # pages/chart.py: 전략 목록 -> 사용 지표 -> 전체 캔들 -> 지표별 구간 데이터
+        res = await self.rec.request(
+            client, "/filtered-ohlcv", "GET", "/filtered-ohlcv"
+        )
+        trades = res.json() if res is not None and res.status_code == 200 else []
+        if trades:
+            trade = self.rng.choice(trades)
+            symbol, interval = trade["symbol"], trade["interval"]
+            entry_time, exit_time = trade["entry_time"], trade["exit_time"]
+            await self.rec.request(
+                client,
+                "/filtered-indicators",
+                "GET",
+                "/filtered-indicators",
+                params={"entry_time": entry_time, "exit_time": exit_time},
+            )
+        else:
+            symbol, interval = self.pair()
+            entry_time = exit_time = None
+
+        res = await self.rec.request(
+            client, "/ohlcv/{symbol}/{interval}", "GET", f"/ohlcv/{symbol}/{interval}"
+        )
+        rows = res.json() if res is not None and res.status_code == 200 else []
+        if not rows:
+            return
+        if entry_time is None:
+            window = rows[self.rng.randrange(len(rows)) :][:40]
+            entry_time, exit_time = window[0]["timestamp"], window[-1]["timestamp"]
+        for indicator in self.rng.sample(CHART_INDICATORS, 2):
+            await self.rec.request(
+                client,
+                "/indicator-data",
+                "GET",
+                "/indicator-data",
+                params={
+                    "symbol": symbol,
+                    "interval": interval,
+                    "indicator": indicator,
+                    "entry_time": entry_time,
+                    "exit_time": exit_time,
+                },
+            )
+
+    async def time_range(self, client):
+        # pages/backtest.py: 카탈로그 + 선택한 코인/간격의 기간
+        await self.rec.request(client, "/catalog", "GET", "/catalog")
+        symbol, interval = self.pair()
+        await self.rec.request(
+            client,
+            "/time-range",
+            "GET",
+            "/time-range",
+            params={"symbol": symbol, "interval": interval},
+        )
+
+    async def stats(self, client):
+        # pages/profit_chart.py
+        for path in (
+            "/filtered-time-range",
+            "/filtered-profit-rate",
+            "/filtered-tp-sl-rate",
+        ):
+            await self.rec.request(client, path, "GET", path)
+
+    async def backtest(self, client):
+        symbol, interval = self.pair()
+        await self.rec.request(
+            client,
+            "/save_strategy",
+            "POST",
+            "/save_strategy",
+            json={
+                "symbol": symbol,
+                "interval": interval,
+                "strategy_sql": self.rng.choice(BACKTEST_STRATEGIES),
+                "risk_reward_ratio": self.rng.choice([1.0, 2.0, 3.0]),
+            },
+        )
+
+
+async def _user(
+    client, scenarios: Scenarios, weights: dict, deadline: float, think_time: float
+):
+    names, probs = list(weights), list(weights.values())
+    while time.perf_counter() < deadline:
+        name = scenarios.rng.choices(names, probs)[0]
+        await getattr(scenarios, name)(client)
+        if think_time:
+            await asyncio.sleep(scenarios.rng.expovariate(1 / think_time))
+
+
+async def run_load(
+    base_url: str,
+    concurrency: int,
+    duration: float,
+    weights: dict,
+    symbols=SYMBOLS,
+    intervals=INTERVALS,
+    think_time: float = 0.0,
+    timeout: float = 60.0,
+    seed: int = 0,
+) -> dict:
+    recorder = Recorder()
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, limits=limits
+    ) as client:
+        started = time.perf_counter()
+        deadline = started + duration
+        await asyncio.gather(
+            *(
+                _user(
+                    client,
+                    Scenarios(recorder, symbols, intervals, random.Random(seed + i)),
+                    weights,
+                    deadline,
+                    think_time,
+                )
+                for i in range(concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - started
+    return summarize(recorder, elapsed, concurrency)
+
+
+def _percentiles(values) -> dict:
+    ms = np.asarray(values, dtype="float64") * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "max_ms": ms.max()}
+
+
+def summarize(recorder: Recorder, elapsed: float, concurrency: int) -> dict:
+    endpoints = {}
+    for label, values in sorted(recorder.latencies.items()):
+        endpoints[label] = {
+            "requests": len(values),
+            "errors": recorder.errors[label],
+            "rps": len(values) / elapsed,
+            **_percentiles(values),
+            "statuses": {str(k): v for k, v in recorder.statuses[label].items()},
+        }
+    all_values = [v for values in recorder.latencies.values() for v in values]
+    total = {
+        "requests": len(all_values),
+        "errors": sum(recorder.errors.values()),
+        "rps": len(all_values) / elapsed,
+        **(_percentiles(all_values) if all_values else {}),
+    }
+    return {
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "total": total,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(result: dict):
+    print(f"\n== concurrency={result['concurrency']} ({result['elapsed_s']:.1f}s) ==")
+    header = f"{'endpoint':<28}{'req':>8}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+    print(header)
+    print("-" * len(header))
+    rows = list(result["endpoints"].items()) + [("TOTAL", result["total"])]
+    for label, s in rows:
+        if not s["requests"]:
+            continue
+        print(
+            f"{label:<28}{s['requests']:>8}{s['errors']:>6}{s['rps']:>9.1f}"
+            f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['max_ms']:>9.1f}"
+        )
+
+
+def parse_weights(value: str) -> dict:
+    # "chart=5,stats=3,backtest=0" -> 기본값에 덮어쓰기
+    weights = dict(DEFAULT_WEIGHTS)
+    for item in filter(None, value.split(",")):
+        name, weight = item.split("=")
+        if name not in DEFAULT_WEIGHTS:
+            raise argparse.ArgumentTypeError(f"unknown scenario: {name}")
+        weights[name] = float(weight)
+    return {k: v for k, v in weights.items() if v > 0}
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    # 로컬 uvicorn 으로 query 서버 실행 (컨테이너와 같은 PYTHONPATH)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([ROOT, os.path.join(ROOT, "server-query")])
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main_query:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=os.path.join(ROOT, "server-query"),
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            if (
+                httpx.get(f"http://127.0.0.1:{port}/catalog", timeout=1).status_code
+                < 500
+            ):
+                return proc
+        except httpx.HTTPError:
+            pass
+        if proc.poll() is not None:
+            break
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn 서버를 시작하지 못했습니다.")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="query 서버 부하 테스트 (Streamlit 트래픽 재현)"
+    )
+    parser.add_argument("--base-url", default="http://localhost:8082")
+    parser.add_argument(
+        "--concurrency",
+        default="8",
+        help="동시 사용자 수, 쉼표로 여러 단계 (예: 1,8,32)",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=30.0, help="단계별 실행 시간(초)"
+    )
+    parser.add_argument(
+        "--weights",
+        type=parse_weights,
+        default=dict(DEFAULT_WEIGHTS),
+        help="시나리오 비율 (예: chart=5,time_range=3,stats=3,backtest=0.5)",
+    )
+    parser.add_argument("--symbols", nargs="+", default=SYMBOLS, choices=SYMBOLS)
+    parser.add_argument("--intervals", nargs="+", default=INTERVALS, choices=INTERVALS)
+    parser.add_argument(
+        "--think-time", type=float, default=0.0, help="요청 흐름 사이 평균 대기(초)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--serve", action="store_true", help="로컬 uvicorn 을 띄워서 측정"
+    )
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if args.serve:
+        server = start_server(args.port, args.workers)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    results = []
+    try:
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            result = asyncio.run(
+                run_load(
+                    base_url,
+                    concurrency,
+                    args.duration,
+                    args.weights,
+                    args.symbols,
+                    args.intervals,
+                    args.think_time,
+                    seed=args.seed,
+                )
+            )
+            print_report(result)
+            results.append(result)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "base_url": base_url,
+                    "weights": args.weights,
+                    "workers": args.workers,
+                    "runs": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
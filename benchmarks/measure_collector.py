@@ -0,0 +1,158 @@
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+from sqlalchemy import text
+
+from shared.connect_db import POSTGRES_DB, engine
+from shared.symbols_intervals import INTERVAL_MINUTES, INTERVALS, SYMBOLS
+from benchmarks.replay_server import (
+    KlineStore,
+    ReplayState,
+    VirtualClock,
+    serve_in_thread,
+)
+
+
+def _reset_tables(pairs):
+    with engine.begin() as conn:
+        has_catalog = conn.execute(
+            text("SELECT to_regclass('dataset_catalog') IS NOT NULL")
+        ).scalar()
+        for symbol, interval in pairs:
+            conn.execute(text(f'DROP TABLE IF EXISTS "{symbol}_{interval}"'.lower()))
+            if has_catalog:
+                conn.execute(
+                    text(
+                        "DELETE FROM dataset_catalog WHERE symbol = :s AND interval = :i"
+                    ),
+                    {"s": symbol, "i": interval},
+                )
+
+
+def latest_ms(symbol: str, interval: str) -> int | None:
+    with engine.connect() as conn:
+        exists = conn.execute(
+            text("SELECT to_regclass(:t) IS NOT NULL"),
+            {"t": f"{symbol}_{interval}".lower()},
+        ).scalar()
+        if not exists:
+            return None
+        latest = conn.execute(
+            text(f'SELECT MAX(timestamp) FROM "{symbol}_{interval}"'.lower())
+        ).scalar()
+    return None if latest is None else int(pd.Timestamp(latest).value // 1_000_000)
+
+
+def _row_count(symbol: str, interval: str) -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            text(f'SELECT COUNT(*) FROM "{symbol}_{interval}"'.lower())
+        ).scalar()
+
+
+def measure(args) -> dict:
+    pairs = [(s, i) for s in args.symbols for i in args.intervals]
+    start = pd.Timestamp.now(tz="UTC").floor("1min")
+    store = KlineStore.synthetic(
+        start + pd.Timedelta(days=args.horizon_days),
+        start - pd.Timedelta(days=args.history_days),
+        args.symbols,
+    )
+    clock = VirtualClock(start, args.speed)
+    state = ReplayState(
+        store, clock, args.weight_limit, args.fail_rate, args.retry_after
+    )
+    server = serve_in_thread(state)
+
+    # fetcher 를 import 하기 전에 재생 서버 주소를 지정
+    os.environ["BINANCE_API_URL"] = f"http://127.0.0.1:{server.server_port}"
+    from fetcher.fetch_ohlcv import save_to_db
+
+    _reset_tables(pairs)
+    caught_up = {}
+    lags = []
+    rounds = 0
+    started = time.perf_counter()
+    deadline = started + args.timeout
+    # main_fetch.main_loop 와 같은 순서로 돌되 대기 없이 따라잡을 때까지 반복
+    while time.perf_counter() < deadline:
+        rounds += 1
+        for symbol, interval in pairs:
+            try:
+                save_to_db(symbol, interval)
+            except Exception as e:
+                print(f"{symbol}_{interval} 저장 중 오류 발생: {e}")
+                continue
+            # 현재 진행 중인 캔들 기준으로 몇 개 뒤처져 있는지
+            step_ms = INTERVAL_MINUTES[interval] * 60_000
+            behind = (
+                clock.now_ms() // step_ms * step_ms - (latest_ms(symbol, interval) or 0)
+            ) // step_ms
+            if (symbol, interval) not in caught_up and behind <= 1:
+                caught_up[(symbol, interval)] = time.perf_counter() - started
+            if len(caught_up) == len(pairs):
+                lags.append(behind)
+        if (
+            len(caught_up) == len(pairs)
+            and time.perf_counter() - started >= max(caught_up.values()) + args.follow
+        ):
+            break
+
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    rows = sum(_row_count(s, i) for s, i in pairs)
+    return {
+        "speed": args.speed,
+        "history_days": args.history_days,
+        "pairs": [f"{s}_{i}" for s, i in pairs],
+        "elapsed_s": elapsed,
+        "rounds": rounds,
+        "rows": rows,
+        "rows_per_s": rows / elapsed,
+        "catch_up_s": {f"{s}_{i}": t for (s, i), t in caught_up.items()},
+        "all_caught_up": len(caught_up) == len(pairs),
+        "follow_candles_behind": {
+            "mean": sum(lags) / len(lags) if lags else None,
+            "max": max(lags) if lags else None,
+        },
+        "replay": state.stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="재생 서버로 수집기 처리량/따라잡기 시간/요청 제한 동작 측정"
+    )
+    parser.add_argument("--symbols", nargs="+", default=["BTC"], choices=SYMBOLS)
+    parser.add_argument("--intervals", nargs="+", default=INTERVALS, choices=INTERVALS)
+    parser.add_argument(
+        "--history-days", type=float, default=30, help="따라잡아야 할 과거 기간"
+    )
+    parser.add_argument("--horizon-days", type=float, default=30)
+    parser.add_argument("--speed", type=float, default=1000)
+    parser.add_argument(
+        "--follow", type=float, default=10, help="따라잡은 뒤 추가로 관찰할 시간(초)"
+    )
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--weight-limit", type=int, default=6000)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    # 테이블을 지우고 다시 수집하므로 명시적으로 지정한 DB 에서만 실행
+    if os.getenv("BENCH_DATABASE") != POSTGRES_DB:
+        parser.error("BENCH_DATABASE 가 .env 의 POSTGRES_DB 와 같을 때만 실행합니다.")
+
+    result = measure(args)
+    print(json.dumps(result, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,492 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from shared.symbols_intervals import BASE_INTERVAL, INTERVAL_MINUTES, INTERVALS, SYMBOLS
+from benchmarks.synthetic import generate_agg_trades, generate_ohlcv, resample_ohlcv
+
+# 바이낸스 /api/v3/klines 와 같은 규칙
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+WEIGHT_LIMIT_1M = 6000
+# /api/v3/aggTrades: limit 최대 1000, startTime~endTime 은 1시간 이내
+AGG_TRADES_WEIGHT = 2
+AGG_TRADES_MAX_SPAN_MS = 3_600_000
+# 바이낸스 상장 시점 (합성 데이터 시작 시각)
+LISTING = {
+    "BTC": "2017-08-17",
+    "ETH": "2017-08-17",
+    "XRP": "2018-05-04",
+    "SOL": "2020-08-11",
+}
+
+
+def kline_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class VirtualClock:
+    # start 시점부터 speed 배속으로 흐르는 시계 (speed=1000 이면 15m 캔들이 0.9초마다 생성)
+    def __init__(self, start: pd.Timestamp, speed: float = 1.0):
+        self.start_ms = int(start.value // 1_000_000)
+        self.speed = speed
+        self.started = time.monotonic()
+
+    def now_ms(self) -> int:
+        return self.start_ms + int(
+            (time.monotonic() - self.started) * 1000 * self.speed
+        )
+
+
+class WeightLimiter:
+    # 실제 시간 1분 단위 가중치 합 (X-MBX-USED-WEIGHT-1M)
+    def __init__(self, limit: int = WEIGHT_LIMIT_1M):
+        self.limit = limit
+        self.window = None
+        self.used = 0
+
+    def consume(self, weight: int) -> tuple[bool, int, float]:
+        now = time.time()
+        window = int(now // 60)
+        if window != self.window:
+            self.window, self.used = window, 0
+        self.used += weight
+        return self.used <= self.limit, self.used, 60 - now % 60
+
+
+class KlineStore:
+    def __init__(self):
+        self.frames: dict[tuple[str, str], dict[str, np.ndarray]] = {}
+
+    def add(self, symbol: str, interval: str, df: pd.DataFrame):
+        open_time = pd.to_datetime(df["timestamp"], utc=True).dt.tz_convert(None)
+        self.frames[(f"{symbol.upper()}USDT", interval)] = {
+            "open_time": open_time.to_numpy("datetime64[ms]").astype("int64"),
+            **{
+                c: df[c].to_numpy("float64")
+                for c in ("open", "high", "low", "close", "volume")
+            },
+        }
+
+    @classmethod
+    def synthetic(
+        cls,
+        end: pd.Timestamp,
+        start: pd.Timestamp | None = None,
+        symbols=SYMBOLS,
+        seed: int = 0,
+    ):
+        # 15m 를 만들고 상위 간격은 묶어서 만든다 (start 가 없으면 상장 시점부터)
+        store = cls()
+        for i, symbol in enumerate(symbols):
+            first = pd.Timestamp(LISTING[symbol], tz="UTC")
+            if start is not None:
+                first = max(first, start.floor("1D"))
+            step = pd.Timedelta(minutes=INTERVAL_MINUTES[BASE_INTERVAL])
+            n_rows = int((end - first) / step) + 1
+            base = generate_ohlcv(n_rows, BASE_INTERVAL, start=first, seed=seed + i)
+            for interval in INTERVALS:
+                store.add(
+                    symbol,
+                    interval,
+                    (
+                        base
+                        if interval == BASE_INTERVAL
+                        else resample_ohlcv(base, interval)
+                    ),
+                )
+        return store
+
+    @classmethod
+    def recorded(cls, data_dir: str):
+        # data.binance.vision 형식 CSV: {SYMBOL}USDT-{interval}.csv (헤더 없음, 시간은 ms)
+        store = cls()
+        for name in sorted(os.listdir(data_dir)):
+            stem, ext = os.path.splitext(name)
+            if ext != ".csv" or "-" not in stem:
+                continue
+            pair, interval = stem.split("-", 1)
+            raw = pd.read_csv(
+                os.path.join(data_dir, name), header=None, usecols=range(6)
+            )
+            raw.columns = ["open_time", "open", "high", "low", "close", "volume"]
+            raw["timestamp"] = pd.to_datetime(raw["open_time"], unit="ms", utc=True)
+            store.add(pair.removesuffix("USDT"), interval, raw)
+        return store
+
+    def klines(
+        self,
+        pair: str,
+        interval: str,
+        now_ms: int,
+        limit: int,
+        start_ms=None,
+        end_ms=None,
+    ) -> list:
+        data = self.frames[(pair, interval)]
+        open_time = data["open_time"]
+        # 아직 시작하지 않은 캔들은 보이지 않는다
+        visible = int(np.searchsorted(open_time, now_ms, side="right"))
+        stop = (
+            visible
+            if end_ms is None
+            else min(visible, int(np.searchsorted(open_time, end_ms, side="right")))
+        )
+        if start_ms is not None:
+            first = int(np.searchsorted(open_time, start_ms, side="left"))
+            stop = min(stop, first + limit)
+        else:
+            first = max(0, stop - limit)
+
+        step_ms = INTERVAL_MINUTES[interval] * 60_000
+        return [
+            [
+                int(open_time[i]),
+                f"{data['open'][i]:.8f}",
+                f"{data['high'][i]:.8f}",
+                f"{data['low'][i]:.8f}",
+                f"{data['close'][i]:.8f}",
+                f"{data['volume'][i]:.8f}",
+                int(open_time[i]) + step_ms - 1,
+                f"{data['volume'][i] * data['close'][i]:.8f}",
+                0,
+                "0",
+                "0",
+                "0",
+            ]
+            for i in range(first, stop)
+        ]
+
+
+class TradeTape:
+    # 코인별 aggTrades (id 는 0부터 연속, 시간은 정렬되어 있다)
+    def __init__(self):
+        self.tapes: dict[str, dict[str, np.ndarray]] = {}
+
+    @classmethod
+    def synthetic(
+        cls,
+        start: pd.Timestamp,
+        end: pd.Timestamp,
+        symbols=SYMBOLS,
+        trades_per_minute: float = 60.0,
+        seed: int = 0,
+    ):
+        tape = cls()
+        start_ms = int(start.value // 1_000_000)
+        minutes = (end - start) / pd.Timedelta(minutes=1)
+        for i, symbol in enumerate(symbols):
+            tape.tapes[f"{symbol}USDT"] = generate_agg_trades(
+                int(minutes * trades_per_minute),
+                start_ms,
+                trades_per_minute=trades_per_minute,
+                seed=seed + i,
+            )
+        return tape
+
+    def agg_trades(
+        self,
+        pair: str,
+        now_ms: int,
+        limit: int,
+        from_id=None,
+        start_ms=None,
+        end_ms=None,
+    ) -> list:
+        data = self.tapes[pair]
+        # 아직 체결되지 않은 거래는 보이지 않는다
+        visible = int(np.searchsorted(data["time"], now_ms, side="right"))
+        if from_id is not None:
+            first = min(max(from_id - int(data["id"][0]), 0), visible) if visible else 0
+            stop = min(visible, first + limit)
+        elif start_ms is not None or end_ms is not None:
+            first = (
+                int(np.searchsorted(data["time"], start_ms, side="left"))
+                if start_ms is not None
+                else 0
+            )
+            stop = visible
+            if end_ms is not None:
+                stop = min(
+                    stop, int(np.searchsorted(data["time"], end_ms, side="right"))
+                )
+            stop = min(stop, first + limit)
+        else:
+            first, stop = max(0, visible - limit), visible
+        return [
+            {
+                "a": int(data["id"][i]),
+                "p": f"{data['price'][i]:.8f}",
+                "q": f"{data['qty'][i]:.8f}",
+                "f": int(data["id"][i]),
+                "l": int(data["id"][i]),
+                "T": int(data["time"][i]),
+                "m": bool(data["buyer_maker"][i]),
+                "M": True,
+            }
+            for i in range(first, max(first, stop))
+        ]
+
+
+class ReplayState:
+    def __init__(
+        self,
+        store: KlineStore,
+        clock: VirtualClock,
+        weight_limit: int = WEIGHT_LIMIT_1M,
+        fail_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 0,
+        trades: TradeTape | None = None,
+    ):
+        self.store = store
+        self.trades = trades
+        self.clock = clock
+        self.limiter = WeightLimiter(weight_limit)
+        self.fail_rate = fail_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "klines": 0,
+            "agg_trades": 0,
+            "rate_limited": 0,
+            "injected_429": 0,
+            "max_weight_1m": 0,
+        }
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server_version = "binance-replay"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body, headers: dict | None = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        state: ReplayState = self.server.state
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/api/v3/ping":
+            return self._send(200, {})
+        if url.path == "/api/v3/time":
+            return self._send(200, {"serverTime": state.clock.now_ms()})
+        if url.path == "/replay/stats":
+            with state.lock:
+                return self._send(
+                    200, {**state.stats, "virtual_now": state.clock.now_ms()}
+                )
+        if url.path == "/api/v3/aggTrades" and state.trades is not None:
+            return self._agg_trades(state, params)
+        if url.path != "/api/v3/klines":
+            return self._send(404, {"code": -1000, "msg": "Unknown path."})
+        self._klines(state, params)
+
+    def _admit(self, state: ReplayState, weight: int) -> dict | None:
+        # 가중치 제한/429 주입 -> 거절하면 응답을 보내고 None
+        with state.lock:
+            state.stats["requests"] += 1
+            allowed, used, reset_in = state.limiter.consume(weight)
+            state.stats["max_weight_1m"] = max(state.stats["max_weight_1m"], used)
+            headers = {"X-MBX-USED-WEIGHT-1M": used}
+            if not allowed:
+                state.stats["rate_limited"] += 1
+                headers["Retry-After"] = int(np.ceil(reset_in))
+                self._send(429, {"code": -1003, "msg": "Too many requests."}, headers)
+                return None
+            if state.fail_rate and state.rng.random() < state.fail_rate:
+                state.stats["injected_429"] += 1
+                headers["Retry-After"] = state.retry_after
+                self._send(429, {"code": -1003, "msg": "Too many requests."}, headers)
+                return None
+        return headers
+
+    def _klines(self, state: ReplayState, params: dict):
+        try:
+            limit = int(params.get("limit", DEFAULT_LIMIT))
+            start_ms = int(params["startTime"]) if "startTime" in params else None
+            end_ms = int(params["endTime"]) if "endTime" in params else None
+        except ValueError:
+            return self._send(
+                400, {"code": -1100, "msg": "Illegal characters found in a parameter."}
+            )
+        if not 1 <= limit <= MAX_LIMIT:
+            return self._send(
+                400, {"code": -1130, "msg": "Invalid data sent for a parameter."}
+            )
+
+        headers = self._admit(state, kline_weight(limit))
+        if headers is None:
+            return
+
+        key = (params.get("symbol", ""), params.get("interval", ""))
+        if key not in state.store.frames:
+            return self._send(400, {"code": -1121, "msg": "Invalid symbol."}, headers)
+        rows = state.store.klines(*key, state.clock.now_ms(), limit, start_ms, end_ms)
+        with state.lock:
+            state.stats["klines"] += len(rows)
+        self._send(200, rows, headers)
+
+    def _agg_trades(self, state: ReplayState, params: dict):
+        try:
+            limit = int(params.get("limit", DEFAULT_LIMIT))
+            from_id = int(params["fromId"]) if "fromId" in params else None
+            start_ms = int(params["startTime"]) if "startTime" in params else None
+            end_ms = int(params["endTime"]) if "endTime" in params else None
+        except ValueError:
+            return self._send(
+                400, {"code": -1100, "msg": "Illegal characters found in a parameter."}
+            )
+        if not 1 <= limit <= MAX_LIMIT:
+            return self._send(
+                400, {"code": -1130, "msg": "Invalid data sent for a parameter."}
+            )
+        if (
+            start_ms is not None
+            and end_ms is not None
+            and end_ms - start_ms > AGG_TRADES_MAX_SPAN_MS
+        ):
+            return self._send(
+                400,
+                {
+                    "code": -1127,
+                    "msg": "More than 1 hours between startTime and endTime.",
+                },
+            )
+        headers = self._admit(state, AGG_TRADES_WEIGHT)
+        if headers is None:
+            return
+
+        pair = params.get("symbol", "")
+        if pair not in state.trades.tapes:
+            return self._send(400, {"code": -1121, "msg": "Invalid symbol."}, headers)
+        rows = state.trades.agg_trades(
+            pair, state.clock.now_ms(), limit, from_id, start_ms, end_ms
+        )
+        with state.lock:
+            state.stats["agg_trades"] += len(rows)
+        self._send(200, rows, headers)
+
+
+def make_server(
+    state: ReplayState, host: str = "127.0.0.1", port: int = 0
+) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ReplayHandler)
+    server.daemon_threads = True
+    server.state = state
+    return server
+
+
+def serve_in_thread(
+    state: ReplayState, host: str = "127.0.0.1", port: int = 0
+) -> ThreadingHTTPServer:
+    server = make_server(state, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="로컬 바이낸스 klines/aggTrades 대체 서버"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument(
+        "--data-dir", help="녹화된 캔들 CSV 디렉토리 (없으면 합성 데이터)"
+    )
+    parser.add_argument("--start", help="가상 시계 시작 시각 (기본: 현재)")
+    parser.add_argument(
+        "--speed", type=float, default=1.0, help="가상 시계 배속 (예: 1000)"
+    )
+    parser.add_argument(
+        "--history-days", type=float, help="합성 데이터 기간 (기본: 상장 시점부터)"
+    )
+    parser.add_argument(
+        "--horizon-days",
+        type=float,
+        default=30,
+        help="시작 이후 미리 만들어 둘 합성 데이터 기간",
+    )
+    parser.add_argument("--weight-limit", type=int, default=WEIGHT_LIMIT_1M)
+    parser.add_argument(
+        "--fail-rate", type=float, default=0.0, help="무작위 429 응답 비율"
+    )
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--trades-per-minute",
+        type=float,
+        default=0,
+        help="합성 aggTrades 체결 빈도 (0 이면 /api/v3/aggTrades 비활성)",
+    )
+    parser.add_argument(
+        "--trade-hours",
+        type=float,
+        default=24,
+        help="합성 aggTrades 기간 (시작 1시간 전부터)",
+    )
+    args = parser.parse_args()
+
+    start = pd.Timestamp(args.start or pd.Timestamp.now(tz="UTC"))
+    start = (
+        start.tz_localize("UTC") if start.tzinfo is None else start.tz_convert("UTC")
+    )
+    if args.data_dir:
+        store = KlineStore.recorded(args.data_dir)
+    else:
+        end = start + pd.Timedelta(days=args.horizon_days)
+        first = (
+            start - pd.Timedelta(days=args.history_days) if args.history_days else None
+        )
+        store = KlineStore.synthetic(end, first, seed=args.seed)
+    trades = None
+    if args.trades_per_minute > 0:
+        trades = TradeTape.synthetic(
+            start - pd.Timedelta(hours=1),
+            start + pd.Timedelta(hours=args.trade_hours),
+            trades_per_minute=args.trades_per_minute,
+            seed=args.seed,
+        )
+    state = ReplayState(
+        store,
+        VirtualClock(start, args.speed),
+        args.weight_limit,
+        args.fail_rate,
+        args.retry_after,
+        args.seed,
+        trades,
+    )
+
+    server = make_server(state, args.host, args.port)
+    print(
+        f"✅ replay server: http://{args.host}:{server.server_port} (BINANCE_API_URL 로 지정)"
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
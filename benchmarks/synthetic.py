@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from shared.symbols_intervals import BASE_INTERVAL, INTERVAL_MINUTES
+
+DEFAULT_START = pd.Timestamp("2017-08-17", tz="UTC")
+
+
+def _ar1(shocks: np.ndarray, phi: float) -> np.ndarray:
+    # x[t] = phi * x[t-1] + shocks[t] 을 ewm(adjust=False) 로 벡터화
+    # ewm: y[t] = (1 - a) * y[t-1] + a * v[t]  ->  a = 1 - phi, v = shocks / a
+    # 첫 값(y[0] = v[0])은 정상 분포에서 시작
+    alpha = 1.0 - phi
+    values = shocks / alpha
+    values[0] = shocks[0] / np.sqrt(1.0 - phi**2)
+    return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def generate_ohlcv(
+    n_rows: int,
+    interval: str = BASE_INTERVAL,
+    start: pd.Timestamp = DEFAULT_START,
+    price: float = 4000.0,
+    annual_vol: float = 0.8,
+    vol_persistence: float = 0.98,
+    vol_of_vol: float = 0.15,
+    seed: int = 0,
+) -> pd.DataFrame:
+    # GBM + 확률 변동성(로그 변동성 AR(1)) -> 변동성 군집이 있는 캔들
+    rng = np.random.default_rng(seed)
+    minutes = INTERVAL_MINUTES[interval]
+    bar_vol = annual_vol * np.sqrt(minutes / (365 * 24 * 60))
+
+    log_vol = _ar1(rng.normal(0.0, vol_of_vol, n_rows), vol_persistence)
+    sigma = bar_vol * np.exp(log_vol - log_vol.std() ** 2 / 2)
+    returns = sigma * rng.standard_normal(n_rows) - sigma**2 / 2
+
+    close = price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[price], close[:-1]])
+    # 캔들 내 고가/저가는 시가/종가 바깥으로 반정규 분포만큼 벌어진다
+    wick = np.abs(rng.standard_normal((2, n_rows))) * sigma / 2
+    high = np.maximum(open_, close) * np.exp(wick[0])
+    low = np.minimum(open_, close) * np.exp(-wick[1])
+    # 거래량은 변동성이 클수록 커진다
+    volume = np.exp(rng.normal(6.0, 0.5, n_rows)) * (1 + np.abs(returns) / bar_vol)
+
+    timestamp = start + pd.to_timedelta(np.arange(n_rows) * minutes, unit="min")
+    return pd.DataFrame(
+        {
+            "timestamp": timestamp,
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+        }
+    )
+
+
+def resample_ohlcv(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    # 기준 간격(15m) 캔들을 상위 간격으로 묶는다 (15m 기반 모호 캔들 판정과 일치)
+    grouped = df.set_index("timestamp").resample(
+        f"{INTERVAL_MINUTES[interval]}min", label="left", closed="left"
+    )
+    out = grouped.agg(
+        {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+    )
+    return out.dropna().reset_index()
+
+
+def generate_agg_trades(
+    n_trades: int,
+    start_ms: int,
+    price: float = 4000.0,
+    trades_per_minute: float = 60.0,
+    annual_vol: float = 0.8,
+    seed: int = 0,
+) -> dict[str, np.ndarray]:
+    # 포아송 도착 + 틱 단위 랜덤워크 체결 (바이낸스 aggTrades 컬럼)
+    rng = np.random.default_rng(seed)
+    gaps = rng.exponential(60_000 / trades_per_minute, n_trades)
+    time = start_ms + np.cumsum(gaps).astype("int64")
+    # 체결 간격만큼의 변동성 (연 변동성 기준)
+    sigma = annual_vol * np.sqrt(gaps / (365 * 24 * 3600 * 1000))
+    prices = np.round(
+        price * np.exp(np.cumsum(sigma * rng.standard_normal(n_trades))), 2
+    )
+    qty = np.round(np.exp(rng.normal(-3.0, 1.5, n_trades)), 5)
+    return {
+        "id": np.arange(n_trades, dtype="int64"),
+        "time": time,
+        "price": prices,
+        "qty": np.maximum(qty, 1e-5),
+        "buyer_maker": rng.random(n_trades) < 0.5,
+    }
@@ -0,0 +1,67 @@
+import os
+import time
+import numpy as np
+from fetcher.binance_client import BINANCE_API_URL, request_binance
+from fetcher.trade_store import PRICE_SCALE, QTY_SCALE, TradeStore, concat_trades, empty_trades
+
+AGG_TRADES_URL = BINANCE_API_URL + "/api/v3/aggTrades"
+AGG_TRADES_LIMIT = 1000
+# 처음 수집할 때 되돌아갈 시간
+AGG_TRADES_BACKFILL_MINUTES = int(os.getenv("AGG_TRADES_BACKFILL_MINUTES", "60"))
+# 한 번의 수집에서 요청할 최대 페이지 수 (캔들 수집이 밀리지 않도록)
+AGG_TRADES_MAX_PAGES = int(os.getenv("AGG_TRADES_MAX_PAGES", "200"))
+# 이만큼 모이면 파일로 내린다
+FLUSH_PAGES = 50
+
+
+def parse_agg_trades(rows):
+    # 바이낸스 aggTrades 응답 -> 컬럼 배열 (가격/수량은 정수로 변환)
+    if not rows:
+        return empty_trades()
+    n = len(rows)
+    return {
+        "id": np.fromiter((r["a"] for r in rows), np.int64, n),
+        "time": np.fromiter((r["T"] for r in rows), np.int64, n),
+        "price": np.rint(np.array([r["p"] for r in rows], dtype=np.float64) * PRICE_SCALE).astype(np.int64),
+        "qty": np.rint(np.array([r["q"] for r in rows], dtype=np.float64) * QTY_SCALE).astype(np.int64),
+        "buyer_maker": np.fromiter((r["m"] for r in rows), np.bool_, n),
+    }
+
+
+def fetch_agg_trades(symbol, from_id=None, start_time=None, limit=AGG_TRADES_LIMIT):
+    params = {"symbol": f"{symbol}USDT", "limit": limit}
+    if from_id is not None:
+        params["fromId"] = from_id
+    elif start_time is not None:
+        params["startTime"] = start_time
+    return parse_agg_trades(request_binance(AGG_TRADES_URL, params))
+
+
+def collect_agg_trades(symbol, store=None, max_pages=AGG_TRADES_MAX_PAGES, start_time=None):
+    # 마지막으로 저장한 id 다음부터 fromId 로 페이지를 넘기며 수집
+    # (저장된 것이 없으면 start_time, 기본은 AGG_TRADES_BACKFILL_MINUTES 전부터)
+    store = store or TradeStore()
+    last_id = store.last_id(symbol)
+    if last_id is None:
+        if start_time is None:
+            start_time = int(time.time() * 1000) - AGG_TRADES_BACKFILL_MINUTES * 60_000
+        page = fetch_agg_trades(symbol, start_time=start_time)
+    else:
+        page = fetch_agg_trades(symbol, from_id=last_id + 1)
+
+    saved, pages, buffer = 0, 1, []
+    while page["id"].size:
+        buffer.append(page)
+        if len(buffer) >= FLUSH_PAGES:
+            saved += store.append(symbol, concat_trades(buffer))
+            buffer = []
+        # 마지막 페이지(limit 미만)면 최신까지 받은 것
+        if page["id"].size < AGG_TRADES_LIMIT or pages >= max_pages:
+            break
+        page = fetch_agg_trades(symbol, from_id=int(page["id"][-1]) + 1)
+        pages += 1
+    if buffer:
+        saved += store.append(symbol, concat_trades(buffer))
+
+    store.compact_closed_days(symbol)
+    return saved
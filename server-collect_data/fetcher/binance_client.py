@@ -1,14 +1,32 @@
+import os
+import time
 import requests
 import pandas as pd
 from datetime import datetime, timezone
 from sqlalchemy import text
 from shared.connect_db import engine
 
-BINANCE_BASE_URL = "https://api.binance.com/api/v3/klines?symbol={symbol}USDT&interval={interval}&limit={limit}&startTime={start_time}"
+# 로컬 재생 서버 등으로 바꿀 수 있도록 환경 변수로 지정 (기본: 실제 바이낸스)
+BINANCE_API_URL = os.getenv("BINANCE_API_URL", "https://api.binance.com").rstrip("/")
+BINANCE_BASE_URL = BINANCE_API_URL + "/api/v3/klines?symbol={symbol}USDT&interval={interval}&limit={limit}&startTime={start_time}"
+REQUEST_TIMEOUT = 10
+MAX_RATE_LIMIT_RETRIES = 5
+
+def request_binance(url, params=None):
+    # 429/418(요청 제한)은 Retry-After 만큼 기다렸다가 다시 요청, 그 외 오류는 예외
+    for attempt in range(1, MAX_RATE_LIMIT_RETRIES + 1):
+        response = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
+        if response.status_code not in (418, 429):
+            break
+        wait = float(response.headers.get("Retry-After", 1))
+        print(f"[경고] 바이낸스 요청 제한 {response.status_code} (시도 {attempt}/{MAX_RATE_LIMIT_RETRIES}), {wait}초 대기")
+        time.sleep(wait)
+    response.raise_for_status()
+    return response.json()
 
 def get_binance_start_time(symbol, interval, limit=1, start_time=0):
     url = BINANCE_BASE_URL.format(symbol=symbol, interval=interval.lower(), limit=limit, start_time=start_time)
-    response = requests.get(url).json()
+    response = request_binance(url)
     if isinstance(response, list) and len(response) > 0:
         first_trade_time = response[0][0]
         return datetime.fromtimestamp(first_trade_time / 1000, tz=timezone.utc)
@@ -43,7 +61,7 @@ def fetch_from_binance(symbol, interval, limit=1000, start_time=None):
         interval=interval.lower(),
         limit=limit,
         start_time=start_time_ms)
-    response = requests.get(url).json()
+    response = request_binance(url)
     data = [
         {
             "timestamp": datetime.fromtimestamp(e[0] / 1000, tz=timezone.utc),
@@ -0,0 +1,94 @@
+import json
+import pandas as pd
+from sqlalchemy import text
+from shared.symbols_intervals import INTERVAL_MINUTES
+
+CATALOG_TABLE = "dataset_catalog"
+CATALOG_CHANNEL = "dataset_catalog"
+
+def ensure_catalog_table(conn):
+    # 매 배치마다 실행 (IF NOT EXISTS 라 저렴하다)
+    # 처음 만든 트랜잭션이 롤백되면 테이블도 사라지므로 "이미 만듦" 플래그를 두지 않는다
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (
+            symbol TEXT NOT NULL,
+            interval TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            first_timestamp TIMESTAMPTZ,
+            last_timestamp TIMESTAMPTZ,
+            row_count BIGINT NOT NULL DEFAULT 0,
+            gap_count BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (symbol, interval)
+        );
+    """))
+
+def _rebuild_catalog_row(conn, symbol: str, interval: str, table_name: str):
+    # 카탈로그에 없는 기존 테이블은 한 번만 전체 스캔으로 채운다
+    conn.execute(text(f"""
+        INSERT INTO {CATALOG_TABLE} (
+            symbol, interval, table_name,
+            first_timestamp, last_timestamp, row_count, gap_count, updated_at
+        )
+        SELECT
+            :symbol, :interval, :table_name,
+            MIN(timestamp), MAX(timestamp), COUNT(*),
+            COUNT(*) FILTER (WHERE gap > CAST(:step_minutes AS INTEGER) * INTERVAL '1 minute'),
+            now()
+        FROM (
+            SELECT timestamp, timestamp - LAG(timestamp) OVER (ORDER BY timestamp) AS gap
+            FROM "{table_name}"
+        ) s
+        ON CONFLICT (symbol, interval) DO UPDATE SET
+            first_timestamp = EXCLUDED.first_timestamp,
+            last_timestamp = EXCLUDED.last_timestamp,
+            row_count = EXCLUDED.row_count,
+            gap_count = EXCLUDED.gap_count,
+            updated_at = EXCLUDED.updated_at;
+    """), {
+        "symbol": symbol,
+        "interval": interval,
+        "table_name": table_name,
+        "step_minutes": INTERVAL_MINUTES[interval],
+    })
+
+def update_catalog(conn, symbol: str, interval: str, saved_df: pd.DataFrame):
+    # save_to_db 와 같은 트랜잭션 안에서 호출 (커밋 시 NOTIFY 전달)
+    symbol = symbol.upper()
+    interval = interval.lower()
+    table_name = f"{symbol}_{interval}".lower()
+    ensure_catalog_table(conn)
+
+    last_timestamp = conn.execute(text(f"""
+        SELECT last_timestamp FROM {CATALOG_TABLE}
+        WHERE symbol = :symbol AND interval = :interval
+        FOR UPDATE
+    """), {"symbol": symbol, "interval": interval}).scalar()
+
+    if last_timestamp is None:
+        _rebuild_catalog_row(conn, symbol, interval, table_name)
+    else:
+        # 새로 추가된 캔들만으로 행 수/누락 구간 수를 갱신
+        previous = pd.Timestamp(last_timestamp).tz_convert("UTC")
+        timestamps = pd.to_datetime(saved_df["timestamp"], utc=True).sort_values()
+        new_timestamps = timestamps[timestamps > previous]
+        edges = pd.concat([pd.Series([previous]), new_timestamps], ignore_index=True)
+        gaps = int((edges.diff() > pd.Timedelta(minutes=INTERVAL_MINUTES[interval])).sum())
+
+        conn.execute(text(f"""
+            UPDATE {CATALOG_TABLE}
+            SET last_timestamp = GREATEST(last_timestamp, :last_timestamp),
+                row_count = row_count + :new_rows,
+                gap_count = gap_count + :gaps,
+                updated_at = now()
+            WHERE symbol = :symbol AND interval = :interval
+        """), {
+            "symbol": symbol,
+            "interval": interval,
+            "last_timestamp": timestamps.iloc[-1].to_pydatetime() if len(timestamps) else last_timestamp,
+            "new_rows": len(new_timestamps),
+            "gaps": gaps,
+        })
+
+    payload = json.dumps({"symbol": symbol, "interval": interval, "table": table_name})
+    conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CATALOG_CHANNEL, "payload": payload})
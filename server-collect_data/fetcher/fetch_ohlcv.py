@@ -5,6 +5,7 @@ from fetcher.binance_client import fetch_from_binance, get_latest_timestamp, get
 from shared.connect_db import engine
 from datetime import datetime, timezone, timedelta
 from indicators.calculate import calculate_indicators
+from fetcher.catalog import update_catalog
 
 KST = timezone(timedelta(hours=9))
 
@@ -106,6 +107,7 @@ def save_to_db(symbol: str, interval: str):
             with engine.begin() as conn:
                 for _, row in to_save_df.iterrows():
                     conn.execute(insert_sql, row.to_dict())
+                update_catalog(conn, symbol, interval, to_save_df)
             break
         except Exception as e:
             print(f"[경고] INSERT 실패 (시도 {attempt}/{MAX_RETRIES}): {e}")
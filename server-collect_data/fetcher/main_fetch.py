@@ -1,8 +1,15 @@
+import os
 import time
 from shared.symbols_intervals import SYMBOLS, INTERVALS
 from fetcher.fetch_ohlcv import save_to_db
+from fetcher.agg_trades import collect_agg_trades
+from fetcher.trade_store import TradeStore
+
+# 체결(aggTrades)까지 수집할 코인 (쉼표 구분, 기본: 수집 안 함)
+AGG_TRADES_SYMBOLS = [s.strip().upper() for s in os.getenv("AGG_TRADES_SYMBOLS", "").split(",") if s.strip()]
 
 def main_loop(interval_seconds=60):
+    trade_store = TradeStore()
     while True:
         start_time = time.time()
 
@@ -14,6 +21,13 @@ def main_loop(interval_seconds=60):
                 except Exception as e:
                     print(f"{symbol}_{interval} 저장 중 오류 발생: {e}")
 
+        for symbol in AGG_TRADES_SYMBOLS:
+            try:
+                saved = collect_agg_trades(symbol, trade_store)
+                print(f"{symbol} 체결 {saved}건 저장")
+            except Exception as e:
+                print(f"{symbol} 체결 수집 중 오류 발생: {e}")
+
         elapsed = time.time() - start_time
         sleep_time = max(0, interval_seconds - elapsed)
 
@@ -0,0 +1,280 @@
+import argparse
+import io
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from shared.connect_db import dispose_engines, engine
+from shared.symbols_intervals import SYMBOLS, INTERVALS
+from fetcher.catalog import CATALOG_TABLE, CATALOG_CHANNEL, ensure_catalog_table
+from fetcher.fetch_ohlcv import table_exists
+from indicators.calculate import calculate_indicators
+
+# 수집기는 최근 100개 캔들만으로 지표를 계산해서 저장하므로 ema_99/macd/rsi 가 전체 기간 계산과 다르다
+# -> 테이블 전체를 다시 계산해 그림자 테이블에 COPY 한 뒤 한 트랜잭션 안에서 원본과 교체
+#    python -m fetcher.recompute_indicators --workers 4 --memory-mb 512 [--dry-run] [--report drift.json]
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+INDICATOR_COLUMNS = [
+    "rsi", "rsi_signal",
+    "ema_7", "ema_25", "ema_99",
+    "macd", "macd_signal",
+    "boll_ma", "boll_upper", "boll_lower",
+    "volume_ma_20",
+]
+TABLE_COLUMNS = ["timestamp", *OHLCV_COLUMNS, *INDICATOR_COLUMNS]
+
+# 청크마다 앞에 붙여 다시 계산하는 이전 캔들 수
+# (ema_99 의 가중치 0.98^2000 이 REAL 정밀도보다 훨씬 작아져 전체 계산과 같은 값이 된다)
+OVERLAP_ROWS = int(os.getenv("RECOMPUTE_OVERLAP_ROWS", "2000"))
+# 모든 워커가 함께 쓰는 메모리 예산
+RECOMPUTE_MEMORY_MB = int(os.getenv("RECOMPUTE_MEMORY_MB", "512"))
+RECOMPUTE_WORKERS = int(os.getenv("RECOMPUTE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 청크 한 행이 차지하는 대략적인 크기 (읽은 원본 + 새 지표 + 중간 계산 + COPY 용 CSV)
+BYTES_PER_ROW = 1024
+SHADOW_SUFFIX = "__recompute"
+
+INDEX_DEF_RE = re.compile(r"^(CREATE (?:UNIQUE )?INDEX )(\S+)( ON (?:ONLY )?)(\S+)( .*)$")
+
+
+def chunk_rows_for(memory_mb=RECOMPUTE_MEMORY_MB, workers=RECOMPUTE_WORKERS, overlap=OVERLAP_ROWS):
+    # 워커 하나가 (겹치는 구간 + 청크) 를 메모리에 올리므로 예산에서 겹치는 구간을 뺀 만큼 읽는다
+    rows = memory_mb * 2**20 // max(1, workers) // BYTES_PER_ROW - overlap
+    if rows < overlap:
+        raise ValueError(
+            f"메모리 예산이 너무 작습니다: 워커당 {memory_mb / max(1, workers):.0f}MB "
+            f"(최소 {2 * overlap * BYTES_PER_ROW * max(1, workers) / 2**20:.0f}MB 필요)"
+        )
+    return rows
+
+
+class ChunkRecomputer:
+    # 시간순 청크를 차례로 받아 지표를 다시 계산 (직전 캔들 overlap 개를 앞에 붙여 계산한 뒤 잘라낸다)
+    def __init__(self, overlap=OVERLAP_ROWS):
+        self.overlap = overlap
+        self.warmup = None
+
+    def __call__(self, chunk):
+        ohlcv = chunk[["timestamp", *OHLCV_COLUMNS]].reset_index(drop=True)
+        if self.warmup is not None and len(self.warmup):
+            combined = pd.concat([self.warmup, ohlcv], ignore_index=True)
+        else:
+            combined = ohlcv
+        computed = calculate_indicators(combined).iloc[len(combined) - len(ohlcv):]
+        self.warmup = combined.iloc[len(combined) - self.overlap:] if self.overlap else None
+        return computed.reset_index(drop=True)
+
+
+def recompute_chunks(chunks, overlap=OVERLAP_ROWS):
+    recompute = ChunkRecomputer(overlap)
+    for chunk in chunks:
+        yield recompute(chunk)
+
+
+class DriftReport:
+    # 저장된 값과 다시 계산한 값의 차이 (REAL 로 저장되므로 양쪽 다 float32 로 맞춰 비교)
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self.rows = 0
+        self.max_abs = dict.fromkeys(INDICATOR_COLUMNS, 0.0)
+        self.sum_abs = dict.fromkeys(INDICATOR_COLUMNS, 0.0)
+        self.compared = dict.fromkeys(INDICATOR_COLUMNS, 0)
+        # 한쪽만 NULL 인 행 수
+        self.null_mismatch = dict.fromkeys(INDICATOR_COLUMNS, 0)
+
+    def update(self, stored, computed):
+        self.rows += len(computed)
+        for col in INDICATOR_COLUMNS:
+            old = stored[col].to_numpy(dtype="float32").astype("float64")
+            new = computed[col].to_numpy(dtype="float32").astype("float64")
+            both = np.isfinite(old) & np.isfinite(new)
+            self.null_mismatch[col] += int((np.isnan(old) != np.isnan(new)).sum())
+            if not both.any():
+                continue
+            diff = np.abs(new[both] - old[both])
+            self.max_abs[col] = max(self.max_abs[col], float(diff.max()))
+            self.sum_abs[col] += float(diff.sum())
+            self.compared[col] += int(both.sum())
+
+    def to_dict(self):
+        return {
+            "table": self.table_name,
+            "rows": self.rows,
+            "columns": {
+                col: {
+                    "max_abs_diff": self.max_abs[col],
+                    "mean_abs_diff": self.sum_abs[col] / self.compared[col] if self.compared[col] else 0.0,
+                    "null_mismatch": self.null_mismatch[col],
+                }
+                for col in INDICATOR_COLUMNS
+            },
+        }
+
+
+def _read_chunks(conn, table_name, chunk_rows, after=None):
+    # timestamp 키셋으로 chunk_rows 개씩 읽는다 (OFFSET 없이 인덱스 범위 탐색)
+    cols = ", ".join(f'"{c}"' for c in TABLE_COLUMNS)
+    query = text(f"""
+        SELECT {cols} FROM "{table_name}"
+        WHERE CAST(:after AS TIMESTAMPTZ) IS NULL OR timestamp > :after
+        ORDER BY timestamp
+        LIMIT :limit
+    """)
+    while True:
+        chunk = pd.read_sql(query, conn, params={"after": after, "limit": chunk_rows})
+        if chunk.empty:
+            return
+        chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], utc=True)
+        after = chunk["timestamp"].iloc[-1].to_pydatetime()
+        yield chunk
+
+
+def _copy_chunk(conn, table_name, df):
+    cols = ", ".join(f'"{c}"' for c in TABLE_COLUMNS)
+    # REAL 컬럼이므로 float32 로 바꿔 쓴다 (float64 문자열을 다시 반올림하면 1ulp 어긋날 수 있다)
+    df = df.astype({c: "float32" for c in TABLE_COLUMNS[1:]})
+    buf = io.StringIO()
+    df.to_csv(buf, columns=TABLE_COLUMNS, header=False, index=False, date_format="%Y-%m-%d %H:%M:%S.%f+00:00")
+    buf.seek(0)
+    # 같은 트랜잭션의 DBAPI 커넥션으로 COPY
+    with conn.connection.cursor() as cur:
+        cur.copy_expert(f"COPY \"{table_name}\" ({cols}) FROM STDIN WITH (FORMAT csv, NULL '')", buf)
+
+
+def _process(conn, table_name, recompute, report, chunk_rows, after=None, shadow=None):
+    # after 이후 캔들을 청크 단위로 계산 -> 차이 집계 -> (그림자 테이블에 COPY), 마지막으로 처리한 시각 반환
+    for chunk in _read_chunks(conn, table_name, chunk_rows, after):
+        computed = recompute(chunk)
+        report.update(chunk, computed)
+        if shadow is not None:
+            _copy_chunk(conn, shadow, computed)
+        after = chunk["timestamp"].iloc[-1].to_pydatetime()
+    return after
+
+
+def _index_definitions(conn, table_name):
+    # 기본 키를 제외한 인덱스 (인덱스 어드바이저가 만든 것 포함) 이름과 정의
+    return conn.execute(text("""
+        SELECT i.relname, pg_get_indexdef(i.oid)
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = CAST(:table_name AS regclass) AND NOT x.indisprimary
+        ORDER BY i.relname
+    """), {"table_name": f'"{table_name}"'}).fetchall()
+
+
+def _build_shadow_indexes(conn, table_name, shadow):
+    # 그림자 테이블에 같은 정의의 인덱스를 임시 이름으로 만들고, (임시 이름, 원래 이름) 목록 반환
+    renames = []
+    conn.execute(text(f'ALTER TABLE "{shadow}" ADD CONSTRAINT "{shadow}_pkey" PRIMARY KEY (timestamp)'))
+    for n, (name, definition) in enumerate(_index_definitions(conn, table_name)):
+        match = INDEX_DEF_RE.match(definition)
+        if match is None:
+            raise ValueError(f"인덱스 정의를 해석할 수 없습니다: {definition}")
+        temp_name = f"{shadow}_idx{n}"
+        conn.execute(text(f'{match[1]}"{temp_name}"{match[3]}"{shadow}"{match[5]}'))
+        renames.append((temp_name, name))
+    return renames
+
+
+def recompute_table(symbol, interval, chunk_rows, overlap=OVERLAP_ROWS, dry_run=False):
+    # 한 트랜잭션: 그림자 테이블 생성 -> 청크별 계산/COPY -> 인덱스 -> 원본 잠금 후 그 사이 추가된 캔들 반영 -> 교체
+    # 도중에 실패하면 전부 롤백되어 원본은 그대로 남는다
+    table_name = f"{symbol}_{interval}".lower()
+    shadow = None if dry_run else f"{table_name}{SHADOW_SUFFIX}"
+    report = DriftReport(table_name)
+    recompute = ChunkRecomputer(overlap)
+    started = time.time()
+
+    with engine.begin() as conn:
+        if shadow is not None:
+            conn.execute(text(f'DROP TABLE IF EXISTS "{shadow}"'))
+            conn.execute(text(f'CREATE TABLE "{shadow}" (LIKE "{table_name}" INCLUDING DEFAULTS)'))
+        after = _process(conn, table_name, recompute, report, chunk_rows, shadow=shadow)
+
+        if shadow is not None:
+            renames = _build_shadow_indexes(conn, table_name, shadow)
+            # 여기부터 커밋까지 원본 읽기/쓰기가 대기 (추가된 캔들 몇 개만 처리)
+            conn.execute(text(f'LOCK TABLE "{table_name}" IN ACCESS EXCLUSIVE MODE'))
+            _process(conn, table_name, recompute, report, chunk_rows, after=after, shadow=shadow)
+            conn.execute(text(f'DROP TABLE "{table_name}"'))
+            conn.execute(text(f'ALTER TABLE "{shadow}" RENAME TO "{table_name}"'))
+            conn.execute(text(f'ALTER TABLE "{table_name}" RENAME CONSTRAINT "{shadow}_pkey" TO "{table_name}_pkey"'))
+            for temp_name, name in renames:
+                conn.execute(text(f'ALTER INDEX "{temp_name}" RENAME TO "{name}"'))
+            conn.execute(text(f'ANALYZE "{table_name}"'))
+
+            # 과거 지표 값이 바뀌었으므로 조회 서버가 꼬리만 갱신하는 캐시를 버리도록 알린다
+            ensure_catalog_table(conn)
+            conn.execute(text(f"""
+                UPDATE {CATALOG_TABLE} SET updated_at = now()
+                WHERE symbol = :symbol AND interval = :interval
+            """), {"symbol": symbol.upper(), "interval": interval})
+            payload = json.dumps({
+                "symbol": symbol.upper(),
+                "interval": interval,
+                "table": table_name,
+                "rewritten": True,
+            })
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CATALOG_CHANNEL, "payload": payload})
+
+    result = report.to_dict()
+    result["seconds"] = round(time.time() - started, 3)
+    result["swapped"] = shadow is not None
+    return result
+
+
+def _run_one(args):
+    return recompute_table(*args)
+
+
+def recompute_all(pairs, workers=RECOMPUTE_WORKERS, memory_mb=RECOMPUTE_MEMORY_MB, overlap=OVERLAP_ROWS, dry_run=False):
+    # 테이블별로 프로세스 풀에서 병렬 처리 (메모리 예산은 워커 수로 나눠 청크 크기를 정한다)
+    chunk_rows = chunk_rows_for(memory_mb, workers, overlap)
+    jobs = [(symbol, interval, chunk_rows, overlap, dry_run) for symbol, interval in pairs if table_exists(symbol, interval)]
+    if not jobs:
+        return []
+    # fork 된 워커는 부모의 커넥션을 닫지 않고 풀만 비운 뒤 새로 연결
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), initializer=dispose_engines, initargs=(False,)) as pool:
+        return list(pool.map(_run_one, jobs))
+
+
+def format_report(results):
+    lines = []
+    for result in results:
+        status = "교체" if result["swapped"] else "확인만"
+        lines.append(f"{result['table']}: {result['rows']}행, {result['seconds']}초 ({status})")
+        for col, drift in result["columns"].items():
+            lines.append(
+                f"  {col:<14} max {drift['max_abs_diff']:.6g}  mean {drift['mean_abs_diff']:.6g}"
+                f"  null 불일치 {drift['null_mismatch']}"
+            )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="저장된 지표를 전체 기간으로 다시 계산해 교체")
+    parser.add_argument("--symbols", nargs="+", default=SYMBOLS)
+    parser.add_argument("--intervals", nargs="+", default=INTERVALS)
+    parser.add_argument("--workers", type=int, default=RECOMPUTE_WORKERS)
+    parser.add_argument("--memory-mb", type=int, default=RECOMPUTE_MEMORY_MB)
+    parser.add_argument("--overlap", type=int, default=OVERLAP_ROWS)
+    parser.add_argument("--dry-run", action="store_true", help="교체하지 않고 차이만 보고")
+    parser.add_argument("--report", help="차이 보고서를 저장할 JSON 경로")
+    args = parser.parse_args(argv)
+
+    pairs = [(symbol.upper(), interval) for symbol in args.symbols for interval in args.intervals]
+    results = recompute_all(pairs, args.workers, args.memory_mb, args.overlap, args.dry_run)
+    print(format_report(results))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from shared.symbols_intervals import INTERVAL_MINUTES
+from fetcher.trade_store import PRICE_SCALE, QTY_SCALE
+
+
+def _group_starts(keys):
+    # 정렬된 키에서 값이 바뀌는 위치 (reduceat 구간 시작)
+    return np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+
+
+def trades_to_candles(trades, interval):
+    # 체결 -> 캔들 (fetch_from_binance 와 같은 컬럼, 체결이 없는 구간은 캔들도 없다)
+    time = trades["time"]
+    columns = ["timestamp", "open", "high", "low", "close", "volume", "taker_buy_volume", "trades"]
+    if time.size == 0:
+        return pd.DataFrame(columns=columns)
+
+    step = INTERVAL_MINUTES[interval] * 60_000
+    bucket = time // step
+    starts = _group_starts(bucket)
+    ends = np.append(starts[1:], time.size)
+    price = trades["price"]
+    qty = trades["qty"]
+    # 매수 체결 (매수자가 taker) 수량
+    taker_buy = np.where(trades["buyer_maker"], 0, qty)
+
+    return pd.DataFrame({
+        "timestamp": pd.to_datetime(bucket[starts] * step, unit="ms", utc=True),
+        "open": price[starts] / PRICE_SCALE,
+        "high": np.maximum.reduceat(price, starts) / PRICE_SCALE,
+        "low": np.minimum.reduceat(price, starts) / PRICE_SCALE,
+        "close": price[ends - 1] / PRICE_SCALE,
+        "volume": np.add.reduceat(qty, starts) / QTY_SCALE,
+        "taker_buy_volume": np.add.reduceat(taker_buy, starts) / QTY_SCALE,
+        "trades": ends - starts,
+    })
+
+
+def volume_at_price(trades, tick):
+    # 가격대(tick 단위)별 거래량 (정수 상태로 정렬 후 구간 합 -> 반올림 오차 없음)
+    columns = ["price", "volume", "buy_volume", "sell_volume"]
+    if trades["price"].size == 0:
+        return pd.DataFrame(columns=columns)
+
+    tick_scaled = max(1, int(round(tick * PRICE_SCALE)))
+    level = trades["price"] // tick_scaled
+    order = np.argsort(level, kind="stable")
+    level = level[order]
+    qty = trades["qty"][order]
+    sell = trades["buyer_maker"][order]
+    starts = _group_starts(level)
+
+    volume = np.add.reduceat(qty, starts)
+    sell_volume = np.add.reduceat(np.where(sell, qty, 0), starts)
+    return pd.DataFrame({
+        "price": level[starts] * tick_scaled / PRICE_SCALE,
+        "volume": volume / QTY_SCALE,
+        "buy_volume": (volume - sell_volume) / QTY_SCALE,
+        "sell_volume": sell_volume / QTY_SCALE,
+    })
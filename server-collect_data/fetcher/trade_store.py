@@ -0,0 +1,146 @@
+import os
+import json
+import numpy as np
+
+# 체결 데이터 저장 위치 (코인/UTC 날짜별 디렉토리)
+TRADES_DIR = os.getenv("AGG_TRADES_DIR", "data/agg_trades")
+# 가격/수량은 소수점 8자리까지 -> 정수로 저장
+PRICE_SCALE = 10**8
+QTY_SCALE = 10**8
+MS_PER_DAY = 86_400_000
+
+COLUMNS = {
+    "id": np.int64,
+    "time": np.int64,          # 체결 시각 (epoch ms)
+    "price": np.int64,         # 가격 * PRICE_SCALE
+    "qty": np.int64,           # 수량 * QTY_SCALE
+    "buyer_maker": np.bool_,   # True 면 매도 체결 (매수자가 maker)
+}
+
+
+def empty_trades():
+    return {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+
+
+def concat_trades(parts):
+    if not parts:
+        return empty_trades()
+    return {name: np.concatenate([p[name] for p in parts]) for name in COLUMNS}
+
+
+def _write_atomic(path, write):
+    # 임시 파일에 쓴 뒤 교체 -> 읽는 쪽은 항상 완성된 파일만 본다
+    tmp = f"{path}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+class TradeStore:
+    # 추가 전용 컬럼 저장소: {root}/{SYMBOL}/{YYYY-MM-DD}/part-{첫 id}-{마지막 id}.npz
+    # 날짜별 index.json 에 파일마다 id/시간 범위를 기록해 두고 읽을 때 필요한 파일만 연다
+    def __init__(self, root=TRADES_DIR):
+        self.root = root
+
+    def _day_dir(self, symbol, day):
+        return os.path.join(self.root, symbol.upper(), day)
+
+    def days(self, symbol):
+        path = os.path.join(self.root, symbol.upper())
+        if not os.path.isdir(path):
+            return []
+        return sorted(d for d in os.listdir(path) if os.path.exists(os.path.join(path, d, "index.json")))
+
+    def index(self, symbol, day):
+        path = os.path.join(self._day_dir(symbol, day), "index.json")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_index(self, symbol, day, parts):
+        path = os.path.join(self._day_dir(symbol, day), "index.json")
+
+        def write(tmp):
+            with open(tmp, "w") as f:
+                json.dump(parts, f)
+
+        _write_atomic(path, write)
+
+    def _write_part(self, symbol, day, trades, prefix="part"):
+        name = f"{prefix}-{int(trades['id'][0]):012d}-{int(trades['id'][-1]):012d}.npz"
+        path = os.path.join(self._day_dir(symbol, day), name)
+
+        def write(tmp):
+            with open(tmp, "wb") as f:
+                np.savez_compressed(f, **trades)
+
+        _write_atomic(path, write)
+        return {
+            "file": name,
+            "first_id": int(trades["id"][0]),
+            "last_id": int(trades["id"][-1]),
+            "start": int(trades["time"][0]),
+            "end": int(trades["time"][-1]),
+            "rows": int(trades["id"].size),
+        }
+
+    def last_id(self, symbol):
+        # 이어받을 위치 (저장된 것이 없으면 None)
+        days = self.days(symbol)
+        if not days:
+            return None
+        return self.index(symbol, days[-1])[-1]["last_id"]
+
+    def append(self, symbol, trades):
+        # id 순서로 정렬된 체결을 UTC 날짜별로 나눠 새 part 파일로 추가 (기존 파일은 건드리지 않는다)
+        last_id = self.last_id(symbol)
+        if last_id is not None:
+            keep = trades["id"] > last_id
+            trades = {name: col[keep] for name, col in trades.items()}
+        if trades["id"].size == 0:
+            return 0
+
+        day_no = trades["time"] // MS_PER_DAY
+        bounds = np.flatnonzero(np.diff(day_no)) + 1
+        for chunk in np.split(np.arange(day_no.size), bounds):
+            part = {name: np.ascontiguousarray(trades[name][chunk], dtype) for name, dtype in COLUMNS.items()}
+            day = str(np.datetime64(int(day_no[chunk[0]]), "D"))
+            os.makedirs(self._day_dir(symbol, day), exist_ok=True)
+            entry = self._write_part(symbol, day, part)
+            # part 파일을 먼저 쓰고 색인을 갱신 (색인에 없는 파일은 무시된다)
+            self._write_index(symbol, day, self.index(symbol, day) + [entry])
+        return int(trades["id"].size)
+
+    def _load(self, symbol, day, entry):
+        with np.load(os.path.join(self._day_dir(symbol, day), entry["file"])) as data:
+            return {name: data[name] for name in COLUMNS}
+
+    def read(self, symbol, start_ms, end_ms):
+        # [start_ms, end_ms) 구간의 체결 (색인으로 겹치는 part 만 읽고 경계는 이진 탐색)
+        first_day = str(np.datetime64(int(start_ms) // MS_PER_DAY, "D"))
+        last_day = str(np.datetime64((int(end_ms) - 1) // MS_PER_DAY, "D"))
+        parts = [
+            self._load(symbol, day, entry)
+            for day in self.days(symbol)
+            if first_day <= day <= last_day
+            for entry in self.index(symbol, day)
+            if entry["end"] >= start_ms and entry["start"] < end_ms
+        ]
+        trades = concat_trades(parts)
+        lo, hi = np.searchsorted(trades["time"], [start_ms, end_ms], side="left")
+        return {name: col[lo:hi] for name, col in trades.items()}
+
+    def compact(self, symbol, day):
+        # 지난 날짜의 작은 part 들을 하나로 합친다 (새 파일 -> 색인 교체 -> 이전 파일 삭제)
+        entries = self.index(symbol, day)
+        if len(entries) <= 1:
+            return False
+        merged = concat_trades([self._load(symbol, day, e) for e in entries])
+        self._write_index(symbol, day, [self._write_part(symbol, day, merged, prefix="day")])
+        for entry in entries:
+            os.remove(os.path.join(self._day_dir(symbol, day), entry["file"]))
+        return True
+
+    def compact_closed_days(self, symbol):
+        # 마지막 날짜는 아직 추가 중일 수 있어 제외
+        return sum(self.compact(symbol, day) for day in self.days(symbol)[:-1])
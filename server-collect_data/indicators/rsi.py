@@ -13,9 +13,11 @@ def rma(series: pd.Series, period: int) -> pd.Series:
     if start >= len(series):
         return result
 
-    result.iloc[start] = series.iloc[start - period + 1 : start + 1].mean()
-    for i in range(start + 1, len(series)):
-        result.iloc[i] = (result.iloc[i - 1] * (period - 1) + series.iloc[i]) / period
+    # 시작점은 단순 평균, 이후 result[i] = (result[i-1] * (period - 1) + x[i]) / period
+    # = alpha 1/period 지수 평균 -> 행 단위 루프 대신 ewm 으로 계산 (전체 기간 재계산용)
+    seeded = series.iloc[start:].copy()
+    seeded.iloc[0] = series.iloc[start - period + 1 : start + 1].mean()
+    result.iloc[start:] = seeded.ewm(alpha=1 / period, adjust=False).mean().to_numpy()
 
     return result
 
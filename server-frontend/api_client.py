@@ -0,0 +1,111 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+API_URL = st.secrets.get("API_URL", "http://localhost:8082")
+# 브라우저에서 직접 연결하는 주소 (SSE), 없으면 실시간 기능을 끈다
+PUBLIC_API_URL = st.secrets.get("PUBLIC_API_URL", "")
+REQUEST_TIMEOUT = 30
+# 버전이 바뀌지 않아도 이 시간이 지나면 다시 받는다
+DATA_TTL = 600
+# 한 번의 rerun 안에서 /data-version 을 여러 번 확인하지 않도록
+VERSION_CHECK_INTERVAL = 1.0
+# get_json_many 의 동시 요청 수 (연결 풀 크기 이하)
+MAX_PARALLEL = 8
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    # 모든 페이지/사용자가 공유하는 keep-alive 연결 풀
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+@st.cache_resource
+def _version_state() -> dict:
+    return {
+        "etag": None,
+        "body": {"datasets": None, "results": None, "pairs": {}},
+        "checked_at": 0.0,
+        "lock": threading.Lock(),
+    }
+
+
+def data_version() -> dict:
+    # ETag 로 조건부 요청 -> 변경이 없으면 304 (본문 없음)
+    state = _version_state()
+    with state["lock"]:
+        if time.monotonic() - state["checked_at"] < VERSION_CHECK_INTERVAL:
+            return state["body"]
+        headers = {"If-None-Match": state["etag"]} if state["etag"] else {}
+        try:
+            res = get_session().get(
+                f"{API_URL}/data-version", headers=headers, timeout=REQUEST_TIMEOUT
+            )
+        except requests.RequestException:
+            # 서버에 연결할 수 없으면 마지막 버전을 그대로 사용
+            return state["body"]
+        if res.status_code == 200:
+            state["etag"] = res.headers.get("ETag")
+            state["body"] = res.json()
+        state["checked_at"] = time.monotonic()
+        return state["body"]
+
+
+def version_key(*scopes: str) -> tuple:
+    # scope: "results", "datasets" 또는 "BTC_1h" 같은 코인/간격
+    version = data_version()
+    return tuple(version.get(scope, version["pairs"].get(scope)) for scope in scopes)
+
+
+@st.cache_data(ttl=DATA_TTL, show_spinner=False)
+def _get_json(path: str, params: tuple, version: tuple):
+    # version 은 캐시 키로만 사용 (실패한 요청은 예외라서 캐시되지 않는다)
+    res = get_session().get(
+        f"{API_URL}{path}", params=dict(params), timeout=REQUEST_TIMEOUT
+    )
+    res.raise_for_status()
+    return res.json()
+
+
+def get_json(path: str, params: dict | None = None, scopes=("results",)):
+    # 실패하면 None (페이지에서 안내 문구 표시)
+    try:
+        return _get_json(
+            path, tuple(sorted((params or {}).items())), version_key(*scopes)
+        )
+    except requests.RequestException:
+        return None
+
+
+def get_json_many(calls: list[tuple[str, dict]], scopes=("results",)) -> list:
+    # 여러 GET 을 스레드 풀에서 동시에 실행 (결과 순서는 calls 와 같다)
+    if not calls:
+        return []
+    version = version_key(*scopes)
+    ctx = get_script_run_ctx()
+
+    def fetch(call):
+        # 작업 스레드에서도 같은 세션의 캐시를 사용하도록 실행 컨텍스트 연결
+        add_script_run_ctx(threading.current_thread(), ctx)
+        path, params = call
+        try:
+            return _get_json(path, tuple(sorted(params.items())), version)
+        except requests.RequestException:
+            return None
+
+    with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL, len(calls))) as pool:
+        return list(pool.map(fetch, calls))
+
+
+def post_json(path: str, payload: dict) -> requests.Response:
+    # 백테스트는 오래 걸릴 수 있어 시간 제한을 두지 않는다 (결과 버전은 서버에서 갱신)
+    return get_session().post(f"{API_URL}{path}", json=payload)
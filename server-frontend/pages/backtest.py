@@ -1,10 +1,8 @@
 import streamlit as st
 from shared.symbols_intervals import SYMBOLS, INTERVALS
-import requests
+from api_client import get_json, post_json
 from datetime import datetime
 
-API_URL = st.secrets.get("API_URL", "http://localhost:8082")
-
 st.set_page_config(page_title="암호화폐 차트 분석 플랫폼", layout="wide")
 st.title("투자 전략 백테스트")
 st.write(
@@ -24,19 +22,21 @@ with col1:
 with col2:
     interval = st.selectbox("시간 간격(h)", INTERVALS, key="interval")
 
-# 🔄 테이블에서 시작/종료 시간 가져오기
+# 🔄 카탈로그에서 시작/종료 시간 가져오기 (데이터 테이블을 조회하지 않음)
 default_start = datetime.now()
 default_end = datetime.now()
 if symbol and interval:
-    try:
-        time_range_url = f"{API_URL}/time-range?symbol={symbol}&interval={interval}"
-        resp = requests.get(time_range_url)
-        if resp.status_code == 200:
-            data = resp.json()
-            default_start = datetime.fromisoformat(data["start_time"])
-            default_end = datetime.fromisoformat(data["end_time"])
-    except Exception as e:
-        st.warning(f"기간 정보를 불러오는 중 오류: {e}")
+    catalog = get_json("/catalog", scopes=("datasets",))
+    if catalog is None:
+        st.warning("기간 정보를 불러오는 중 오류가 발생했습니다.")
+    for row in catalog or []:
+        if (
+            row["symbol"] == symbol
+            and row["interval"] == interval
+            and row["start_time"]
+        ):
+            default_start = datetime.fromisoformat(row["start_time"])
+            default_end = datetime.fromisoformat(row["end_time"])
 
 # 📅 기간 선택 UI
 st.subheader("백테스트 기간 설정")
@@ -69,6 +69,26 @@ all_fields = [
     "volume_ma_20",
 ]
 operators = [">", ">=", "<", "<=", "==", "!="]
+# 파라미터 지표 (ema(close,50), sma(volume,20), rsi(21) 등) 는 직접 입력
+CUSTOM_FIELD = "직접 입력"
+
+
+def field_input(label: str, value: str, key: str) -> str:
+    options = all_fields + [CUSTOM_FIELD]
+    choice = st.selectbox(
+        label,
+        options,
+        key=key,
+        index=options.index(value if value in all_fields else CUSTOM_FIELD),
+    )
+    if choice != CUSTOM_FIELD:
+        return choice
+    return st.text_input(
+        "ema / sma / rsi (컬럼, 기간)",
+        value=value if value not in all_fields else "ema(close,50)",
+        key=f"{key}_custom",
+    )
+
 
 # ➕ 조건 추가
 if st.button("➕ 조건 추가"):
@@ -91,12 +111,7 @@ to_delete = None
 for cond in st.session_state.conditions:
     col1, col2, col3, col4, _, col6 = st.columns([1.2, 1, 1.5, 1.5, 1.5, 0.3])
     with col1:
-        cond["left"] = st.selectbox(
-            "지표",
-            all_fields,
-            key=f"left_{cond['id']}",
-            index=all_fields.index(cond["left"]),
-        )
+        cond["left"] = field_input("지표", cond["left"], f"left_{cond['id']}")
     with col2:
         cond["op"] = st.selectbox(
             "연산자",
@@ -117,11 +132,8 @@ for cond in st.session_state.conditions:
                 "값 입력", value=cond["value"], key=f"value_{cond['id']}"
             )
         else:
-            cond["right"] = st.selectbox(
-                "비교 지표",
-                all_fields,
-                key=f"right_{cond['id']}",
-                index=all_fields.index(cond["right"]),
+            cond["right"] = field_input(
+                "비교 지표", cond["right"], f"right_{cond['id']}"
             )
     with col6:
         if st.button("❌", key=f"delete_{cond['id']}"):
@@ -178,9 +190,8 @@ if st.button("전략 실행 및 저장"):
         st.json(strategy_data)
 
         # API 요청
-        api_url = f"{API_URL}/save_strategy"
         try:
-            response = requests.post(api_url, json=strategy_data)
+            response = post_json("/save_strategy", strategy_data)
             if response.status_code == 200:
                 st.success("전략 데이터 저장 완료!")
             else:
@@ -1,17 +1,22 @@
 import streamlit as st
-import requests
-import base64
 import json
-from datetime import datetime
-import math
+import numpy as np
+import pandas as pd
+from api_client import PUBLIC_API_URL, get_json, get_json_many
+from shared.symbols_intervals import INTERVAL_MINUTES
+
+# 진입/청산 앞뒤로 보여줄 캔들 수
+PAD_CANDLES = 10
+# 누락 캔들이 있어도 앞뒤 PAD_CANDLES 개가 들어오도록 여유 있게 요청
+FETCH_PAD_CANDLES = PAD_CANDLES * 3
+# 실시간 모드에서 처음에 보여줄 최근 캔들 수
+LIVE_CANDLES = 200
 
-API_URL = st.secrets.get("API_URL", "http://localhost:8082")
 st.set_page_config(layout="wide")
 st.title("전략 기반 캔들 차트 시각화")
 
 # 전략 목록 가져오기
-res = requests.get(f"{API_URL}/filtered-ohlcv")
-filtered_data = res.json() if res.status_code == 200 else []
+filtered_data = get_json("/filtered-ohlcv") or []
 if not filtered_data:
     st.info("전략 데이터가 없습니다.")
     st.stop()
@@ -28,15 +33,15 @@ selected_idx = st.selectbox(
     "전략 선택", range(len(options)), format_func=lambda i: options[i]
 )
 selected = filtered_data[selected_idx]
+symbol, interval = selected["symbol"], selected["interval"]
+pair_scope = f"{symbol}_{interval}"
 
 # 사용된 보조지표
-res = requests.get(
-    f"{API_URL}/filtered-indicators",
+res = get_json(
+    "/filtered-indicators",
     params={"entry_time": selected["entry_time"], "exit_time": selected["exit_time"]},
 )
-what_indicators_raw = (
-    res.json().get("what_indicators", "") if res.status_code == 200 else ""
-)
+what_indicators_raw = res.get("what_indicators", "") if res else ""
 st.markdown(f"**사용된 보조지표:** `{what_indicators_raw or '없음'}`")
 
 
@@ -49,10 +54,10 @@ def expand(ind):
     }.get(ind, [ind])
 
 
-indicators = []
+# /indicator-data 는 그룹(boll/rsi/macd) 단위로 모든 컬럼을 돌려준다
+indicator_groups = []
 if what_indicators_raw:
-    for base in what_indicators_raw.split("and"):
-        indicators.extend(expand(base.strip()))
+    indicator_groups = [base.strip() for base in what_indicators_raw.split("and")]
 
 # 색상 매핑
 color_map = {
@@ -68,115 +73,134 @@ color_map = {
     "boll_ma": "#15A2DA",
 }
 
-# 전체 OHLCV 데이터 가져오기
-res_all = requests.get(f"{API_URL}/ohlcv/{selected['symbol']}/{selected['interval']}")
-all_ohlcv = res_all.json() if res_all.status_code == 200 else []
 
-# entry/exit 기준으로 앞뒤 10개 캔들 포함
-all_ohlcv.sort(key=lambda x: x["timestamp"])
-entry_dt = selected["entry_time"]
-exit_dt = selected["exit_time"]
+def to_epoch(values) -> np.ndarray:
+    # ISO 문자열 배열 -> UTC epoch(초) 배열
+    times = pd.to_datetime(pd.Series(values), utc=True, format="ISO8601")
+    return ((times - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy()
+
+
+def api_time(ts: pd.Timestamp) -> str:
+    # /filtered-candle-data 시간 형식
+    return ts.strftime("%Y-%m-%d %H:%M:%S%z")
 
-entry_idx = next((i for i, x in enumerate(all_ohlcv) if x["timestamp"] >= entry_dt), 0)
-exit_idx = next(
-    (i for i, x in enumerate(all_ohlcv) if x["timestamp"] > exit_dt), len(all_ohlcv)
+
+# 실시간 모드: 최근 캔들을 보여주고 이후 마감되는 캔들은 SSE 로 받는다
+# (브라우저가 직접 연결하므로 외부에서 접근 가능한 PUBLIC_API_URL 이 필요)
+live = bool(PUBLIC_API_URL) and st.toggle("실시간 캔들", value=False)
+
+# 진입/청산 주변 구간만 요청 (전체 히스토리를 받지 않는다)
+entry_ts = pd.Timestamp(selected["entry_time"])
+exit_ts = pd.Timestamp(selected["exit_time"] or selected["entry_time"])
+step = pd.Timedelta(minutes=INTERVAL_MINUTES[interval])
+if live:
+    # 캔들 경계로 맞춰 같은 캔들 안에서는 캐시된 응답을 사용
+    window_end = pd.Timestamp.now(tz="UTC").floor(step) + step
+    window_start = window_end - step * LIVE_CANDLES
+else:
+    window_start = entry_ts - step * FETCH_PAD_CANDLES
+    window_end = exit_ts + step * FETCH_PAD_CANDLES
+window = get_json(
+    "/filtered-candle-data",
+    params={
+        "symbol": symbol,
+        "interval": interval,
+        "entry_time": api_time(window_start),
+        "exit_time": api_time(window_end),
+    },
+    scopes=(pair_scope,),
 )
+if not window:
+    st.info("캔들 데이터가 없습니다.")
+    st.stop()
 
-sliced_ohlcv = all_ohlcv[max(0, entry_idx - 10) : min(len(all_ohlcv), exit_idx + 10)]
-
-ohlc_data = [
-    {
-        "time": int(datetime.fromisoformat(row["timestamp"]).timestamp()),
-        "open": row["open"],
-        "high": row["high"],
-        "low": row["low"],
-        "close": row["close"],
-        "color": (
-            "#999"
-            if row["timestamp"] < entry_dt or row["timestamp"] > exit_dt
-            else None
-        ),
-    }
-    for row in sliced_ohlcv
-]
+candles = pd.DataFrame(window)
+candles["time"] = to_epoch(candles["timestamp"])
+candles = candles.sort_values("time", ignore_index=True)
 
-volume_data = [
-    {
-        "time": int(datetime.fromisoformat(row["timestamp"]).timestamp()),
-        "value": round(math.log(row["volume"] + 1) * 100, 2),
-        "color": (
-            "#999"
-            if row["timestamp"] < entry_dt or row["timestamp"] > exit_dt
-            else ("green" if row["close"] >= row["open"] else "red")
-        ),
-    }
-    for row in sliced_ohlcv
-]
+# 정렬된 epoch 배열에서 이진 탐색으로 진입/청산 위치를 찾는다
+times = candles["time"].to_numpy()
+entry_epoch, exit_epoch = int(entry_ts.timestamp()), int(exit_ts.timestamp())
+entry_idx = int(np.searchsorted(times, entry_epoch, side="left"))
+exit_idx = int(np.searchsorted(times, exit_epoch, side="right"))
+if not live:
+    candles = candles.iloc[
+        max(0, entry_idx - PAD_CANDLES) : min(len(candles), exit_idx + PAD_CANDLES)
+    ]
+in_trade = (candles["time"] >= entry_epoch) & (candles["time"] <= exit_epoch)
+if live:
+    # 최근 구간은 거래와 관계없이 모두 색을 표시
+    in_trade[:] = True
 
-# 보조지표 데이터 요청 (entry-10 ~ exit+10 구간)
-indicator_data = {}
-for ind in indicators:
-    res = requests.get(
-        f"{API_URL}/indicator-data",
-        params={
-            "symbol": selected["symbol"],
-            "interval": selected["interval"],
-            "indicator": ind,
-            "entry_time": sliced_ohlcv[0]["timestamp"],
-            "exit_time": sliced_ohlcv[-1]["timestamp"],
-        },
+# 시리즈별 열 배열 (JS 에서 한 번에 행으로 풀어서 사용)
+payload = {
+    "candles": {
+        "time": candles["time"].tolist(),
+        "open": candles["open"].tolist(),
+        "high": candles["high"].tolist(),
+        "low": candles["low"].tolist(),
+        "close": candles["close"].tolist(),
+        "volume": np.round(np.log1p(candles["volume"].to_numpy()) * 100, 2).tolist(),
+        "inTrade": in_trade.astype(int).tolist(),
+    },
+    "main": [],
+    "sub": {},
+    "stream": None,
+}
+if live:
+    # 마지막 캔들은 아직 진행 중일 수 있어 마감된 값으로 다시 받는다
+    payload["stream"] = (
+        f"{PUBLIC_API_URL}/stream/ohlcv/{symbol}/{interval}"
+        f"?since={int(candles['time'].iloc[-1]) - 1}"
     )
-    if res.status_code == 200:
-        rows = res.json()
-        base = ind.split("_")[0]
-        for row in rows:
-            row_time = datetime.fromisoformat(row["timestamp"])
-            row["color"] = (
-                "#999"
-                if row_time < datetime.fromisoformat(entry_dt)
-                or row_time > datetime.fromisoformat(exit_dt)
-                else None
-            )
-        indicator_data[ind] = rows
+
+# 보조지표 데이터 요청 (entry-10 ~ exit+10 구간, 동시에 요청)
+first_time = candles["timestamp"].iloc[0]
+last_time = candles["timestamp"].iloc[-1]
+responses = get_json_many(
+    [
+        (
+            "/indicator-data",
+            {
+                "symbol": symbol,
+                "interval": interval,
+                "indicator": group,
+                "entry_time": first_time,
+                "exit_time": last_time,
+            },
+        )
+        for group in indicator_groups
+    ],
+    scopes=(pair_scope,),
+)
 
 # main/sub 분리
-main_series = []
-sub_charts = {}
-for name, rows in indicator_data.items():
-    base = name.split("_")[0]
-    points = [
-        {
-            "time": int(datetime.fromisoformat(r["timestamp"]).timestamp()),
-            "value": r["value"],
+for group, rows in zip(indicator_groups, responses):
+    if not rows:
+        continue
+    points = pd.DataFrame(rows)
+    points["time"] = to_epoch(points["timestamp"])
+    for name in expand(group):
+        series = points[points["name"] == name]
+        if series.empty:
+            continue
+        entry = {
+            "name": name,
+            "color": color_map.get(name, "white"),
+            "time": series["time"].tolist(),
+            "value": series["value"].tolist(),
         }
-        for r in rows
-        if r.get("name") == name
-    ]
-    encoded = base64.b64encode(json.dumps(points).encode()).decode()
-    if base in ["rsi", "macd"]:
-        sub_charts.setdefault(base, []).append((name, encoded))
-    else:
-        main_series.append((name, encoded))
-
-
-ohlc_b64 = base64.b64encode(json.dumps(ohlc_data).encode()).decode()
-vol_b64 = base64.b64encode(json.dumps(volume_data).encode()).decode()
-main_js = "\n".join(
-    f'mainChart.addLineSeries({{ color: "{color_map.get(name, "white")}", lineWidth: 1.5 }}).setData(JSON.parse(atob("{data}")));'
-    for name, data in main_series
-)
+        # rsi_signal, rsi(close,21) -> rsi
+        base = name.split("(")[0].split("_")[0]
+        if base in ["rsi", "macd"]:
+            payload["sub"].setdefault(base, []).append(entry)
+        else:
+            payload["main"].append(entry)
+
+sub_charts = list(payload["sub"])
 sub_html = "\n".join(f'<div id="{k}Chart" class="chartArea"></div>' for k in sub_charts)
-sub_js = "\n".join(
-    f"""
-const {k}Chart = createChart("{k}Chart");
-syncCharts.push({k}Chart);
-"""
-    + "\n".join(
-        f'{k}Chart.addLineSeries({{ color: "{color_map.get(name, "white")}", lineWidth: 2 }}).setData(JSON.parse(atob("{data}")));'
-        for name, data in lines
-    )
-    for k, lines in sub_charts.items()
-)
+# </script> 가 데이터 안에 있어도 스크립트가 끊기지 않도록
+payload_json = json.dumps(payload, separators=(",", ":")).replace("</", "<\\/")
 
 html = f"""
 <!DOCTYPE html>
@@ -194,6 +218,7 @@ html, body, #container {{ margin: 0; padding: 0; overflow: hidden; background-co
   {sub_html}
 </div>
 <script>
+const payload = {payload_json};
 const syncCharts = [];
 function createChart(id) {{
     return LightweightCharts.createChart(document.getElementById(id), {{
@@ -204,27 +229,73 @@ function createChart(id) {{
         crosshair: {{ mode: LightweightCharts.CrosshairMode.Normal }}
     }});
 }}
+function linePoints(series) {{
+    return series.time.map((time, i) => ({{ time, value: series.value[i] }}));
+}}
+
+const c = payload.candles;
+const ohlcData = c.time.map((time, i) => ({{
+    time, open: c.open[i], high: c.high[i], low: c.low[i], close: c.close[i],
+    color: c.inTrade[i] ? undefined : '#999'
+}}));
+const volumeData = c.time.map((time, i) => ({{
+    time, value: c.volume[i],
+    color: !c.inTrade[i] ? '#999' : (c.close[i] >= c.open[i] ? 'green' : 'red')
+}}));
 
-const ohlcData = JSON.parse(atob("{ohlc_b64}"));
-const volumeData = JSON.parse(atob("{vol_b64}"));
 const mainChart = createChart("mainChart");
 syncCharts.push(mainChart);
-mainChart.addCandlestickSeries({{
+const candleSeries = mainChart.addCandlestickSeries({{
     upColor: '#26a69a', downColor: '#ef5350',
     borderUpColor: '#26a69a', borderDownColor: '#ef5350',
     wickUpColor: '#26a69a', wickDownColor: '#ef5350'
-}}).setData(ohlcData);
-{main_js}
+}});
+candleSeries.setData(ohlcData);
+const lineSeries = {{}};
+payload.main.forEach(series => {{
+    lineSeries[series.name] = mainChart.addLineSeries({{ color: series.color, lineWidth: 1.5 }});
+    lineSeries[series.name].setData(linePoints(series));
+}});
 
 const volumeChart = createChart("volumeChart");
 syncCharts.push(volumeChart);
-volumeChart.addHistogramSeries({{
+const volumeSeries = volumeChart.addHistogramSeries({{
     upColor: '#26a69a', downColor: '#ef5350',
     borderVisible: false, priceFormat: {{ type: 'volume' }},
     overlay: true
-}}).setData(volumeData);
+}});
+volumeSeries.setData(volumeData);
 
-{sub_js}
+Object.entries(payload.sub).forEach(([key, lines]) => {{
+    const chart = createChart(key + "Chart");
+    syncCharts.push(chart);
+    lines.forEach(series => {{
+        lineSeries[series.name] = chart.addLineSeries({{ color: series.color, lineWidth: 2 }});
+        lineSeries[series.name].setData(linePoints(series));
+    }});
+}});
+
+// 새로 마감된 캔들 하나당 메시지 하나 -> 각 시리즈에 update()
+if (payload.stream) {{
+    let lastTime = c.time.length ? c.time[c.time.length - 1] : 0;
+    const source = new EventSource(payload.stream);
+    source.addEventListener("candle", event => {{
+        const k = JSON.parse(event.data);
+        if (k.time < lastTime) return;
+        lastTime = k.time;
+        candleSeries.update({{ time: k.time, open: k.open, high: k.high, low: k.low, close: k.close }});
+        volumeSeries.update({{
+            time: k.time,
+            value: Math.round(Math.log1p(k.volume) * 10000) / 100,
+            color: k.close >= k.open ? 'green' : 'red'
+        }});
+        Object.entries(lineSeries).forEach(([name, series]) => {{
+            if (k[name] !== null && k[name] !== undefined) {{
+                series.update({{ time: k.time, value: k[name] }});
+            }}
+        }});
+    }});
+}}
 
 syncCharts.forEach(source => {{
     source.timeScale().subscribeVisibleLogicalRangeChange(range => {{
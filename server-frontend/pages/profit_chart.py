@@ -1,15 +1,12 @@
 import streamlit as st
-import requests
 import altair as alt
-
-API_URL = st.secrets.get("API_URL", "http://localhost:8080")
+from api_client import get_json
 
 st.set_page_config(layout="wide")
 st.title("백테스트 결과")
 
-res = requests.get(f"{API_URL}/filtered-time-range")
-if res.status_code == 200:
-    time_range = res.json()
+time_range = get_json("/filtered-time-range")
+if time_range is not None and time_range["start_time"]:
     start_str = time_range["start_time"][:10]
     end_str = time_range["end_time"][:10]
     st.markdown(
@@ -19,12 +16,11 @@ else:
     st.warning("기간 정보를 불러올 수 없습니다.")
 
 st.header("누적 수익률 (%)")
-filtered_res = requests.get(f"{API_URL}/filtered-profit-rate")
-if filtered_res.status_code != 200:
-    st.error(f"전략 목록 불러오기 실패: {filtered_res.status_code}")
+filtered_data = get_json("/filtered-profit-rate")
+if filtered_data is None:
+    st.error("전략 목록 불러오기 실패")
     st.stop()
 
-filtered_data = filtered_res.json()
 if not filtered_data:
     st.warning("저장된 전략 결과가 없습니다.")
     st.stop()
@@ -56,14 +52,64 @@ chart = (
 
 st.altair_chart(chart, use_container_width=True)
 
+# 위험 지표 (결과 버전별로 서버에서 한 번만 계산)
+risk = get_json("/risk-analytics")
+if risk:
+    st.header("낙폭 (%)")
+    drawdown = risk["drawdown_series"]
+    drawdown_chart = (
+        alt.Chart(
+            alt.Data(
+                values=[
+                    {"time": t, "drawdown": d}
+                    for t, d in zip(drawdown["time"], drawdown["drawdown"])
+                ]
+            )
+        )
+        .mark_area(color="#4B8BFF", opacity=0.6)
+        .encode(
+            x=alt.X("time:T", axis=alt.Axis(title=None, labels=False, ticks=False)),
+            y=alt.Y("drawdown:Q", axis=alt.Axis(format=".2f", title=None)),
+        )
+        .properties(width=800, height=200)
+    )
+    st.altair_chart(drawdown_chart, use_container_width=True)
+
+    def ratio(value):
+        return "N/A" if value is None else f"{value:.2f}"
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Sharpe", ratio(risk["sharpe"]))
+        st.metric("Sortino", ratio(risk["sortino"]))
+    with col2:
+        st.metric("Calmar", ratio(risk["calmar"]))
+        cagr = risk["cagr"]
+        st.metric("연 환산 수익률", "N/A" if cagr is None else f"{cagr:+.2f}%")
+    with col3:
+        longest = risk["longest_drawdown"]
+        st.metric("최장 낙폭 기간", f"{longest['days']:.0f}일")
+        st.metric("최장 낙폭 거래 수", longest["trades"])
+    with col4:
+        st.metric("최대 연속 수익", risk["max_win_streak"])
+        st.metric("최대 연속 손실", risk["max_loss_streak"])
+
+    with st.expander("월별 / 연도별 수익률"):
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("월별")
+            st.dataframe(risk["monthly"], use_container_width=True)
+        with col2:
+            st.subheader("연도별")
+            st.dataframe(risk["yearly"], use_container_width=True)
+
 st.header("핵심 통계 요약")
 
-filtered_tp_res = requests.get(f"{API_URL}/filtered-tp-sl-rate")
-if filtered_tp_res.status_code != 200:
-    st.error(f"전략 목록 불러오기 실패: {filtered_tp_res.status_code}")
+filtered_tp_data = get_json("/filtered-tp-sl-rate")
+if filtered_tp_data is None:
+    st.error("전략 목록 불러오기 실패")
     st.stop()
 
-filtered_tp_data = filtered_tp_res.json()
 if not filtered_tp_data:
     st.warning("통계 데이터가 없습니다.")
     st.stop()
@@ -110,3 +156,162 @@ with st.expander("세부 통계량 보기"):
     with col6:
         st.metric("최소 손실", f"{filtered_tp_data.get('loss_max', 0):+.2f}%")
         st.metric("최대 손실", f"{filtered_tp_data.get('loss_min', 0):+.2f}%")
+
+# 여러 실행 비교 (곡선 정렬/다운샘플링은 서버에서, 요청 한 번)
+st.header("실행 비교")
+runs = get_json("/runs") or []
+labels = {
+    run[
+        "run_id"
+    ]: f"#{run['run_id']} {run['strategy']} [{run['symbol']} {run['interval']}]"
+    for run in runs
+}
+selected_runs = st.multiselect(
+    "비교할 실행",
+    list(labels),
+    default=list(labels)[:3],
+    format_func=lambda run_id: labels[run_id],
+)
+if selected_runs:
+    comparison = get_json("/compare-runs", params={"run_ids": tuple(selected_runs)})
+    if comparison is None:
+        st.error("실행 비교 불러오기 실패")
+    else:
+        # long 형식 -> 실행별 색상으로 겹쳐 그린다 (첫 거래 이전 구간은 비움)
+        # 옅은 영역: 격자 구간 안의 최저값 (격자 사이의 낙폭)
+        curves = [
+            {"time": t, "label": run["label"], "cum_profit_rate": value, "low": low}
+            for run in comparison["runs"]
+            for t, value, low in zip(
+                comparison["time"], run["cum_profit_rate"], run["cum_profit_rate_low"]
+            )
+            if value is not None
+        ]
+        base = alt.Chart(alt.Data(values=curves)).encode(
+            x=alt.X("time:T", axis=alt.Axis(title=None)),
+            color=alt.Color("label:N", legend=alt.Legend(title=None, orient="bottom")),
+        )
+        compare_chart = alt.layer(
+            base.mark_area(opacity=0.15).encode(
+                y=alt.Y("low:Q", axis=alt.Axis(format=".2f", title=None)),
+                y2="cum_profit_rate:Q",
+            ),
+            base.mark_line(strokeWidth=2).encode(y="cum_profit_rate:Q"),
+        ).properties(width=800, height=400)
+        st.altair_chart(compare_chart, use_container_width=True)
+
+        stats_names = {
+            "total_count": "총 실행 횟수",
+            "tp_rate": "승률 (%)",
+            "final_profit_rate": "최종 수익률 (%)",
+            "expectancy": "기대 수익률 (%)",
+            "mdd": "MDD (%)",
+            "cagr": "연 환산 수익률 (%)",
+            "sharpe": "Sharpe",
+            "sortino": "Sortino",
+            "calmar": "Calmar",
+            "max_drawdown": "최대 낙폭 (%)",
+        }
+        st.dataframe(
+            {
+                "지표": list(stats_names.values()),
+                **{
+                    run["label"]: [run["stats"].get(key) for key in stats_names]
+                    for run in comparison["runs"]
+                },
+            },
+            use_container_width=True,
+            hide_index=True,
+        )
+
+# 거래 순서 몬테카를로 (시뮬레이션은 서버에서 블록 단위 벡터 연산)
+st.header("몬테카를로 시뮬레이션")
+col1, col2, col3 = st.columns(3)
+with col1:
+    mc_method = st.radio(
+        "방식",
+        ["bootstrap", "permute"],
+        format_func={"bootstrap": "부트스트랩 (복원 추출)", "permute": "순서 섞기"}.get,
+        horizontal=True,
+    )
+with col2:
+    mc_sims = st.select_slider("시뮬레이션 횟수", [1000, 10000, 50000, 100000], 10000)
+with col3:
+    mc_ruin = st.number_input("파산 기준 낙폭 (%)", 5.0, 100.0, 50.0, step=5.0)
+
+simulation = get_json(
+    "/monte-carlo",
+    params={"method": mc_method, "n_sims": mc_sims, "ruin_drawdown": mc_ruin},
+)
+if simulation is None:
+    st.error("몬테카를로 시뮬레이션 불러오기 실패")
+elif simulation["trades"]:
+    bands = simulation["bands"]
+    band_rows = [
+        {
+            "trade": trade,
+            **{key: bands[key][i] for key in bands if key != "trade"},
+        }
+        for i, trade in enumerate(bands["trade"])
+    ]
+    base = alt.Chart(alt.Data(values=band_rows)).encode(
+        x=alt.X("trade:Q", axis=alt.Axis(title="거래 수"))
+    )
+    band_chart = alt.layer(
+        base.mark_area(color="#4B8BFF", opacity=0.2).encode(
+            y=alt.Y("p5:Q", axis=alt.Axis(format=".2f", title=None)), y2="p95:Q"
+        ),
+        base.mark_area(color="#4B8BFF", opacity=0.35).encode(y="p25:Q", y2="p75:Q"),
+        base.mark_line(color="#4B8BFF", strokeWidth=2).encode(y="p50:Q"),
+        base.mark_line(color="#FF4B4B", strokeWidth=2).encode(y="historical:Q"),
+    ).properties(width=800, height=400)
+    st.altair_chart(band_chart, use_container_width=True)
+    st.caption("파란 띠: 5~95 / 25~75 백분위, 파란 선: 중앙값, 빨간 선: 실제 거래 순서")
+
+    final = simulation["final_return"]["percentiles"]
+    mdd = simulation["max_drawdown"]["percentiles"]
+    historical = simulation["historical"]
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("파산 확률", f"{simulation['risk_of_ruin']:.2f}%")
+        st.metric("손실 확률", f"{simulation['prob_loss']:.2f}%")
+    with col2:
+        st.metric("최종 수익률 중앙값", f"{final['p50']:+.2f}%")
+        st.metric("최종 수익률 5% 하위", f"{final['p5']:+.2f}%")
+    with col3:
+        st.metric("MDD 중앙값", f"{mdd['p50']:+.2f}%")
+        st.metric("MDD 5% 최악", f"{mdd['p5']:+.2f}%")
+    with col4:
+        st.metric("실제 MDD", f"{historical['max_drawdown']:+.2f}%")
+        st.metric("실제 MDD 백분위", f"{historical['max_drawdown_rank']:.1f}%")
+
+    with st.expander("최종 수익률 / MDD 분포"):
+        col1, col2 = st.columns(2)
+        for col, key, title in (
+            (col1, "final_return", "최종 수익률 (%)"),
+            (col2, "max_drawdown", "MDD (%)"),
+        ):
+            histogram = simulation[key]["histogram"]
+            edges = histogram["edges"]
+            with col:
+                st.subheader(title)
+                st.altair_chart(
+                    alt.Chart(
+                        alt.Data(
+                            values=[
+                                {"start": start, "end": end, "count": count}
+                                for start, end, count in zip(
+                                    edges, edges[1:], histogram["counts"]
+                                )
+                            ]
+                        )
+                    )
+                    .mark_bar(color="#4B8BFF")
+                    .encode(
+                        x=alt.X("start:Q", axis=alt.Axis(format=".1f", title=None)),
+                        x2="end:Q",
+                        y=alt.Y("count:Q", axis=alt.Axis(title=None)),
+                    )
+                    .properties(height=250),
+                    use_container_width=True,
+                )
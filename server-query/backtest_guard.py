@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from strategy_expr import CompiledStrategy
+
+# 진입 후보가 이보다 많으면 실행하지 않는다 (진입마다 LATERAL 탐색 1회)
+MAX_ENTRIES = int(os.getenv("BACKTEST_MAX_ENTRIES", "20000"))
+# 백테스트 쿼리 1건의 최대 실행 시간
+STATEMENT_TIMEOUT_MS = int(os.getenv("BACKTEST_STATEMENT_TIMEOUT_MS", "30000"))
+# 동시에 실행 가능한 백테스트 수와 대기 시간
+MAX_CONCURRENT = int(os.getenv("BACKTEST_MAX_CONCURRENT", "2"))
+QUEUE_TIMEOUT = float(os.getenv("BACKTEST_QUEUE_TIMEOUT", "10"))
+# EXPLAIN 추정이 한도를 넘을 때 확인용 표본 비율(%)
+SAMPLE_PERCENT = float(os.getenv("BACKTEST_SAMPLE_PERCENT", "5"))
+# 표본 결과를 신뢰할 최소 적중 수 (미만이면 정확히 센다)
+SAMPLE_MIN_HITS = int(os.getenv("BACKTEST_SAMPLE_MIN_HITS", "100"))
+
+_slots = threading.BoundedSemaphore(MAX_CONCURRENT)
+
+
+class BacktestRejected(Exception):
+    # 실행 전/중에 거절된 백테스트 (detail 은 그대로 응답 본문으로 사용)
+    def __init__(self, status_code: int, detail: dict):
+        super().__init__(status_code, detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _entry_query(
+    table_name: str,
+    compiled: CompiledStrategy,
+    time_filter_sql: str,
+    select: str = "1",
+    sample: str = "",
+) -> str:
+    return f"""
+        SELECT {select}
+        FROM "{table_name}" {sample}
+        WHERE {compiled.sql}
+          AND close > low * 1.005
+          {time_filter_sql}
+    """
+
+
+def estimate_entries(
+    conn,
+    table_name: str,
+    compiled: CompiledStrategy,
+    time_filter_sql: str,
+    params: dict,
+) -> tuple[int, str]:
+    # 1) 플래너 추정치 (EXPLAIN), 2) 한도를 넘으면 표본 집계, 3) 표본이 작으면 직접 집계
+    # 추정치가 한도 이하여도 과소추정일 수 있으므로 한도+1 에서 멈추는 집계로 확인
+    # conn: 백테스트와 같은 연결 (apply_statement_timeout + statement_timeout_guard 안에서 호출)
+    query = _entry_query(table_name, compiled, time_filter_sql)
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params).scalar()
+    estimate = int(plan[0]["Plan"]["Plan Rows"])
+    if estimate <= MAX_ENTRIES:
+        capped = conn.execute(
+            text(f"SELECT count(*) FROM ({query} LIMIT :entry_cap) e"),
+            {**params, "entry_cap": MAX_ENTRIES + 1},
+        ).scalar()
+        return int(capped), "count" if capped <= MAX_ENTRIES else "count_capped"
+
+    sample = f"TABLESAMPLE BERNOULLI ({SAMPLE_PERCENT})"
+    query = _entry_query(table_name, compiled, time_filter_sql, "count(*)", sample)
+    sampled = conn.execute(text(query), params).scalar()
+    if sampled >= SAMPLE_MIN_HITS:
+        return int(sampled * 100 / SAMPLE_PERCENT), "sample"
+
+    # 표본에 걸린 행이 적으면 추정 오차가 크므로 직접 센다
+    query = _entry_query(table_name, compiled, time_filter_sql, "count(*)")
+    return int(conn.execute(text(query), params).scalar()), "count"
+
+
+def admit_backtest(estimated_entries: int, method: str, table_name: str):
+    if estimated_entries > MAX_ENTRIES:
+        raise BacktestRejected(
+            422,
+            {
+                "error": "too_many_entries",
+                "message": "전략 조건이 너무 넓습니다. 조건이나 기간을 좁혀주세요.",
+                "table": table_name,
+                "estimated_entries": estimated_entries,
+                "estimate_method": method,
+                "limit": MAX_ENTRIES,
+            },
+        )
+
+
+def apply_statement_timeout(conn):
+    # 현재 트랜잭션에만 적용 (SET LOCAL)
+    conn.execute(
+        text("SELECT set_config('statement_timeout', :timeout, true)"),
+        {"timeout": str(STATEMENT_TIMEOUT_MS)},
+    )
+
+
+@contextmanager
+def statement_timeout_guard(table_name: str):
+    try:
+        yield
+    except OperationalError as e:
+        if "statement timeout" not in str(e):
+            raise
+        raise BacktestRejected(
+            504,
+            {
+                "error": "statement_timeout",
+                "message": "백테스트 쿼리가 제한 시간을 초과했습니다.",
+                "table": table_name,
+                "timeout_ms": STATEMENT_TIMEOUT_MS,
+            },
+        )
+
+
+@contextmanager
+def backtest_slot():
+    # 동시 실행 수 제한 (자리가 날 때까지 QUEUE_TIMEOUT 초 대기)
+    # 포트폴리오도 요청 하나당 한 자리 (페어 동시 실행 수는 PORTFOLIO_MAX_PARALLEL 로 따로 제한)
+    started = time.monotonic()
+    if not _slots.acquire(timeout=QUEUE_TIMEOUT):
+        raise BacktestRejected(
+            429,
+            {
+                "error": "busy",
+                "message": "실행 중인 백테스트가 많습니다. 잠시 후 다시 시도해주세요.",
+                "max_concurrent": MAX_CONCURRENT,
+                "waited_seconds": round(time.monotonic() - started, 2),
+            },
+        )
+    try:
+        yield
+    finally:
+        _slots.release()
@@ -0,0 +1,299 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from shared.connect_db import get_engine
+from shared.symbols_intervals import BASE_INTERVAL, INTERVAL_MINUTES
+from catalog import CATALOG_CHANNEL, rewritten_tables
+from db_listener import listener
+from strategy_expr import CompiledStrategy, is_derived
+from indicator_cache import indicator_cache
+from hot_cache import hot_cache
+
+BASE_COLUMNS = ("open", "high", "low", "close")
+
+# 결과 코드 (SQL 버전의 result 문자열과 대응)
+OPEN, SL, TP = 0, 1, 2
+RESULT_NAMES = np.array(["OPEN", "SL", "TP"])
+
+# 최근 사용한 시계열을 (테이블, 컬럼) 단위로 메모리에 유지
+SERIES_CACHE_SIZE = int(os.getenv("SERIES_CACHE_SIZE", "4"))
+# _series_lock: 캐시/구독 상태만 보호, _series_key_locks: 같은 시계열의 DB 읽기를 한 번만
+_series_cache: OrderedDict[tuple, dict[str, np.ndarray]] = OrderedDict()
+_series_lock = threading.Lock()
+_series_key_locks: dict[tuple, threading.Lock] = {}
+_series_subscribed = False
+# 재계산 알림마다 증가 (읽는 도중 알림이 오면 읽은 결과를 캐시에 넣지 않는다)
+_series_generation = 0
+
+
+def _forget_series(payload: str | None):
+    global _series_generation
+    tables = rewritten_tables(payload)
+    with _series_lock:
+        _series_generation += 1
+        for key in list(_series_cache):
+            if tables is None or key[0] in tables:
+                del _series_cache[key]
+
+
+def _read_series(
+    table_name: str, cols: list[str], since: pd.Timestamp | None = None
+) -> dict[str, np.ndarray]:
+    cols_str = ", ".join(f'"{c}"' for c in ["timestamp", *cols])
+    where = "WHERE timestamp >= :since" if since is not None else ""
+    query = text(f'SELECT {cols_str} FROM "{table_name}" {where} ORDER BY timestamp')
+    params = {"since": since.to_pydatetime()} if since is not None else {}
+
+    with get_engine("analytics").connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+
+    series = {c: df[c].to_numpy(dtype="float64") for c in cols}
+    timestamps = pd.to_datetime(df["timestamp"], utc=True).dt.tz_convert(None)
+    series["timestamp"] = timestamps.to_numpy(dtype="datetime64[ns]").view("int64")
+    return series
+
+
+def _cached_series(table_name: str, cols: list[str]) -> dict[str, np.ndarray]:
+    global _series_subscribed
+    hot = hot_cache.series(table_name)
+    if hot is not None and all(c in hot for c in cols):
+        # 공유 메모리 캐시에 있는 테이블은 복사 없이 그대로 (워커 간 공유)
+        return {c: hot[c] for c in ["timestamp", *cols]}
+    key = (table_name, tuple(cols))
+    with _series_lock:
+        if not _series_subscribed:
+            _series_subscribed = True
+            listener.subscribe(CATALOG_CHANNEL, _forget_series)
+        key_lock = _series_key_locks.setdefault(key, threading.Lock())
+    # 다른 (테이블, 컬럼) 의 DB 읽기는 기다리지 않는다
+    with key_lock:
+        with _series_lock:
+            series = _series_cache.get(key)
+            generation = _series_generation
+        if series is None:
+            series = _read_series(table_name, cols)
+        elif series["timestamp"].size:
+            # 마지막 캔들(갱신 가능)부터 다시 읽어 꼬리만 이어 붙인다
+            last = series["timestamp"].size - 1
+            since = pd.Timestamp(int(series["timestamp"][last]), unit="ns", tz="UTC")
+            tail = _read_series(table_name, cols, since)
+            series = {
+                c: np.concatenate([values[:last], tail[c]])
+                for c, values in series.items()
+            }
+        with _series_lock:
+            if generation == _series_generation:
+                _series_cache[key] = series
+                _series_cache.move_to_end(key)
+                while len(_series_cache) > SERIES_CACHE_SIZE:
+                    _series_cache.popitem(last=False)
+        return series
+
+
+def load_series(
+    table_name: str, columns=(), start_time: str = None
+) -> dict[str, np.ndarray]:
+    # 진입 이후 청산은 종료 시점을 넘어서도 탐색하므로 종료 시간으로 자르지 않는다
+    derived = sorted(c for c in columns if is_derived(c))
+    cols = sorted(set(BASE_COLUMNS) | {c for c in columns if not is_derived(c)})
+    series = _cached_series(table_name, cols)
+    if derived:
+        # 파라미터 지표는 테이블 컬럼이 아니므로 계산 캐시에서 캔들 시각에 맞춰 붙인다
+        series = {
+            **series,
+            **{
+                name: indicator_cache.align(table_name, name, series["timestamp"])
+                for name in derived
+            },
+        }
+    start_ns = to_epoch_ns(start_time)
+    if start_ns is None:
+        return series
+    first = int(np.searchsorted(series["timestamp"], start_ns, side="left"))
+    return {c: values[first:] for c, values in series.items()}
+
+
+def to_epoch_ns(value: str | None) -> int | None:
+    if not value:
+        return None
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return ts.value
+
+
+class RangeExtrema:
+    # 희소 테이블: mins[k][i] = min(low[i : i + 2^k]), maxs[k][i] = max(high[i : i + 2^k])
+    def __init__(self, low: np.ndarray, high: np.ndarray):
+        # 결측값은 어떤 조건에도 걸리지 않도록 처리 (SQL 의 NULL 비교와 동일)
+        # 입력 dtype(float64) 유지: float32 로 줄이면 손절가와 같은 저가가 반올림되어 건너뛴다
+        self.n = low.size
+        self.mins = [np.where(np.isnan(low), np.inf, low)]
+        self.maxs = [np.where(np.isnan(high), -np.inf, high)]
+        k = 1
+        while (1 << k) <= self.n:
+            half = 1 << (k - 1)
+            self.mins.append(np.minimum(self.mins[-1][:-half], self.mins[-1][half:]))
+            self.maxs.append(np.maximum(self.maxs[-1][:-half], self.maxs[-1][half:]))
+            k += 1
+
+    def first_hit(
+        self, start: np.ndarray, stop: np.ndarray, target: np.ndarray
+    ) -> np.ndarray:
+        # start 이후 처음으로 low <= stop 또는 high >= target 인 위치 (없으면 -1)
+        # 모든 진입에 대해 동시에 이진 리프팅으로 조건이 없는 구간을 건너뛴다
+        pos = np.asarray(start, dtype=np.int64).copy()
+        for k in range(len(self.mins) - 1, -1, -1):
+            step = 1 << k
+            idx = np.flatnonzero(pos + step <= self.n)
+            if idx.size == 0:
+                continue
+            p = pos[idx]
+            clear = (self.mins[k][p] > stop[idx]) & (self.maxs[k][p] < target[idx])
+            pos[idx[clear]] += step
+        return np.where(pos < self.n, pos, -1)
+
+
+def simulate_trades(
+    series: dict[str, np.ndarray],
+    entry_idx: np.ndarray,
+    risk_reward_ratio: float,
+    extrema: RangeExtrema | None = None,
+) -> dict[str, np.ndarray]:
+    low, high, close = series["low"], series["high"], series["close"]
+    if extrema is None:
+        extrema = RangeExtrema(low, high)
+
+    entry_price = close[entry_idx]
+    stop_loss = low[entry_idx]
+    take_profit = entry_price + (entry_price - stop_loss) * risk_reward_ratio
+
+    exit_idx = extrema.first_hit(entry_idx + 1, stop_loss, take_profit)
+    has_exit = exit_idx >= 0
+    safe_exit = np.where(has_exit, exit_idx, 0)
+
+    # 같은 캔들에서 둘 다 닿으면 SQL 버전과 동일하게 손절 우선
+    result = np.full(entry_idx.size, OPEN, dtype=np.int8)
+    result[has_exit] = TP
+    result[has_exit & (low[safe_exit] <= stop_loss)] = SL
+
+    non_zero = entry_price != 0
+    safe_price = np.where(non_zero, entry_price, 1.0)
+    profit_rate = np.where(
+        (result == TP) & non_zero,
+        (take_profit - entry_price) / safe_price,
+        np.where(
+            (result == SL) & non_zero, (stop_loss - entry_price) / safe_price, 0.0
+        ),
+    )
+
+    return {
+        "entry_idx": entry_idx,
+        "exit_idx": exit_idx,
+        "entry_price": entry_price,
+        "stop_loss": stop_loss,
+        "take_profit": take_profit,
+        "result": result,
+        "profit_rate": profit_rate * 100,
+    }
+
+
+def find_entries(
+    series: dict[str, np.ndarray],
+    compiled: CompiledStrategy,
+    start_time: str = None,
+    end_time: str = None,
+) -> np.ndarray:
+    mask = compiled.mask(series) & (series["close"] > series["low"] * 1.005)
+    start_ns, end_ns = to_epoch_ns(start_time), to_epoch_ns(end_time)
+    if start_ns is not None:
+        mask &= series["timestamp"] >= start_ns
+    if end_ns is not None:
+        mask &= series["timestamp"] <= end_ns
+    return np.flatnonzero(mask)
+
+
+def intrabar_tp_first(
+    symbol: str,
+    interval: str,
+    bar_time_ns: np.ndarray,
+    stop: np.ndarray,
+    target: np.ndarray,
+) -> np.ndarray:
+    # 한 캔들에서 손절/익절이 모두 닿은 경우, 15m 캔들로 어느 쪽이 먼저였는지 확인
+    # 모든 모호한 캔들을 한 번의 쿼리로 조회한다
+    tp_first = np.zeros(bar_time_ns.size, dtype=bool)
+    if bar_time_ns.size == 0 or interval.lower() == BASE_INTERVAL:
+        return tp_first
+
+    base_table = f"{symbol}_{BASE_INTERVAL}".lower()
+    query = text(f"""
+        SELECT a.idx, m.low, m.high
+        FROM unnest(
+            CAST(:bar_times AS TIMESTAMPTZ[]), CAST(:idx AS INTEGER[])
+        ) AS a(bar_time, idx)
+        JOIN "{base_table}" m
+          ON m.timestamp >= a.bar_time
+         AND m.timestamp < a.bar_time + CAST(:bar_minutes AS INTEGER) * INTERVAL '1 minute'
+        ORDER BY a.idx, m.timestamp
+        """)
+    bar_times = pd.to_datetime(bar_time_ns, unit="ns", utc=True)
+    with get_engine("analytics").connect() as conn:
+        df = pd.read_sql(
+            query,
+            conn,
+            params={
+                "bar_times": bar_times.to_pydatetime().tolist(),
+                "idx": list(range(bar_time_ns.size)),
+                "bar_minutes": INTERVAL_MINUTES[interval.lower()],
+            },
+        )
+    if df.empty:
+        return tp_first
+
+    idx = df["idx"].to_numpy()
+    order = np.arange(idx.size)
+    never = idx.size
+    hit_sl = df["low"].to_numpy(dtype="float64") <= stop[idx]
+    hit_tp = df["high"].to_numpy(dtype="float64") >= target[idx]
+
+    # 캔들별 첫 손절/익절 위치 (같은 15m 캔들에서 둘 다 닿으면 손절 우선 유지)
+    first_sl = np.full(bar_time_ns.size, never)
+    first_tp = np.full(bar_time_ns.size, never)
+    np.minimum.at(first_sl, idx, np.where(hit_sl, order, never))
+    np.minimum.at(first_tp, idx, np.where(hit_tp, order, never))
+    return first_tp < first_sl
+
+
+def resolve_ambiguous_exits(
+    symbol: str, interval: str, series: dict[str, np.ndarray], trades: dict
+):
+    # simulate_trades 결과 중 손절로 처리된 모호한 캔들을 15m 기준으로 다시 판정
+    exit_idx = trades["exit_idx"]
+    safe_exit = np.where(exit_idx >= 0, exit_idx, 0)
+    ambiguous = np.flatnonzero(
+        (trades["result"] == SL) & (series["high"][safe_exit] >= trades["take_profit"])
+    )
+    if ambiguous.size == 0:
+        return
+    tp_first = intrabar_tp_first(
+        symbol,
+        interval,
+        series["timestamp"][exit_idx[ambiguous]],
+        trades["stop_loss"][ambiguous],
+        trades["take_profit"][ambiguous],
+    )
+    flipped = ambiguous[tp_first]
+    trades["result"][flipped] = TP
+    entry_price = trades["entry_price"][flipped]
+    trades["profit_rate"][flipped] = np.where(
+        entry_price != 0,
+        (trades["take_profit"][flipped] - entry_price)
+        / np.where(entry_price != 0, entry_price, 1.0)
+        * 100,
+        0.0,
+    )
@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from shared.connect_db import engine
+from db_listener import listener
+
+CATALOG_CHANNEL = "dataset_catalog"
+# 알림을 받을 수 없을 때(리스너 미연결) 캐시 유지 시간
+CATALOG_TTL = float(os.getenv("CATALOG_TTL", "30"))
+
+
+def rewritten_tables(payload: str | None) -> set[str] | None:
+    # 지표 재계산 작업이 과거 행을 다시 쓴 테이블 (None: 리스너 재연결로 알 수 없음 -> 전부)
+    # 꼬리만 이어 붙이는 캐시는 이 테이블들을 버려야 한다
+    if payload is None:
+        return None
+    data = json.loads(payload)
+    return {data["table"]} if data.get("rewritten") else set()
+
+
+class DatasetCatalog:
+    # 수집기가 관리하는 dataset_catalog 를 메모리에 두고 NOTIFY 로 무효화
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries: dict[tuple[str, str], dict] | None = None
+        self.loaded_at = 0.0
+        self.version = 0
+        self.subscribed = False
+
+    def invalidate(self, payload: str | None = None):
+        with self.lock:
+            self.entries = None
+            self.version += 1
+
+    def _load(self) -> dict[tuple[str, str], dict]:
+        query = text("""
+            SELECT symbol, interval, first_timestamp, last_timestamp,
+                   row_count, gap_count, updated_at
+            FROM dataset_catalog
+            ORDER BY symbol, interval
+            """)
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(query).mappings().all()
+        except ProgrammingError:
+            # 수집기가 아직 카탈로그를 만들지 않은 경우
+            return {}
+        return {
+            (row["symbol"].upper(), row["interval"].lower()): dict(row) for row in rows
+        }
+
+    def all(self) -> dict[tuple[str, str], dict]:
+        with self.lock:
+            if not self.subscribed:
+                self.subscribed = True
+                listener.subscribe(CATALOG_CHANNEL, self.invalidate)
+            expired = (
+                not listener.connected.is_set()
+                and time.monotonic() - self.loaded_at > CATALOG_TTL
+            )
+            if self.entries is None or expired:
+                self.entries = self._load()
+                self.loaded_at = time.monotonic()
+            return self.entries
+
+    def get(self, symbol: str, interval: str) -> dict | None:
+        return self.all().get((symbol.upper(), interval.lower()))
+
+
+def serialize_entry(entry: dict) -> dict:
+    def iso(value):
+        return value.isoformat() if value else None
+
+    return {
+        "symbol": entry["symbol"],
+        "interval": entry["interval"],
+        "start_time": iso(entry["first_timestamp"]),
+        "end_time": iso(entry["last_timestamp"]),
+        "row_count": entry["row_count"],
+        "gap_count": entry["gap_count"],
+        "updated_at": iso(entry["updated_at"]),
+    }
+
+
+dataset_catalog = DatasetCatalog()
+
+
+def table_version(table_name: str) -> list | None:
+    # 수집기 카탈로그의 (행 수, 마지막 캔들 시각) - 없으면 None (캐시는 TTL 마다 꼬리를 확인한다)
+    # updated_at 은 새 행이 없어도 수집 루프마다 바뀌므로 쓰지 않는다 (과거 행 재작성은 rewritten 알림)
+    symbol, interval = table_name.split("_", 1)
+    entry = dataset_catalog.get(symbol, interval)
+    if entry is None or entry["last_timestamp"] is None:
+        return None
+    return [int(entry["row_count"]), entry["last_timestamp"].isoformat()]
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# ✅ shared / testing 을 import 할 수 있도록 저장소 루트를 sys.path에 추가
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from testing.query_fixtures import appended_candle, hot_tables  # noqa: E402,F401
@@ -0,0 +1,84 @@
+import os
+import select
+import threading
+import time
+from collections import defaultdict
+from typing import Callable
+
+import psycopg2
+
+from shared.connect_db import POSTGRES_URL
+
+POLL_TIMEOUT = float(os.getenv("LISTEN_POLL_TIMEOUT", "5"))
+RECONNECT_DELAY = float(os.getenv("LISTEN_RECONNECT_DELAY", "3"))
+
+
+class NotifyListener:
+    # Postgres LISTEN/NOTIFY 를 전용 커넥션 하나로 받아 채널별 콜백에 전달
+    # (재)연결 직후에는 놓친 알림이 있을 수 있으므로 payload=None 으로 한 번 호출
+    def __init__(self):
+        self.callbacks: dict[str, list[Callable[[str | None], None]]] = defaultdict(
+            list
+        )
+        self.lock = threading.Lock()
+        self.thread = None
+        self.connected = threading.Event()
+
+    def subscribe(self, channel: str, callback: Callable[[str | None], None]):
+        with self.lock:
+            self.callbacks[channel].append(callback)
+        self.start()
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(
+                target=self._run, name="notify-listener", daemon=True
+            )
+            self.thread.start()
+
+    def _dispatch(self, channel: str, payload: str | None):
+        with self.lock:
+            callbacks = list(self.callbacks.get(channel, []))
+        for callback in callbacks:
+            try:
+                callback(payload)
+            except Exception as e:
+                print(f"[listener] {channel} 콜백 오류: {repr(e)}")
+
+    def _run(self):
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(POSTGRES_URL)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with self.lock:
+                    channels = list(self.callbacks)
+                with conn.cursor() as cur:
+                    for channel in channels:
+                        cur.execute(f'LISTEN "{channel}"')
+                self.connected.set()
+                for channel in channels:
+                    self._dispatch(channel, None)
+
+                while True:
+                    with self.lock:
+                        if set(self.callbacks) != set(channels):
+                            break  # 새 채널 구독 → 다시 LISTEN
+                    if select.select([conn], [], [], POLL_TIMEOUT) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self._dispatch(notify.channel, notify.payload)
+            except Exception as e:
+                print(f"[listener] 연결 오류: {repr(e)}")
+                time.sleep(RECONNECT_DELAY)
+            finally:
+                self.connected.clear()
+                if conn is not None:
+                    conn.close()
+
+
+listener = NotifyListener()
@@ -1,8 +1,30 @@
+import os
+import json
 import time
+import multiprocessing
+import threading
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from sqlalchemy import text
-from shared.connect_db import engine
+from sqlalchemy.exc import ProgrammingError
+from shared.connect_db import engine, get_engine
+from shared.symbols_intervals import SYMBOLS, INTERVALS, BASE_INTERVAL
+from strategy_expr import compile_strategy
+from signal_index import entry_times_from_index
+from backtest_kernel import find_entries, intrabar_tp_first, load_series
+from backtest_guard import (
+    admit_backtest,
+    apply_statement_timeout,
+    estimate_entries,
+    statement_timeout_guard,
+)
+
+PORTFOLIO_WORKERS = int(os.getenv("PORTFOLIO_WORKERS", str(os.cpu_count() or 4)))
+# 포트폴리오 한 건에서 동시에 실행하는 페어 수 (페어마다 analytics 연결 1개 사용)
+PORTFOLIO_MAX_PARALLEL = int(os.getenv("PORTFOLIO_MAX_PARALLEL", "8"))
+# filtered_stats 에 남기는 최근 실행 수 (실행마다 자본 곡선 배열 전체를 저장하므로)
+STATS_KEEP_RUNS = int(os.getenv("FILTERED_STATS_KEEP_RUNS", "1000"))
 
 
 def run_conditional_lateral_backtest(
@@ -12,33 +34,64 @@ def run_conditional_lateral_backtest(
     risk_reward_ratio: float,
     start_time: str = None,
     end_time: str = None,
+    resolve_intrabar: bool = True,
 ) -> pd.DataFrame:
+    if symbol.upper() not in SYMBOLS or interval.lower() not in INTERVALS:
+        raise ValueError(f"Invalid symbol or interval: {symbol}_{interval}")
     table_name = f"{symbol}_{interval}".lower()
 
-    # ✅ 압축된 지표 그룹 추출
-    groups = [
-        ("rsi", ["rsi", "rsi_signal"]),
-        ("ema_7", ["ema_7"]),
-        ("ema_25", ["ema_25"]),
-        ("ema_99", ["ema_99"]),
-        ("macd", ["macd", "macd_signal"]),
-        ("boll", ["boll_ma", "boll_upper", "boll_lower"]),
-    ]
-    used_indicators = [
-        name for name, keywords in groups if any(k in strategy_sql for k in keywords)
-    ]
+    # ✅ 전략 컴파일 (파라미터 바인딩 + 사용 지표 추출)
+    compiled = compile_strategy(strategy_sql)
     what_indicators_str = (
-        " and ".join(sorted(used_indicators)) if used_indicators else "None"
+        " and ".join(compiled.indicators) if compiled.indicators else "None"
     )
 
     # 기간 필터 조건 추가
     time_conditions = []
     if start_time:
-        time_conditions.append(f"timestamp >= '{start_time}'")
+        time_conditions.append("timestamp >= :start_time")
     if end_time:
-        time_conditions.append(f"timestamp <= '{end_time}'")
+        time_conditions.append("timestamp <= :end_time")
     time_filter_sql = " AND " + " AND ".join(time_conditions) if time_conditions else ""
 
+    params = {
+        "rr_ratio": risk_reward_ratio,
+        "symbol": symbol,
+        "interval": interval,
+        "strategy": compiled.expression,
+        "what_indicators": what_indicators_str,
+        "start_time": start_time,
+        "end_time": end_time,
+        **compiled.params,
+    }
+
+    # ✅ 파라미터 지표(ema(close,50) 등)는 컬럼이 없으므로 계산 캐시로 진입 시점을 구한다
+    # ✅ 자주 쓰는 조건은 비트맵 AND 로 진입 시점을 구해 테이블 스캔을 생략
+    estimate_in_db = False
+    if compiled.derived:
+        series = load_series(table_name, compiled.columns, start_time)
+        entry_idx = find_entries(series, compiled, start_time, end_time)
+        entry_times = (
+            pd.to_datetime(series["timestamp"][entry_idx], unit="ns", utc=True)
+            .to_pydatetime()
+            .tolist()
+        )
+        entry_filter_sql = "timestamp = ANY(:entry_times)"
+        params["entry_times"] = entry_times
+        admit_backtest(len(entry_times), "derived", table_name)
+    elif (
+        entry_times := entry_times_from_index(
+            table_name, compiled, start_time, end_time
+        )
+    ) is not None:
+        entry_filter_sql = "timestamp = ANY(:entry_times)"
+        params["entry_times"] = entry_times
+        admit_backtest(len(entry_times), "bitmap", table_name)
+    else:
+        # 진입 수 확인은 아래에서 백테스트와 같은 연결/제한 시간으로
+        entry_filter_sql = compiled.sql
+        estimate_in_db = True
+
     query = f"""
     SELECT
         e.timestamp AS entry_time,
@@ -46,6 +99,8 @@ def run_conditional_lateral_backtest(
         e.low AS stop_loss,
         e.close + (e.close - e.low) * :rr_ratio AS take_profit,
         x.timestamp AS exit_time,
+        x.low AS exit_low,
+        x.high AS exit_high,
         CASE
             WHEN x.timestamp IS NULL THEN 'OPEN'
             WHEN x.low <= e.low THEN 'SL'
@@ -54,12 +109,12 @@ def run_conditional_lateral_backtest(
         END AS result,
         :symbol AS symbol, 
         :interval AS interval, 
-        '{strategy_sql}' AS strategy,
-        '{what_indicators_str}' AS what_indicators
+        :strategy AS strategy,
+        :what_indicators AS what_indicators
     FROM (
         SELECT timestamp, close, low
         FROM "{table_name}"
-        WHERE {strategy_sql}
+        WHERE {entry_filter_sql}
           AND close > low * 1.005
           {time_filter_sql}
     ) e
@@ -76,16 +131,35 @@ def run_conditional_lateral_backtest(
     ) x ON TRUE;
     """
 
-    with engine.connect() as conn:
+    with statement_timeout_guard(table_name), get_engine("analytics").connect() as conn:
+        apply_statement_timeout(conn)
+        if estimate_in_db:
+            estimate, method = estimate_entries(
+                conn, table_name, compiled, time_filter_sql, params
+            )
+            admit_backtest(estimate, method, table_name)
         df = pd.read_sql(
             text(query),
             conn,
-            params={
-                "rr_ratio": risk_reward_ratio,
-                "symbol": symbol,
-                "interval": interval,
-            },
+            params=params,
+        )
+
+    # 상위 간격에서 손절/익절이 같은 캔들에 모두 닿은 경우 15m 로 순서 확인
+    if resolve_intrabar and interval.lower() != BASE_INTERVAL and not df.empty:
+        ambiguous = np.flatnonzero(
+            (df["result"] == "SL") & (df["exit_high"] >= df["take_profit"])
         )
+        if ambiguous.size:
+            exit_time = pd.to_datetime(df["exit_time"].iloc[ambiguous], utc=True)
+            tp_first = intrabar_tp_first(
+                symbol,
+                interval,
+                exit_time.dt.tz_convert(None).to_numpy("datetime64[ns]").view("int64"),
+                df["stop_loss"].to_numpy(dtype="float64")[ambiguous],
+                df["take_profit"].to_numpy(dtype="float64")[ambiguous],
+            )
+            df.loc[df.index[ambiguous[tp_first]], "result"] = "TP"
+    df = df.drop(columns=["exit_low", "exit_high"])
 
     # 수익률 계산
     non_zero = df["entry_price"] != 0
@@ -106,15 +180,86 @@ def run_conditional_lateral_backtest(
     return df
 
 
-def save_result_to_table(data: pd.DataFrame):
+_portfolio_pool = None
+
+
+def _get_portfolio_pool() -> ProcessPoolExecutor:
+    global _portfolio_pool
+    if _portfolio_pool is None:
+        # 요청 스레드에서 워커를 필요할 때 만들므로 fork 대신 forkserver 사용
+        # (다른 스레드가 잡고 있던 락/커넥션 풀이 자식에 복제되면 첫 조회에서 멈춘다)
+        _portfolio_pool = ProcessPoolExecutor(
+            max_workers=PORTFOLIO_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _portfolio_pool
+
+
+def merge_portfolio_trades(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        return pd.DataFrame()
+
+    # 모든 페어의 거래를 진입 시간 순으로 합쳐 하나의 누적 수익률 곡선 계산
+    df = pd.concat(frames, ignore_index=True)
+    df = df.sort_values(["entry_time", "symbol", "interval"], kind="stable")
+    df = df.reset_index(drop=True)
+    df["cum_profit_rate"] = ((1 + df["profit_rate"] / 100).cumprod() - 1) * 100
+    return df
+
+
+def run_portfolio_backtest(
+    pairs: list[tuple[str, str]],
+    strategy_sql: str,
+    risk_reward_ratio: float,
+    start_time: str = None,
+    end_time: str = None,
+) -> tuple[pd.DataFrame, dict]:
+    pairs = list(dict.fromkeys((s.upper(), i.lower()) for s, i in pairs))
+    if not pairs:
+        raise ValueError("No symbol/interval pairs")
+    for symbol, interval in pairs:
+        if symbol not in SYMBOLS or interval not in INTERVALS:
+            raise ValueError(f"Invalid symbol or interval: {symbol}_{interval}")
+    # 잘못된 전략은 워커에 보내기 전에 거절
+    compile_strategy(strategy_sql)
+
+    # 페어별 백테스트를 프로세스 풀에서 병렬 실행 (전체 시간 ≈ 가장 느린 페어)
+    # 동시에 도는 페어는 PORTFOLIO_MAX_PARALLEL 개까지 (analytics 연결/DB 부하 제한)
+    pool = _get_portfolio_pool()
+    running = threading.Semaphore(PORTFOLIO_MAX_PARALLEL)
+    futures = []
+    for symbol, interval in pairs:
+        running.acquire()
+        future = pool.submit(
+            run_conditional_lateral_backtest,
+            symbol,
+            interval,
+            strategy_sql,
+            risk_reward_ratio,
+            start_time,
+            end_time,
+        )
+        future.add_done_callback(lambda _: running.release())
+        futures.append(future)
+    frames = [future.result() for future in futures]
+
+    pair_statics = {
+        f"{symbol}_{interval}": compute_statics(df)
+        for (symbol, interval), df in zip(pairs, frames)
+    }
+    return merge_portfolio_trades(frames), pair_statics
+
+
+def save_result_to_table(data: pd.DataFrame, statics: dict | None = None):
     if data.empty:
         print("저장할 결과가 없습니다.")
         return
 
     table_name = "filtered"
     create_table_query = f"""
-    CREATE TABLE IF NOT EXISTS {table_name} (
-        entry_time TIMESTAMPTZ PRIMARY KEY,
+    CREATE TABLE {table_name} (
+        entry_time TIMESTAMPTZ,
         entry_price DOUBLE PRECISION,
         stop_loss DOUBLE PRECISION,
         take_profit DOUBLE PRECISION,
@@ -125,102 +270,231 @@ def save_result_to_table(data: pd.DataFrame):
         strategy TEXT,
         what_indicators TEXT,
         profit_rate DOUBLE PRECISION,
-        cum_profit_rate DOUBLE PRECISION
+        cum_profit_rate DOUBLE PRECISION,
+        PRIMARY KEY (entry_time, symbol, interval)
     );
     """
 
+    # 결과 저장 시점에 통계/누적 수익률 곡선을 한 번만 계산해 둔다
+    if statics is None:
+        statics = compute_statics(data)
+
+    # 포트폴리오 결과는 같은 진입 시간에 여러 페어가 있을 수 있어 키를 다시 잡는다
+    # 교체/적재/통계 저장을 한 트랜잭션으로 -> 읽는 쪽은 이전 결과 또는 새 결과만 본다
     with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
         conn.execute(text(create_table_query))
-        conn.execute(text(f"DELETE FROM {table_name}"))
-
-    data.to_sql(table_name, engine, if_exists="append", index=False)
+        data.to_sql(table_name, conn, if_exists="append", index=False)
+        save_statics_to_table(data, statics, conn)
     print(f"→ '{table_name}' 테이블에 데이터 저장 완료 (기존 데이터는 초기화)")
 
 
-def calculate_statics() -> dict:
-    table_name = "filtered"
-    query = f'SELECT * FROM "{table_name}"'
+EMPTY_STATICS = {
+    "total_count": 0,
+    "tp_count": 0,
+    "sl_count": 0,
+    "tp_rate": 0.0,
+    "expectancy": 0.0,
+    "profit_mean": 0.0,
+    "profit_std": 0.0,
+    "profit_min": 0.0,
+    "profit_max": 0.0,
+    "loss_mean": 0.0,
+    "loss_std": 0.0,
+    "loss_min": 0.0,
+    "loss_max": 0.0,
+    "profit_rate_mean": 0.0,
+    "profit_rate_std": 0.0,
+    "profit_rate_min": 0.0,
+    "profit_rate_max": 0.0,
+    "mdd": 0.0,
+    "low_time": None,
+    "high_time": None,
+    "final_profit_rate": 0.0,
+}
+
+
+def _describe(values: np.ndarray) -> tuple[float, float, float, float]:
+    # (mean, std, min, max), 값이 없으면 0.0 (JSONB 는 NaN 을 저장할 수 없음)
+    if values.size == 0:
+        return 0.0, 0.0, 0.0, 0.0
+    std = float(values.std(ddof=1)) if values.size > 1 else 0.0
+    return float(values.mean()), std, float(values.min()), float(values.max())
 
-    with engine.connect() as conn:
-        df = pd.read_sql(text(query), conn)
 
+def compute_statics(df: pd.DataFrame) -> dict:
     if df.empty:
-        return {
-            "total_count": 0,
-            "tp_count": 0,
-            "sl_count": 0,
-            "tp_rate": 0.0,
-            "expectancy": 0.0,
-            "profit_mean": 0.0,
-            "profit_std": 0.0,
-            "profit_min": 0.0,
-            "profit_max": 0.0,
-            "loss_mean": 0.0,
-            "loss_std": 0.0,
-            "loss_min": 0.0,
-            "loss_max": 0.0,
-            "profit_rate_mean": 0.0,
-            "profit_rate_std": 0.0,
-            "profit_rate_min": 0.0,
-            "profit_rate_max": 0.0,
-            "mdd": 0.0,
-            "low_time": None,
-            "high_time": None,
-            "final_profit_rate": 0.0,
-        }
-
-    total_count = df["result"].isin(["TP", "SL"]).sum()
-    tp_count = (df["result"] == "TP").sum()
-    sl_count = (df["result"] == "SL").sum()
-    tp_rate = tp_count * 100 / total_count if total_count else 0
-
-    df_profit = df[df["result"] == "TP"]["profit_rate"]
-    df_loss = df[df["result"] == "SL"]["profit_rate"]
-    df_rate = df[df["result"].isin(["TP", "SL"])]
+        return dict(EMPTY_STATICS)
+
+    result = df["result"].to_numpy()
+    profit_rate = df["profit_rate"].to_numpy(dtype="float64")
+    cum_profit_rate = df["cum_profit_rate"].to_numpy(dtype="float64")
+    entry_time = pd.to_datetime(df["entry_time"], utc=True)
+
+    is_tp = result == "TP"
+    is_sl = result == "SL"
+    tp_count = int(is_tp.sum())
+    sl_count = int(is_sl.sum())
+    total_count = tp_count + sl_count
+    tp_rate = tp_count * 100 / total_count if total_count else 0.0
+
+    profit_mean, profit_std, profit_min, profit_max = _describe(profit_rate[is_tp])
+    loss_mean, loss_std, loss_min, loss_max = _describe(profit_rate[is_sl])
+    rate_mean, rate_std, rate_min, rate_max = _describe(profit_rate[is_tp | is_sl])
 
     expectancy = (
-        (tp_count * df_profit.mean() + sl_count * df_loss.mean()) / total_count
+        (tp_count * profit_mean + sl_count * loss_mean) / total_count
         if total_count
-        else 0
+        else 0.0
     )
 
-    cum_max = df["cum_profit_rate"].cummax()
-    drawdown = df["cum_profit_rate"] - cum_max
-    low_idx = drawdown.idxmin()
-    high_idx = df.loc[:low_idx, "cum_profit_rate"].idxmax()
+    # MDD: 누적 수익률 곡선의 고점 대비 최대 하락
+    cum_max = np.maximum.accumulate(cum_profit_rate)
+    low_idx = int(np.argmin(cum_profit_rate - cum_max))
+    high_idx = int(np.argmax(cum_profit_rate[: low_idx + 1]))
 
-    low_price = df.loc[low_idx, "cum_profit_rate"] * 0.01 + 1
-    high_price = df.loc[high_idx, "cum_profit_rate"] * 0.01 + 1
+    low_price = cum_profit_rate[low_idx] * 0.01 + 1
+    high_price = cum_profit_rate[high_idx] * 0.01 + 1
     mdd = (low_price - high_price) * 100 / high_price if high_price != 0 else -100.0
 
     return {
-        "total_count": int(total_count),
-        "tp_count": int(tp_count),
-        "sl_count": int(sl_count),
+        "total_count": total_count,
+        "tp_count": tp_count,
+        "sl_count": sl_count,
         "tp_rate": float(tp_rate),
-        "profit_mean": df_profit.mean() or 0.0,
-        "profit_std": df_profit.std() or 0.0,
-        "profit_min": df_profit.min() or 0.0,
-        "profit_max": df_profit.max() or 0.0,
-        "loss_mean": df_loss.mean() or 0.0,
-        "loss_std": df_loss.std() or 0.0,
-        "loss_min": df_loss.min() or 0.0,
-        "loss_max": df_loss.max() or 0.0,
-        "profit_rate_mean": df_rate["profit_rate"].mean() or 0.0,
-        "profit_rate_std": df_rate["profit_rate"].std() or 0.0,
-        "profit_rate_min": df_rate["profit_rate"].min() or 0.0,
-        "profit_rate_max": df_rate["profit_rate"].max() or 0.0,
-        "expectancy": expectancy,
+        "profit_mean": profit_mean,
+        "profit_std": profit_std,
+        "profit_min": profit_min,
+        "profit_max": profit_max,
+        "loss_mean": loss_mean,
+        "loss_std": loss_std,
+        "loss_min": loss_min,
+        "loss_max": loss_max,
+        "profit_rate_mean": rate_mean,
+        "profit_rate_std": rate_std,
+        "profit_rate_min": rate_min,
+        "profit_rate_max": rate_max,
+        "expectancy": float(expectancy),
         "mdd": float(mdd),
         "low_time": (
-            df.loc[low_idx, "entry_time"].date().isoformat()
-            if isinstance(df.loc[low_idx, "entry_time"], pd.Timestamp)
+            entry_time.iloc[low_idx].date().isoformat()
+            if not pd.isna(entry_time.iloc[low_idx])
             else None
         ),
         "high_time": (
-            df.loc[high_idx, "entry_time"].date().isoformat()
-            if isinstance(df.loc[high_idx, "entry_time"], pd.Timestamp)
+            entry_time.iloc[high_idx].date().isoformat()
+            if not pd.isna(entry_time.iloc[high_idx])
             else None
         ),
-        "final_profit_rate": df["cum_profit_rate"].iloc[-1],
+        "final_profit_rate": float(cum_profit_rate[-1]),
     }
+
+
+def save_statics_to_table(data: pd.DataFrame, statics: dict, conn):
+    table_name = "filtered_stats"
+    create_table_query = f"""
+    CREATE TABLE IF NOT EXISTS {table_name} (
+        run_id BIGSERIAL PRIMARY KEY,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        symbol TEXT,
+        interval TEXT,
+        strategy TEXT,
+        stats JSONB NOT NULL,
+        equity_time DOUBLE PRECISION[],
+        profit_rate DOUBLE PRECISION[],
+        cum_profit_rate DOUBLE PRECISION[]
+    );
+    """
+    insert_query = f"""
+    INSERT INTO {table_name} (
+        symbol, interval, strategy, stats,
+        equity_time, profit_rate, cum_profit_rate
+    )
+    VALUES (
+        :symbol, :interval, :strategy, CAST(:stats AS JSONB),
+        :equity_time, :profit_rate, :cum_profit_rate
+    )
+    """
+    # 최근 STATS_KEEP_RUNS 개만 유지 (INSERT 와 같은 트랜잭션)
+    prune_query = f"""
+    DELETE FROM {table_name}
+    WHERE run_id <= (SELECT MAX(run_id) FROM {table_name}) - :keep
+    """
+
+    # 누적 수익률 곡선은 epoch(초) 배열로 압축 저장
+    entry_time = pd.to_datetime(data["entry_time"], utc=True)
+    equity_time = (entry_time - pd.Timestamp(0, tz="UTC")).dt.total_seconds()
+
+    conn.execute(text(create_table_query))
+    conn.execute(
+        text(insert_query),
+        {
+            "symbol": ",".join(sorted(data["symbol"].astype(str).unique())),
+            "interval": ",".join(sorted(data["interval"].astype(str).unique())),
+            "strategy": str(data["strategy"].iloc[0]),
+            "stats": json.dumps(statics),
+            "equity_time": equity_time.tolist(),
+            "profit_rate": data["profit_rate"].astype("float64").tolist(),
+            "cum_profit_rate": data["cum_profit_rate"].astype("float64").tolist(),
+        },
+    )
+    conn.execute(text(prune_query), {"keep": STATS_KEEP_RUNS})
+
+
+def load_latest_run() -> dict | None:
+    query = """
+        SELECT run_id, created_at, stats, equity_time, profit_rate, cum_profit_rate
+        FROM filtered_stats
+        ORDER BY run_id DESC
+        LIMIT 1
+    """
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(text(query)).mappings().fetchone()
+    except ProgrammingError:
+        # 아직 통계 테이블이 없는 경우 (결과 저장 이전)
+        return None
+    return dict(row) if row else None
+
+
+def latest_run_id() -> int:
+    # 결과가 새로 저장될 때마다 증가 (프론트엔드 캐시 키)
+    try:
+        with engine.connect() as conn:
+            run_id = conn.execute(
+                text("SELECT MAX(run_id) FROM filtered_stats")
+            ).scalar()
+    except ProgrammingError:
+        return 0
+    return run_id or 0
+
+
+def load_statics() -> dict:
+    run = load_latest_run()
+    if run is None:
+        return calculate_statics()
+    return run["stats"]
+
+
+def load_profit_rate() -> list | None:
+    run = load_latest_run()
+    if run is None:
+        return None
+
+    entry_time = pd.to_datetime(
+        np.asarray(run["equity_time"], dtype="float64"), unit="s", utc=True
+    ).astype(str)
+    return [
+        {"entry_time": t, "profit_rate": p, "cum_profit_rate": c}
+        for t, p, c in zip(entry_time, run["profit_rate"], run["cum_profit_rate"])
+    ]
+
+
+def calculate_statics() -> dict:
+    table_name = "filtered"
+    query = f'SELECT * FROM "{table_name}" ORDER BY entry_time'
+
+    with engine.connect() as conn:
+        df = pd.read_sql(text(query), conn)
+
+    return compute_statics(df)
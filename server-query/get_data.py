@@ -1,7 +1,45 @@
+import json
+import math
 import pandas as pd
 import numpy as np
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Iterator
 from sqlalchemy import text
-from shared.connect_db import engine
+from shared.connect_db import get_engine
+from perf import span
+from hot_cache import hot_cache
+
+STREAM_BATCH_SIZE = 5000
+
+WRITER_TABLES = {"filtered"}
+
+OHLCV_COLUMNS = [
+    "timestamp",
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+]
+
+FILTERED_COLUMNS = [
+    "entry_time",
+    "exit_time",
+    "symbol",
+    "interval",
+    "entry_price",
+    "stop_loss",
+    "take_profit",
+]
+
+EXPORT_COLUMNS = FILTERED_COLUMNS + [
+    "result",
+    "profit_rate",
+    "cum_profit_rate",
+    "strategy",
+    "what_indicators",
+]
 
 
 def wrap_strs_with_quote(x: str | list[str]) -> str:
@@ -10,20 +48,31 @@ def wrap_strs_with_quote(x: str | list[str]) -> str:
     return ", ".join([f'"{col}"' for col in x])
 
 
-def get_data_from_table(
+def _engine_for(table_name: str):
+    # 백테스트 결과는 저장 직후 조회되므로 primary, 시세 데이터는 reader (복제본 가능)
+    return get_engine("writer" if table_name in WRITER_TABLES else "reader")
+
+
+def _hot_frame(table_name, return_type, order_by, filter, min_value, max_value):
+    # 공유 메모리 캐시에 있는 시세 테이블은 DB 대신 mmap 배열에서 (timestamp 순 정렬/구간 조회만)
+    if table_name in WRITER_TABLES or isinstance(return_type, str):
+        return None
+    if filter not in (None, "timestamp") or (order_by or return_type[0]) != "timestamp":
+        return None
+    return hot_cache.frame(table_name, return_type, min_value, max_value)
+
+
+def build_select_query(
     table_name: str,
     return_type: str | list[str],
     order_by: str | None = None,
     filter: str | None = None,  # Optional, single key
     min_value=None,
     max_value=None,
-) -> list:
-
+):
     COLS = wrap_strs_with_quote(return_type)
     params = {}
     where_clause = ""
-    # empty df
-    df = pd.DataFrame()
 
     if order_by is None:
         # set default sort by first col of return type
@@ -52,32 +101,130 @@ def get_data_from_table(
     query = text(
         f'SELECT {COLS} FROM "{table_name}" {where_clause} ORDER BY "{order_by}"'
     )
-    try:
-        with engine.connect() as conn:
-            df = pd.read_sql(
-                query,
-                conn,
-                params=params,
-            )
-    except Exception as e:
-        print(e)
+    return query, params
+
+
+def get_data_from_table(
+    table_name: str,
+    return_type: str | list[str],
+    order_by: str | None = None,
+    filter: str | None = None,  # Optional, single key
+    min_value=None,
+    max_value=None,
+) -> list:
+
+    query, params = build_select_query(
+        table_name, return_type, order_by, filter, min_value, max_value
+    )
+    # empty df
+    df = pd.DataFrame()
+
+    hot = _hot_frame(table_name, return_type, order_by, filter, min_value, max_value)
+    if hot is not None:
+        df = hot
+    else:
+        try:
+            with _engine_for(table_name).connect() as conn:
+                df = pd.read_sql(
+                    query,
+                    conn,
+                    params=params,
+                )
+        except Exception as e:
+            print(e)
 
     if df.empty:
         return []
 
-    df.replace([np.inf, -np.inf], np.nan, inplace=True)
-    df = df.where(pd.notnull(df), None)
-
-    # omit row with NULL value
-    df = df.dropna(how="any", axis=0)
+    with span("pandas"):
+        df.replace([np.inf, -np.inf], np.nan, inplace=True)
+        df = df.where(pd.notnull(df), None)
+
+        # omit row with NULL value
+        df = df.dropna(how="any", axis=0)
+
+        # convert timestamptz to str (ISO 8601)
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.DatetimeTZDtype):
+                # detects pandas datetime
+                df[col] = df[col].astype(str)
+
+        return df.to_dict(orient="records")
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        # get_data_from_table 과 같은 형식 (UTC, "YYYY-MM-DD HH:MM:SS+00:00")
+        return str(value.astimezone(timezone.utc))
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _is_missing(value) -> bool:
+    if isinstance(value, float):
+        return not math.isfinite(value)
+    if isinstance(value, Decimal):
+        return not value.is_finite()
+    return value is None
+
+
+def _stream_frame(df: pd.DataFrame, dropna: bool, batch_size: int) -> Iterator[str]:
+    # stream_data_from_table 과 같은 형식으로 DataFrame 을 batch_size 씩 내보낸다
+    for start in range(0, len(df), batch_size):
+        batch = df.iloc[start : start + batch_size]
+        if dropna:
+            batch = batch.dropna(how="any")
+        lines = [
+            json.dumps(
+                {
+                    col: None if _is_missing(v) else _json_value(v)
+                    for col, v in record.items()
+                },
+                ensure_ascii=False,
+            )
+            + "\n"
+            for record in batch.to_dict(orient="records")
+        ]
+        if lines:
+            yield "".join(lines)
 
-    # convert timestamptz to str (ISO 8601)
-    for col in df.columns:
-        if isinstance(df[col].dtype, pd.DatetimeTZDtype):
-            # detects pandas datetime
-            df[col] = df[col].astype(str)
 
-    return df.to_dict(orient="records")
+def stream_data_from_table(
+    table_name: str,
+    return_type: str | list[str],
+    order_by: str | None = None,
+    filter: str | None = None,  # Optional, single key
+    min_value=None,
+    max_value=None,
+    dropna: bool = True,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> Iterator[str]:
+    # 서버 측 커서로 batch_size 씩 읽어 NDJSON 으로 바로 내보낸다 (메모리 일정)
+    hot = _hot_frame(table_name, return_type, order_by, filter, min_value, max_value)
+    if hot is not None:
+        yield from _stream_frame(hot, dropna, batch_size)
+        return
+    query, params = build_select_query(
+        table_name, return_type, order_by, filter, min_value, max_value
+    )
+    with _engine_for(table_name).connect().execution_options(
+        stream_results=True, max_row_buffer=batch_size
+    ) as conn:
+        result = conn.execute(query, params)
+        columns = list(result.keys())
+        while rows := result.fetchmany(batch_size):
+            lines = []
+            for row in rows:
+                if dropna and any(_is_missing(v) for v in row):
+                    continue
+                record = {
+                    col: None if _is_missing(v) else _json_value(v)
+                    for col, v in zip(columns, row)
+                }
+                lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+            if lines:
+                yield "".join(lines)
 
 
 def get_ohlcv_data(
@@ -89,18 +236,10 @@ def get_ohlcv_data(
 ) -> list:
 
     table_name = f"{symbol}_{interval}".lower()
-    return_type = [
-        "timestamp",
-        "open",
-        "high",
-        "low",
-        "close",
-        "volume",
-    ]
 
     return get_data_from_table(
         table_name=table_name,
-        return_type=return_type,
+        return_type=OHLCV_COLUMNS,
         filter=filter,
         min_value=min_value,
         max_value=max_value,
@@ -108,17 +247,7 @@ def get_ohlcv_data(
 
 
 def get_filtered_data() -> list:
-    table_name = "filtered"
-    return_type = [
-        "entry_time",
-        "exit_time",
-        "symbol",
-        "interval",
-        "entry_price",
-        "stop_loss",
-        "take_profit",
-    ]
     return get_data_from_table(
-        table_name=table_name,
-        return_type=return_type,
+        table_name="filtered",
+        return_type=FILTERED_COLUMNS,
     )
@@ -0,0 +1,387 @@
+import fcntl
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from shared.connect_db import get_engine
+from catalog import CATALOG_CHANNEL, rewritten_tables, table_version
+from db_listener import listener
+
+# 자주 읽는 테이블을 컬럼별 파일로 공유 메모리(/dev/shm)에 두고 모든 워커 프로세스가 mmap 으로 읽는다
+# (multiprocessing.shared_memory 는 만든 프로세스가 끝나면 정리되므로 워커 간 공유에는 파일을 쓴다)
+HOT_TABLES = [
+    t.strip().lower()
+    for t in os.getenv("HOT_CACHE_TABLES", "btc_15m,btc_1h,eth_15m,eth_1h").split(",")
+    if t.strip()
+]
+HOT_CACHE_DIR = os.getenv(
+    "HOT_CACHE_DIR",
+    "/dev/shm/hot_ohlcv" if os.path.isdir("/dev/shm") else "/tmp/hot_ohlcv",
+)
+HOT_CACHE_BYTES = int(os.getenv("HOT_CACHE_MB", "512")) * 2**20
+# 시작 시 적재에 쓰는 최대 시간 (넘으면 남은 테이블은 DB 에서 읽는다)
+HOT_CACHE_WARMUP_SECONDS = float(os.getenv("HOT_CACHE_WARMUP_SECONDS", "60"))
+# 카탈로그에 없는 테이블(데이터 버전 없음)은 이 간격마다만 꼬리를 확인한다
+UNVERSIONED_TTL_SECONDS = float(os.getenv("HOT_CACHE_UNVERSIONED_TTL_SECONDS", "5"))
+# 추가될 캔들을 위한 여유 공간
+GROWTH = 1.25
+MIN_SPARE_ROWS = 4096
+
+
+def _epoch_ns(value) -> int:
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return ts.value
+
+
+def _read_table(table_name: str, since_ns: int | None = None) -> dict[str, np.ndarray]:
+    # 전체 컬럼 (timestamp -> epoch ns, 나머지 -> float64: 드라이버가 돌려주는 값 그대로)
+    where = "WHERE timestamp >= :since" if since_ns is not None else ""
+    query = text(f'SELECT * FROM "{table_name}" {where} ORDER BY timestamp')
+    params = {}
+    if since_ns is not None:
+        params["since"] = pd.Timestamp(since_ns, unit="ns", tz="UTC").to_pydatetime()
+    with get_engine("analytics").connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    timestamps = pd.to_datetime(df["timestamp"], utc=True).dt.tz_convert(None)
+    columns = {"timestamp": timestamps.to_numpy(dtype="datetime64[ns]").view("int64")}
+    for col in df.columns:
+        if col != "timestamp":
+            columns[col] = df[col].to_numpy(dtype="float64")
+    return columns
+
+
+class _FileLock:
+    # 워커 프로세스 간 적재/추가를 한 곳에서만 하도록 (같은 프로세스 안은 table_locks)
+    def __init__(self, path: str):
+        self.path = path
+
+    def __enter__(self):
+        self.file = open(self.path, "a+")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.file, fcntl.LOCK_UN)
+        self.file.close()
+
+
+class HotCache:
+    # 테이블별 디렉토리: meta.json (행 수/용량/세대/데이터 버전) + 세대별 컬럼 파일 {세대}-{컬럼}.bin
+    # - 새 캔들은 빈 공간에 쓴 뒤 meta 의 행 수를 바꿔 공개 (읽는 쪽은 공개된 행까지만 본다)
+    # - 용량이 부족하거나 전체를 다시 읽으면 새 세대 파일을 만들고 이전 파일은 지운다
+    #   (이미 mmap 한 프로세스는 지워진 파일도 계속 읽을 수 있다)
+    def __init__(
+        self,
+        directory: str = HOT_CACHE_DIR,
+        tables=HOT_TABLES,
+        max_bytes: int = HOT_CACHE_BYTES,
+    ):
+        self.directory = directory
+        self.tables = list(tables)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # 적재/추가는 테이블별로 (한 테이블을 읽는 동안 다른 테이블 조회를 막지 않도록)
+        self.table_locks = {name: threading.Lock() for name in self.tables}
+        self.mapped: dict[str, tuple[int, dict[str, np.memmap]]] = {}
+        # 과거 행이 다시 쓰인 테이블 -> 알림 받은 시각 (그 이후 적재된 것만 유효)
+        self.rewritten: dict[str, float] = {}
+        self.skipped: dict[str, str] = {}
+        self.counters = {"hits": 0, "appends": 0, "loads": 0, "misses": 0}
+        self.subscribed = False
+
+    def _table_dir(self, table_name: str) -> str:
+        return os.path.join(self.directory, table_name)
+
+    def _meta(self, table_name: str) -> dict | None:
+        try:
+            with open(os.path.join(self._table_dir(table_name), "meta.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, table_name: str, meta: dict):
+        path = os.path.join(self._table_dir(table_name), "meta.json")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def _column_path(self, table_name: str, generation: int, column: str) -> str:
+        return os.path.join(self._table_dir(table_name), f"{generation}-{column}.bin")
+
+    def _open(self, table_name: str, meta: dict, mode: str) -> dict[str, np.memmap]:
+        return {
+            col: np.memmap(
+                self._column_path(table_name, meta["generation"], col),
+                dtype=dtype,
+                mode=mode,
+                shape=(meta["capacity"],),
+            )
+            for col, dtype in meta["columns"].items()
+        }
+
+    def _used_bytes(self, exclude: str | None = None) -> int:
+        total = 0
+        for name in self.tables:
+            meta = self._meta(name) if name != exclude else None
+            if meta is not None:
+                total += meta["capacity"] * 8 * len(meta["columns"])
+        return total
+
+    def _write_generation(
+        self, table_name: str, columns: dict, version, previous, loaded_at: float
+    ):
+        # 새 세대 파일에 전체를 쓰고 meta 교체 -> 이전 세대 파일 삭제
+        rows = columns["timestamp"].size
+        capacity = max(int(rows * GROWTH), rows + MIN_SPARE_ROWS)
+        if (
+            self._used_bytes(exclude=table_name) + capacity * 8 * len(columns)
+            > self.max_bytes
+        ):
+            self.skipped[table_name] = "memory budget"
+            return None
+        generation = (previous["generation"] + 1) if previous else 1
+        meta = {
+            "columns": {col: str(values.dtype) for col, values in columns.items()},
+            "rows": rows,
+            "capacity": capacity,
+            "generation": generation,
+            "version": version,
+            "loaded_at": loaded_at,
+            "synced_at": time.time(),
+        }
+        for col, target in self._open(table_name, meta, "w+").items():
+            target[:rows] = columns[col]
+            target.flush()
+        self._write_meta(table_name, meta)
+        if previous:
+            for col in previous["columns"]:
+                try:
+                    os.remove(
+                        self._column_path(table_name, previous["generation"], col)
+                    )
+                except OSError:
+                    pass
+        self.skipped.pop(table_name, None)
+        return meta
+
+    def _load(self, table_name: str, previous: dict | None):
+        self._count("loads")
+        version = table_version(table_name)
+        loaded_at = time.time()
+        return self._write_generation(
+            table_name, _read_table(table_name), version, previous, loaded_at
+        )
+
+    def _append(self, table_name: str, meta: dict, version) -> dict | None:
+        # 마지막 캔들(수집기가 갱신)부터 다시 읽어 이어 쓴다 (중간 기록이 바뀌었으면 None -> 전체 적재)
+        rows = meta["rows"]
+        if not rows:
+            return None
+        files = self._open(table_name, meta, "r+")
+        last = int(files["timestamp"][rows - 1])
+        tail = _read_table(table_name, last)
+        if tail["timestamp"].size == 0:
+            return None
+        if tail["timestamp"][0] != last or set(tail) != set(meta["columns"]):
+            return None
+        total = rows - 1 + tail["timestamp"].size
+        if version is not None and total < version[0]:
+            return None
+        self._count("appends")
+        last_changed = any(
+            files[col][rows - 1] != tail[col][0] for col in meta["columns"]
+        )
+        if total > meta["capacity"] or last_changed:
+            # 공개된 행은 제자리에서 고치지 않는다 (읽는 워커가 반쯤 바뀐 행을 볼 수 있음)
+            columns = {
+                col: np.concatenate([files[col][: rows - 1], tail[col]])
+                for col in meta["columns"]
+            }
+            return self._write_generation(
+                table_name, columns, version, meta, meta["loaded_at"]
+            )
+        # 공개 범위 밖에 새 행만 쓰고, 행 수는 meta 로 마지막에 공개
+        for col, target in files.items():
+            target[rows:total] = tail[col][1:]
+            target.flush()
+        meta = {**meta, "rows": total, "version": version, "synced_at": time.time()}
+        self._write_meta(table_name, meta)
+        return meta
+
+    def _sync(self, table_name: str, version) -> dict | None:
+        # 다른 워커가 먼저 갱신했으면 그대로 사용
+        os.makedirs(self._table_dir(table_name), exist_ok=True)
+        with self.table_locks[table_name], _FileLock(
+            os.path.join(self._table_dir(table_name), ".lock")
+        ):
+            meta = self._meta(table_name)
+            rewritten_at = self.rewritten.get(table_name)
+            force_load = (
+                meta is not None
+                and rewritten_at is not None
+                and meta["loaded_at"] < rewritten_at
+            )
+            if meta is not None and not force_load:
+                if not self._stale(meta, version):
+                    return meta
+                appended = self._append(table_name, meta, version)
+                if appended is not None:
+                    return appended
+            meta = self._load(table_name, meta)
+            if meta is not None:
+                with self.lock:
+                    self.rewritten.pop(table_name, None)
+            return meta
+
+    def _views(self, table_name: str, meta: dict) -> dict[str, np.ndarray]:
+        with self.lock:
+            generation, files = self.mapped.get(table_name, (None, None))
+            if generation != meta["generation"]:
+                files = self._open(table_name, meta, "r")
+                self.mapped[table_name] = (meta["generation"], files)
+        rows = meta["rows"]
+        return {col: values[:rows] for col, values in files.items()}
+
+    @staticmethod
+    def _stale(meta: dict, version) -> bool:
+        if version is None:
+            return time.time() - meta.get("synced_at", 0) >= UNVERSIONED_TTL_SECONDS
+        return meta["version"] != version
+
+    def _count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def series(self, table_name: str) -> dict[str, np.ndarray] | None:
+        # 컬럼별 읽기 전용 배열 (복사 없이 mmap 그대로) - 적재되지 않은 테이블은 None (DB 에서 읽는다)
+        if table_name not in self.tables:
+            return None
+        self._subscribe()
+        meta = self._meta(table_name)
+        if meta is not None:
+            version = table_version(table_name)
+            if self._stale(meta, version) or table_name in self.rewritten:
+                try:
+                    meta = self._sync(table_name, version)
+                except Exception as e:
+                    print(
+                        f"[hot_cache] {table_name} 갱신 실패, DB 에서 읽음: {repr(e)}"
+                    )
+                    meta = None
+        if meta is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return self._views(table_name, meta)
+
+    def frame(
+        self, table_name: str, columns: list[str], start=None, end=None
+    ) -> pd.DataFrame | None:
+        # [start, end] 구간 (DB 의 BETWEEN 과 같이 양끝 포함), timestamp 는 UTC datetime
+        series = self.series(table_name)
+        if series is None or any(c not in series for c in columns):
+            return None
+        timestamps = series["timestamp"]
+        lo = 0 if start is None else np.searchsorted(timestamps, _epoch_ns(start))
+        hi = (
+            timestamps.size
+            if end is None
+            else np.searchsorted(timestamps, _epoch_ns(end), side="right")
+        )
+        data = {
+            c: (
+                pd.to_datetime(timestamps[lo:hi], unit="ns", utc=True)
+                if c == "timestamp"
+                else series[c][lo:hi]
+            )
+            for c in columns
+        }
+        return pd.DataFrame(data, columns=columns)
+
+    def _subscribe(self):
+        with self.lock:
+            if not self.subscribed:
+                self.subscribed = True
+                listener.subscribe(CATALOG_CHANNEL, self.forget)
+
+    def forget(self, payload: str | None):
+        # 재계산 작업이 과거 행을 다시 쓴 테이블은 다음 읽기에서 전체를 다시 적재
+        # (여러 워커가 알림을 받아도 알림 이후에 적재된 것이 있으면 다시 읽지 않는다)
+        tables = rewritten_tables(payload)
+        now = time.time()
+        with self.lock:
+            for name in self.tables if tables is None else tables:
+                if name in self.tables:
+                    self.rewritten[name] = now
+
+    def warm_up(self, seconds: float = HOT_CACHE_WARMUP_SECONDS) -> dict:
+        # 이미 다른 워커가 적재했으면 매핑만, 아니면 DB 에서 적재 (시간/메모리 한도 안에서)
+        self._subscribe()
+        deadline = time.monotonic() + seconds
+        for name in self.tables:
+            if time.monotonic() > deadline:
+                self.skipped[name] = "warm-up time budget"
+                continue
+            try:
+                meta = self._sync(name, table_version(name))
+                if meta is not None:
+                    self._views(name, meta)
+            except Exception as e:
+                print(f"[hot_cache] {name} 적재 실패: {repr(e)}")
+                self.skipped[name] = "error"
+        return self.stats()
+
+    def start_warm_up(self) -> threading.Thread:
+        thread = threading.Thread(target=self.warm_up, name="hot-cache", daemon=True)
+        thread.start()
+        return thread
+
+    def drop(self, table_name: str):
+        # 공유 파일 삭제 (다시 적재하기 전까지 DB 에서 읽는다)
+        with self.lock:
+            self.mapped.pop(table_name, None)
+        table_dir = self._table_dir(table_name)
+        if os.path.isdir(table_dir):
+            for name in os.listdir(table_dir):
+                os.remove(os.path.join(table_dir, name))
+            os.rmdir(table_dir)
+
+    def stats(self) -> dict:
+        with self.lock:
+            mapped = {name: generation for name, (generation, _) in self.mapped.items()}
+            counters = dict(self.counters)
+        tables = {}
+        for name in self.tables:
+            meta = self._meta(name)
+            if meta is None:
+                continue
+            tables[name] = {
+                "rows": meta["rows"],
+                "capacity": meta["capacity"],
+                "columns": len(meta["columns"]),
+                "bytes": meta["capacity"] * 8 * len(meta["columns"]),
+                "generation": meta["generation"],
+                "version": meta["version"],
+                "mapped": mapped.get(name) == meta["generation"],
+            }
+        return {
+            "directory": self.directory,
+            "budget_bytes": self.max_bytes,
+            "used_bytes": sum(t["bytes"] for t in tables.values()),
+            # 이 프로세스가 매핑한 크기 (공유 페이지라 워커 수만큼 늘지 않는다)
+            "mapped_bytes": sum(t["bytes"] for t in tables.values() if t["mapped"]),
+            "tables": tables,
+            "skipped": dict(self.skipped),
+            "counters": counters,
+            "pid": os.getpid(),
+        }
+
+
+hot_cache = HotCache()
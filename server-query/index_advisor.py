@@ -0,0 +1,433 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, ProgrammingError
+
+from shared.connect_db import get_engine
+from strategy_expr import (
+    OPERATORS,
+    CompiledStrategy,
+    Condition,
+    compile_strategy,
+    parse_strategy,
+)
+
+# 부분 인덱스를 제안할 조건 사용 횟수
+MIN_HITS = int(os.getenv("INDEX_ADVISOR_MIN_HITS", "3"))
+# 조건을 만족하는 행 비율이 이보다 크면 순차 스캔이 낫다
+MAX_SELECTIVITY = float(os.getenv("INDEX_ADVISOR_MAX_SELECTIVITY", "0.2"))
+# 인덱스를 유지할 최소 개선 비율 (EXPLAIN ANALYZE 실행 시간 기준)
+MIN_GAIN = float(os.getenv("INDEX_ADVISOR_MIN_GAIN", "0.2"))
+# 이 시간 동안 사용되지 않은 인덱스는 prune 에서 삭제
+UNUSED_HOURS = float(os.getenv("INDEX_ADVISOR_UNUSED_HOURS", "168"))
+# 청산 조회(LATERAL) 검증에 사용하는 진입 시점 수
+PROBE_ENTRIES = 200
+
+PREDICATES_TABLE = "strategy_predicates"
+REGISTRY_TABLE = "index_advisor"
+
+
+def _ensure_tables(conn):
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {PREDICATES_TABLE} (
+            table_name TEXT NOT NULL,
+            predicate TEXT NOT NULL,
+            hits BIGINT NOT NULL DEFAULT 0,
+            last_seen TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (table_name, predicate)
+        )
+        """))
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {REGISTRY_TABLE} (
+            index_name TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            predicate TEXT,
+            definition TEXT NOT NULL,
+            before_ms DOUBLE PRECISION,
+            after_ms DOUBLE PRECISION,
+            status TEXT NOT NULL,
+            idx_scan BIGINT NOT NULL DEFAULT 0,
+            checked_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """))
+
+
+def record_strategy(table_name: str, compiled: CompiledStrategy):
+    # 저장된 전략의 조건을 테이블별로 집계 (조건 하나 = 부분 인덱스 후보 하나)
+    # 파라미터 지표 조건은 테이블 컬럼이 아니라 인덱스를 만들 수 없다
+    rows = [
+        {"table_name": table_name, "predicate": str(cond)}
+        for cond in compiled.conditions
+        if not cond.is_derived
+    ]
+    if not rows:
+        return
+    with get_engine("writer").begin() as conn:
+        _ensure_tables(conn)
+        conn.execute(
+            text(f"""
+                INSERT INTO {PREDICATES_TABLE} (table_name, predicate, hits)
+                VALUES (:table_name, :predicate, 1)
+                ON CONFLICT (table_name, predicate)
+                DO UPDATE SET hits = {PREDICATES_TABLE}.hits + 1, last_seen = now()
+                """),
+            rows,
+        )
+
+
+def _predicate_sql(cond: Condition) -> str:
+    # 부분 인덱스 조건은 바인딩할 수 없으므로 파싱된 조건에서만 SQL 을 만든다
+    sql_op = OPERATORS[cond.op][1]
+    if isinstance(cond.right, str):
+        return f'"{cond.left}" {sql_op} "{cond.right}"'
+    if not math.isfinite(cond.right):
+        raise ValueError(f"인덱스 조건에 사용할 수 없는 값: {cond}")
+    # 정규화 표기의 숫자 부분 (정수는 소수점 없이)
+    return f'"{cond.left}" {sql_op} {str(cond).rsplit(" ", 1)[1]}'
+
+
+def _index_name(table_name: str, kind: str, key: str = "") -> str:
+    digest = hashlib.sha1(f"{table_name}:{kind}:{key}".encode()).hexdigest()[:10]
+    return f"adv_{table_name}_{kind}_{digest}"
+
+
+def _proposal(table_name: str, kind: str, predicate: str | None = None) -> dict:
+    name = _index_name(table_name, kind, predicate or "")
+    if kind == "brin":
+        definition = f'CREATE INDEX CONCURRENTLY "{name}" ON "{table_name}" USING brin (timestamp)'
+    elif kind == "covering":
+        definition = f'CREATE INDEX CONCURRENTLY "{name}" ON "{table_name}" (timestamp) INCLUDE (close, low, high)'
+    else:
+        where = _predicate_sql(parse_strategy(predicate)[0])
+        definition = f'CREATE INDEX CONCURRENTLY "{name}" ON "{table_name}" (timestamp) WHERE {where}'
+    return {
+        "index_name": name,
+        "table_name": table_name,
+        "kind": kind,
+        "predicate": predicate,
+        "definition": definition,
+    }
+
+
+def _plan_rows(conn, query: str) -> float:
+    return conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}")).scalar()[0]["Plan"][
+        "Plan Rows"
+    ]
+
+
+def _selectivity(conn, table_name: str, predicate: str, exact: bool) -> float:
+    where = _predicate_sql(parse_strategy(predicate)[0])
+    if not exact:
+        # 플래너 통계로 추정 (테이블을 읽지 않는다)
+        total = _plan_rows(conn, f'SELECT 1 FROM "{table_name}"')
+        matched = _plan_rows(conn, f'SELECT 1 FROM "{table_name}" WHERE {where}')
+        return matched / max(total, 1)
+    return conn.execute(text(f"""
+        SELECT COUNT(*) FILTER (WHERE {where})::float / GREATEST(COUNT(*), 1)
+        FROM "{table_name}"
+        """)).scalar()
+
+
+def propose(exact: bool = False) -> list[dict]:
+    # 자주 쓰인 조건 -> 부분 인덱스, 조건이 기록된 테이블 -> BRIN / 청산 조회용 커버링 인덱스
+    # 아직 기록 테이블이 없으면 제안 없음
+    # HTTP 보고서는 analytics 연결에서 플래너 추정 선택도만 사용 (전체 스캔은 CLI 에서만: exact)
+    with get_engine("writer" if exact else "analytics").connect() as conn:
+        try:
+            predicates = conn.execute(text(f"""
+                    SELECT p.table_name, p.predicate, p.hits
+                    FROM {PREDICATES_TABLE} p
+                    WHERE to_regclass(quote_ident(p.table_name)) IS NOT NULL
+                    ORDER BY p.table_name, p.hits DESC, p.predicate
+                    """)).mappings().all()
+            existing = set(
+                conn.execute(
+                    text(
+                        f"SELECT index_name FROM {REGISTRY_TABLE} WHERE status = 'active'"
+                    )
+                ).scalars()
+            )
+        except ProgrammingError:
+            return []
+
+        proposals = []
+        for table_name in dict.fromkeys(row["table_name"] for row in predicates):
+            proposals.append(_proposal(table_name, "covering"))
+            proposals.append(_proposal(table_name, "brin"))
+        for row in predicates:
+            if row["hits"] < MIN_HITS:
+                continue
+            proposal = _proposal(row["table_name"], "partial", row["predicate"])
+            proposal["hits"] = row["hits"]
+            proposal["selectivity"] = _selectivity(
+                conn, row["table_name"], row["predicate"], exact
+            )
+            if proposal["selectivity"] <= MAX_SELECTIVITY:
+                proposals.append(proposal)
+    return [p for p in proposals if p["index_name"] not in existing]
+
+
+def _hot_predicate(conn, table_name: str) -> str | None:
+    return conn.execute(
+        text(f"""
+            SELECT predicate FROM {PREDICATES_TABLE}
+            WHERE table_name = :t ORDER BY hits DESC, predicate LIMIT 1
+            """),
+        {"t": table_name},
+    ).scalar()
+
+
+def _validation_query(conn, proposal: dict) -> tuple[str, dict]:
+    # 백테스트 쿼리에서 인덱스가 대상으로 하는 부분만 떼어 낸 대표 쿼리
+    # 조건은 백테스트와 같게 compile_strategy 의 바인딩 파라미터 형태로 넣는다
+    table_name = proposal["table_name"]
+    if proposal["kind"] == "partial":
+        compiled = compile_strategy(proposal["predicate"])
+        return (
+            f"""
+            SELECT timestamp, close, low FROM "{table_name}"
+            WHERE {compiled.sql} AND close > low * 1.005
+            """,
+            compiled.params,
+        )
+    if proposal["kind"] == "brin":
+        # 기간을 지정한 백테스트 (최근 10%)
+        return (
+            f"""
+            SELECT timestamp, close, low FROM "{table_name}"
+            WHERE timestamp >= (
+                SELECT MAX(timestamp) - (MAX(timestamp) - MIN(timestamp)) / 10
+                FROM "{table_name}"
+            )
+            """,
+            {},
+        )
+    hot = _hot_predicate(conn, table_name)
+    compiled = compile_strategy(hot) if hot else None
+    where = compiled.sql if compiled else "TRUE"
+    return (
+        f"""
+        SELECT e.timestamp, x.timestamp
+        FROM (
+            SELECT timestamp, close, low FROM "{table_name}"
+            WHERE {where} AND close > low * 1.005
+            ORDER BY timestamp LIMIT {PROBE_ENTRIES}
+        ) e
+        LEFT JOIN LATERAL (
+            SELECT timestamp, low, high FROM "{table_name}" x
+            WHERE x.timestamp > e.timestamp
+              AND (
+                  x.low <= e.low
+                  OR x.high >= (e.close + (e.close - e.low) * :rr_ratio)
+              )
+            ORDER BY timestamp LIMIT 1
+        ) x ON TRUE
+        """,
+        {"rr_ratio": 2.0, **(compiled.params if compiled else {})},
+    )
+
+
+def _plan_indexes(node: dict) -> set[str]:
+    names = {node["Index Name"]} if "Index Name" in node else set()
+    for child in node.get("Plans", []):
+        names |= _plan_indexes(child)
+    return names
+
+
+def explain(
+    conn, query: str, params: dict | None = None, runs: int = 2
+) -> tuple[float, set[str]]:
+    # 캐시 영향을 줄이려고 여러 번 실행해 가장 빠른 시간을 사용
+    best, indexes = float("inf"), set()
+    for _ in range(runs):
+        raw = conn.execute(
+            text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}"), params or {}
+        ).scalar()
+        plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+        if plan["Execution Time"] < best:
+            best = plan["Execution Time"]
+            indexes = _plan_indexes(plan["Plan"])
+    return best, indexes
+
+
+def _idx_scan(conn, index_name: str) -> int:
+    value = conn.execute(
+        text("SELECT idx_scan FROM pg_stat_user_indexes WHERE indexrelname = :n"),
+        {"n": index_name},
+    ).scalar()
+    return value or 0
+
+
+def _drop_index(conn, index_name: str):
+    conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"'))
+
+
+def apply_proposal(proposal: dict) -> dict:
+    # CONCURRENTLY 는 트랜잭션 밖에서만 실행된다
+    index_name = proposal["index_name"]
+    with get_engine("writer").connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        _ensure_tables(conn)
+        query, params = _validation_query(conn, proposal)
+        before_ms, _ = explain(conn, query, params)
+        try:
+            conn.execute(text(proposal["definition"]))
+            conn.execute(text(f'ANALYZE "{proposal["table_name"]}"'))
+            after_ms, used = explain(conn, query, params)
+        except DBAPIError:
+            # 실패한 CONCURRENTLY 빌드는 INVALID 인덱스를 남긴다
+            _drop_index(conn, index_name)
+            raise
+
+        keep = index_name in used and after_ms <= before_ms * (1 - MIN_GAIN)
+        status = "active" if keep else "rejected"
+        if not keep:
+            _drop_index(conn, index_name)
+        conn.execute(
+            text(f"""
+                INSERT INTO {REGISTRY_TABLE} (
+                    index_name, table_name, kind, predicate, definition,
+                    before_ms, after_ms, status, idx_scan
+                )
+                VALUES (
+                    :index_name, :table_name, :kind, :predicate, :definition,
+                    :before_ms, :after_ms, :status, :idx_scan
+                )
+                ON CONFLICT (index_name) DO UPDATE SET
+                    before_ms = EXCLUDED.before_ms, after_ms = EXCLUDED.after_ms,
+                    status = EXCLUDED.status, idx_scan = EXCLUDED.idx_scan,
+                    checked_at = now(), created_at = now()
+                """),
+            {
+                **{k: proposal[k] for k in ("table_name", "kind", "predicate")},
+                "index_name": index_name,
+                "definition": proposal["definition"],
+                "before_ms": before_ms,
+                "after_ms": after_ms,
+                "status": status,
+                "idx_scan": _idx_scan(conn, index_name) if keep else 0,
+            },
+        )
+    return {
+        "index_name": index_name,
+        "kind": proposal["kind"],
+        "predicate": proposal["predicate"],
+        "before_ms": before_ms,
+        "after_ms": after_ms,
+        "used": index_name in used,
+        "status": status,
+    }
+
+
+def apply(dry_run: bool = False, limit: int | None = None) -> list[dict]:
+    proposals = propose(exact=True)[:limit]
+    if dry_run:
+        return proposals
+    results = []
+    for proposal in proposals:
+        started = time.perf_counter()
+        try:
+            result = apply_proposal(proposal)
+        except DBAPIError as e:
+            result = {
+                "index_name": proposal["index_name"],
+                "kind": proposal["kind"],
+                "predicate": proposal["predicate"],
+                "status": "failed",
+                "error": str(e.orig),
+            }
+        result["elapsed_s"] = time.perf_counter() - started
+        results.append(result)
+    return results
+
+
+def prune() -> list[str]:
+    # 마지막 확인 이후 idx_scan 이 늘지 않은 채 UNUSED_HOURS 가 지난 인덱스만 삭제
+    dropped = []
+    with get_engine("writer").connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        _ensure_tables(conn)
+        rows = (
+            conn.execute(
+                text(f"""
+                SELECT index_name, idx_scan,
+                       checked_at < now() - make_interval(secs => :unused) AS expired
+                FROM {REGISTRY_TABLE}
+                WHERE status = 'active'
+                """),
+                {"unused": UNUSED_HOURS * 3600},
+            )
+            .mappings()
+            .all()
+        )
+        for row in rows:
+            scans = _idx_scan(conn, row["index_name"])
+            if scans > row["idx_scan"]:
+                conn.execute(
+                    text(f"""
+                        UPDATE {REGISTRY_TABLE} SET idx_scan = :scans, checked_at = now()
+                        WHERE index_name = :n
+                        """),
+                    {"scans": scans, "n": row["index_name"]},
+                )
+            elif row["expired"]:
+                _drop_index(conn, row["index_name"])
+                conn.execute(
+                    text(
+                        f"UPDATE {REGISTRY_TABLE} SET status = 'dropped', checked_at = now() WHERE index_name = :n"
+                    ),
+                    {"n": row["index_name"]},
+                )
+                dropped.append(row["index_name"])
+    return dropped
+
+
+def registry() -> list[dict]:
+    try:
+        with get_engine("writer").connect() as conn:
+            rows = conn.execute(text(f"""
+                    SELECT index_name, table_name, kind, predicate, definition,
+                           before_ms, after_ms, status, idx_scan, checked_at, created_at
+                    FROM {REGISTRY_TABLE}
+                    ORDER BY created_at DESC
+                    """)).mappings().all()
+    except ProgrammingError:
+        return []
+    return [dict(row) for row in rows]
+
+
+def main(argv=None):
+    # 인덱스 생성/삭제는 운영 테이블에 DDL 을 실행하므로 HTTP 가 아니라 운영자가 직접 실행
+    # docker compose exec query python -m index_advisor apply --dry-run
+    parser = argparse.ArgumentParser(
+        description="저장된 전략 조건 기반 인덱스 제안/적용/정리"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("report", help="제안과 적용된 인덱스 목록")
+    apply_parser = commands.add_parser(
+        "apply", help="제안된 인덱스를 만들고 EXPLAIN ANALYZE 로 개선된 것만 유지"
+    )
+    apply_parser.add_argument("--dry-run", action="store_true")
+    apply_parser.add_argument("--limit", type=int)
+    commands.add_parser("prune", help="오랫동안 사용되지 않은 인덱스 삭제")
+    args = parser.parse_args(argv)
+
+    if args.command == "apply":
+        result = apply(args.dry_run, args.limit)
+    elif args.command == "prune":
+        result = prune()
+    else:
+        result = {"proposals": propose(exact=True), "indexes": registry()}
+    print(json.dumps(result, indent=2, default=str, ensure_ascii=False))
+    return result
+
+
+if __name__ == "__main__":
+    main()
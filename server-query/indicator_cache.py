@@ -0,0 +1,289 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from shared.connect_db import get_engine
+from catalog import table_version
+from hot_cache import hot_cache
+from strategy_expr import parse_strategy, split_derived
+
+# 메모리에 유지할 계산 결과 크기 (넘치면 오래된 것부터 디스크로 내린다)
+CACHE_BYTES = int(os.getenv("INDICATOR_CACHE_MB", "256")) * 2**20
+CACHE_DIR = os.getenv("INDICATOR_CACHE_DIR", "/tmp/indicator_cache")
+
+
+# 각 지표: (입력, 기간, 직전 상태) -> (값, 마지막 캔들 직전의 상태)
+# 마지막 캔들은 수집기가 다시 덮어쓸 수 있으므로 그 직전 상태에서 이어서 계산한다
+# 상태가 None 이면 처음부터 계산 (이어서 계산할 수 없는 경우도 None)
+def _ema(src: np.ndarray, period: int, state: np.ndarray | None):
+    seed = np.empty(0) if state is None else state
+    seq = np.concatenate([seed, src])
+    values = pd.Series(seq).ewm(span=period, adjust=False).mean().to_numpy()
+    values = values[seed.size :]
+    prev = values[-2:-1] if values.size >= 2 else state
+    return values, prev
+
+
+def _sma(src: np.ndarray, period: int, state: np.ndarray | None):
+    # 상태: 직전 period - 1 개의 입력
+    seed = np.empty(0) if state is None else state
+    seq = np.concatenate([seed, src])
+    values = pd.Series(seq).rolling(period).mean().to_numpy()[seed.size :]
+    head = seq[:-1]
+    prev = head[head.size - (period - 1) :] if head.size >= period - 1 else None
+    return values, prev
+
+
+def _rsi(src: np.ndarray, period: int, state: np.ndarray | None):
+    # Wilder 평균 (수집기 indicators/rsi.py 와 같은 시작점) / 상태: [종가, 평균 상승, 평균 하락]
+    alpha = 1 / period
+    if state is None:
+        delta = np.diff(src, prepend=np.nan)
+        gain, loss = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+        avg_gain = np.full(src.size, np.nan)
+        avg_loss = np.full(src.size, np.nan)
+        start = 1 + period
+        if start < src.size:
+            for avg, moves in ((avg_gain, gain), (avg_loss, loss)):
+                seeded = moves[start:].copy()
+                seeded[0] = moves[start - period + 1 : start + 1].mean()
+                avg[start:] = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean()
+    else:
+        delta = np.diff(np.concatenate([state[:1], src]))
+        gain, loss = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+        avg_gain, avg_loss = (
+            pd.Series(np.concatenate([[seed], moves]))
+            .ewm(alpha=alpha, adjust=False)
+            .mean()
+            .to_numpy()[1:]
+            for seed, moves in ((state[1], gain), (state[2], loss))
+        )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100 - 100 / (1 + avg_gain / avg_loss)
+    if src.size >= 2:
+        prev = np.array([src[-2], avg_gain[-2], avg_loss[-2]])
+        if np.isnan(prev).any():
+            prev = None
+    else:
+        prev = state
+    return values, prev
+
+
+INDICATORS = {"ema": _ema, "sma": _sma, "rsi": _rsi}
+
+
+def _read_source(table_name: str, column: str, since_ns: int | None = None):
+    hot = hot_cache.series(table_name)
+    if hot is not None and column in hot:
+        # 공유 메모리 캐시 (결과와 함께 오래 보관하므로 복사)
+        first = 0 if since_ns is None else np.searchsorted(hot["timestamp"], since_ns)
+        return np.array(hot["timestamp"][first:]), np.array(hot[column][first:])
+    where = "WHERE timestamp >= :since" if since_ns is not None else ""
+    query = text(
+        f'SELECT timestamp, "{column}" FROM "{table_name}" {where} ORDER BY timestamp'
+    )
+    params = {}
+    if since_ns is not None:
+        params["since"] = pd.Timestamp(since_ns, unit="ns", tz="UTC").to_pydatetime()
+    with get_engine("analytics").connect() as conn:
+        df = pd.read_sql(query, conn, params=params)
+    timestamps = pd.to_datetime(df["timestamp"], utc=True).dt.tz_convert(None)
+    return (
+        timestamps.to_numpy(dtype="datetime64[ns]").view("int64"),
+        df[column].to_numpy(dtype="float64"),
+    )
+
+
+class IndicatorCache:
+    # (테이블, 지표) 별 전체 기간 계산 결과를 LRU 로 유지하고 데이터 버전이 바뀌면 꼬리만 이어서 계산
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # lock: LRU/카운터만 보호, key_locks: 같은 지표의 계산/디스크 I/O 를 한 번만
+        self.lock = threading.Lock()
+        self.key_locks: dict[tuple[str, str], threading.Lock] = {}
+        self.entries: OrderedDict[tuple[str, str], dict] = OrderedDict()
+        self.nbytes = 0
+        self.counters = {"hits": 0, "extended": 0, "computed": 0, "disk_loads": 0}
+
+    def _path(self, table_name: str, name: str) -> str:
+        digest = hashlib.sha1(name.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, table_name, f"{digest}.npz")
+
+    @staticmethod
+    def _size(entry: dict) -> int:
+        return entry["timestamp"].nbytes + entry["values"].nbytes
+
+    def _spill(self, key: tuple[str, str], entry: dict):
+        # 임시 파일에 쓴 뒤 교체 (다른 프로세스가 읽는 도중에도 안전)
+        path = self._path(*key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                timestamp=entry["timestamp"],
+                values=entry["values"],
+                state=entry["state"] if entry["state"] is not None else np.empty(0),
+                has_state=entry["state"] is not None,
+                meta=json.dumps({"name": key[1], "version": entry["version"]}),
+            )
+        os.replace(tmp, path)
+
+    def _load(self, key: tuple[str, str]) -> dict | None:
+        path = self._path(*key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta["name"] != key[1]:
+                    return None
+                return {
+                    "timestamp": data["timestamp"],
+                    "values": data["values"],
+                    "state": data["state"] if bool(data["has_state"]) else None,
+                    "version": meta["version"],
+                }
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _compute(self, table_name: str, name: str) -> dict:
+        fn, source, period = split_derived(name)
+        timestamp, src = _read_source(table_name, source)
+        values, state = INDICATORS[fn](src, period, None)
+        return {"timestamp": timestamp, "values": values, "state": state}
+
+    def _extend(self, table_name: str, name: str, entry: dict, version) -> dict | None:
+        # 마지막 캔들부터 다시 읽어 이어서 계산 (이전 기록이 바뀌었으면 None -> 전체 계산)
+        if entry["state"] is None or entry["timestamp"].size == 0:
+            return None
+        fn, source, period = split_derived(name)
+        last = entry["timestamp"].size - 1
+        timestamp, src = _read_source(table_name, source, int(entry["timestamp"][last]))
+        if timestamp.size == 0 or timestamp[0] != entry["timestamp"][last]:
+            return None
+        if version is not None and last + timestamp.size != version[0]:
+            return None
+        values, state = INDICATORS[fn](src, period, entry["state"])
+        return {
+            "timestamp": np.concatenate([entry["timestamp"][:last], timestamp]),
+            "values": np.concatenate([entry["values"][:last], values]),
+            "state": entry["state"] if state is None else state,
+        }
+
+    def _key_lock(self, key: tuple[str, str]) -> threading.Lock:
+        with self.lock:
+            return self.key_locks.setdefault(key, threading.Lock())
+
+    def get(self, table_name: str, name: str) -> tuple[np.ndarray, np.ndarray]:
+        # (timestamp epoch ns, 값) - 테이블 전체 기간
+        key = (table_name, name)
+        version = table_version(table_name)
+        # 다른 (테이블, 지표) 의 계산은 기다리지 않는다 (DB 읽기/계산/저장은 self.lock 밖)
+        with self._key_lock(key):
+            with self.lock:
+                entry = self.entries.get(key)
+            loaded = False
+            if entry is None:
+                entry = self._load(key)
+                loaded = entry is not None
+
+            if (
+                entry is not None
+                and version is not None
+                and entry["version"] == version
+            ):
+                outcome = "hits"
+            else:
+                extended = (
+                    self._extend(table_name, name, entry, version) if entry else None
+                )
+                if extended is not None:
+                    outcome = "extended"
+                    entry = extended
+                else:
+                    outcome = "computed"
+                    entry = self._compute(table_name, name)
+                entry["version"] = version
+                if extended is None:
+                    # 다른 워커 프로세스/재시작 후에도 쓰도록 전체 계산 결과는 바로 저장
+                    self._spill(key, entry)
+
+            with self.lock:
+                self.counters[outcome] += 1
+                if loaded:
+                    self.counters["disk_loads"] += 1
+                old = self.entries.pop(key, None)
+                if old is not None:
+                    self.nbytes -= self._size(old)
+                self.entries[key] = entry
+                self.nbytes += self._size(entry)
+                evicted = []
+                while self.nbytes > self.max_bytes and len(self.entries) > 1:
+                    old_key, old = self.entries.popitem(last=False)
+                    self.nbytes -= self._size(old)
+                    evicted.append((old_key, old))
+        for old_key, old in evicted:
+            self._spill(old_key, old)
+        return entry["timestamp"], entry["values"]
+
+    def align(self, table_name: str, name: str, timestamps: np.ndarray) -> np.ndarray:
+        # 주어진 캔들 시각에 맞춘 값 (계산 결과에 없는 캔들은 NaN)
+        cached_ts, values = self.get(table_name, name)
+        out = np.full(timestamps.size, np.nan)
+        if cached_ts.size == 0:
+            return out
+        idx = np.minimum(np.searchsorted(cached_ts, timestamps), cached_ts.size - 1)
+        found = cached_ts[idx] == timestamps
+        out[found] = values[idx[found]]
+        return out
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                **self.counters,
+                "entries": len(self.entries),
+                "bytes": self.nbytes,
+            }
+
+
+indicator_cache = IndicatorCache()
+
+
+def _epoch_ns(value: str) -> int:
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return ts.value
+
+
+def derived_indicator_rows(
+    table_name: str, name: str, start_time: str, end_time: str
+) -> list[dict]:
+    # /indicator-data 와 같은 행 형식 (rsi 는 보조 차트, 나머지는 가격 차트)
+    # 전략 문법으로 검증/정규화 (rsi(14) -> rsi(close,14))
+    name = parse_strategy(f"{name} > 0")[0].left
+    fn = split_derived(name)[0]
+    timestamps, values = indicator_cache.get(table_name, name)
+    lo = int(np.searchsorted(timestamps, _epoch_ns(start_time), side="left"))
+    hi = int(np.searchsorted(timestamps, _epoch_ns(end_time), side="right"))
+    plot_area = "sub" if fn == "rsi" else "main"
+    return [
+        {
+            "timestamp": ts.isoformat(),
+            "value": float(value),
+            "plot_area": plot_area,
+            "name": name,
+        }
+        for ts, value in zip(
+            pd.to_datetime(timestamps[lo:hi], unit="ns", utc=True), values[lo:hi]
+        )
+        if np.isfinite(value)
+    ]
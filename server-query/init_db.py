@@ -89,6 +89,46 @@ cur.execute(
 """
 )
 
+# 수집기가 관리하는 데이터셋 카탈로그
+cur.execute("DROP TABLE IF EXISTS dataset_catalog")
+cur.execute(
+    """
+    CREATE TABLE dataset_catalog (
+        symbol TEXT NOT NULL,
+        interval TEXT NOT NULL,
+        table_name TEXT NOT NULL,
+        first_timestamp TIMESTAMPTZ,
+        last_timestamp TIMESTAMPTZ,
+        row_count BIGINT NOT NULL DEFAULT 0,
+        gap_count BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (symbol, interval)
+    )
+"""
+)
+for sym in SYMBOLS:
+    for intv in INTERVALS:
+        table = f"{sym.lower()}_{intv}"
+        cur.execute(
+            f"""
+            INSERT INTO dataset_catalog (
+                symbol, interval, table_name,
+                first_timestamp, last_timestamp, row_count
+            )
+            SELECT %s, %s, %s, MIN(timestamp), MAX(timestamp), COUNT(*)
+            FROM {table}
+            """,
+            (sym, intv, table),
+        )
+
+
+# 백테스트 통계 테이블은 결과 저장 시 생성되므로 초기화만 한다
+cur.execute("DROP TABLE IF EXISTS filtered_stats")
+
+# 인덱스 제안용 조건 집계 / 적용 이력 (테이블을 다시 만들면 인덱스도 사라진다)
+cur.execute("DROP TABLE IF EXISTS strategy_predicates")
+cur.execute("DROP TABLE IF EXISTS index_advisor")
+
 
 # 커밋 및 종료
 conn.commit()
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import math
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from shared.connect_db import engine
+from shared.symbols_intervals import INTERVAL_MINUTES
+from catalog import CATALOG_CHANNEL
+from db_listener import listener
+
+# 연결 유지용 주석 전송 간격 (프록시가 유휴 연결을 끊지 않도록)
+KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+# since / Last-Event-ID 로 한 번에 보내는 최대 캔들 수
+BACKLOG_LIMIT = int(os.getenv("SSE_BACKLOG_LIMIT", "500"))
+# 느린 클라이언트에 쌓아 둘 최대 알림 수 (넘치면 해당 알림은 버린다)
+QUEUE_SIZE = 100
+RETRY_MS = 3000
+
+
+def _epoch(value: datetime) -> int:
+    return int(value.timestamp())
+
+
+def _candle(row: dict) -> dict:
+    # 타임스탬프 -> epoch(초), NaN/inf -> null
+    candle = {"time": _epoch(row["timestamp"])}
+    for key, value in row.items():
+        if key == "timestamp":
+            continue
+        if value is not None:
+            value = float(value)
+            if not math.isfinite(value):
+                value = None
+        candle[key] = value
+    return candle
+
+
+def read_closed_candles(symbol: str, interval: str, after: int | None) -> list[dict]:
+    # 마감된 캔들만 (진행 중인 캔들은 수집기가 계속 덮어쓴다)
+    # NOTIFY 는 커밋 직후에 오므로 복제본 지연이 없는 primary 에서 읽는다
+    table_name = f"{symbol}_{interval}".lower()
+    query = f"""
+        SELECT * FROM (
+            SELECT * FROM "{table_name}"
+            WHERE timestamp + make_interval(mins => :step) <= now()
+              {"AND timestamp > to_timestamp(:after)" if after is not None else ""}
+            ORDER BY timestamp DESC
+            LIMIT :limit
+        ) t
+        ORDER BY timestamp
+    """
+    params = {"step": INTERVAL_MINUTES[interval], "limit": BACKLOG_LIMIT}
+    if after is not None:
+        params["after"] = after
+    with engine.connect() as conn:
+        rows = conn.execute(text(query), params).mappings().all()
+    return [_candle(dict(row)) for row in rows]
+
+
+class Subscriber:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.last_time: int | None = None
+
+    def offer(self, candles: list[dict]):
+        # 리스너 스레드에서 호출 -> 이벤트 루프로 넘긴다
+        def put():
+            try:
+                self.queue.put_nowait(candles)
+            except asyncio.QueueFull:
+                pass
+
+        self.loop.call_soon_threadsafe(put)
+
+
+class CandleBroadcaster:
+    # 코인/간격별 구독자에게 새로 마감된 캔들을 전달 (알림 하나당 DB 조회 한 번)
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers: dict[tuple[str, str], set[Subscriber]] = defaultdict(set)
+        self.last_sent: dict[tuple[str, str], int] = {}
+        self.subscribed = False
+
+    def subscribe(self, symbol: str, interval: str) -> Subscriber:
+        subscriber = Subscriber(asyncio.get_running_loop())
+        with self.lock:
+            if not self.subscribed:
+                self.subscribed = True
+                listener.subscribe(CATALOG_CHANNEL, self.on_notify)
+            self.subscribers[(symbol, interval)].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, symbol: str, interval: str, subscriber: Subscriber):
+        with self.lock:
+            subscribers = self.subscribers[(symbol, interval)]
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[(symbol, interval)]
+                self.last_sent.pop((symbol, interval), None)
+
+    def on_notify(self, payload: str | None):
+        # payload=None: 리스너 (재)연결 -> 놓친 알림이 있을 수 있어 구독 중인 전부 확인
+        if payload is None:
+            with self.lock:
+                keys = list(self.subscribers)
+        else:
+            data = json.loads(payload)
+            keys = [(data["symbol"].upper(), data["interval"].lower())]
+        for key in keys:
+            self.publish(*key)
+
+    def publish(self, symbol: str, interval: str):
+        key = (symbol, interval)
+        with self.lock:
+            if not self.subscribers.get(key):
+                return
+            after = self.last_sent.get(key)
+        if after is None:
+            # 첫 알림: 직전 마감 캔들만 보낸다 (그 이전은 클라이언트가 since 로 요청)
+            candles = read_closed_candles(symbol, interval, None)[-1:]
+        else:
+            candles = read_closed_candles(symbol, interval, after)
+        if not candles:
+            return
+        with self.lock:
+            self.last_sent[key] = max(self.last_sent.get(key, 0), candles[-1]["time"])
+            subscribers = list(self.subscribers.get(key, ()))
+        for subscriber in subscribers:
+            subscriber.offer(candles)
+
+
+def format_event(candle: dict) -> str:
+    # id 는 캔들 시각 -> 재연결 시 Last-Event-ID 로 이어받는다
+    data = json.dumps(candle, separators=(",", ":"))
+    return f"id: {candle['time']}\nevent: candle\ndata: {data}\n\n"
+
+
+async def candle_events(request, symbol: str, interval: str, since: int | None):
+    subscriber = live_candles.subscribe(symbol, interval)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        if since is not None:
+            backlog = await run_in_threadpool(
+                read_closed_candles, symbol, interval, since
+            )
+            for candle in backlog:
+                subscriber.last_time = candle["time"]
+                yield format_event(candle)
+        while not await request.is_disconnected():
+            try:
+                candles = await asyncio.wait_for(
+                    subscriber.queue.get(), timeout=KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            for candle in candles:
+                if (
+                    subscriber.last_time is None
+                    or candle["time"] > subscriber.last_time
+                ):
+                    subscriber.last_time = candle["time"]
+                    yield format_event(candle)
+    finally:
+        live_candles.unsubscribe(symbol, interval, subscriber)
+
+
+live_candles = CandleBroadcaster()
@@ -1,22 +1,71 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.encoders import jsonable_encoder
-from get_data import get_ohlcv_data, get_filtered_data, get_data_from_table
+from get_data import (
+    get_ohlcv_data,
+    get_filtered_data,
+    get_data_from_table,
+    stream_data_from_table,
+    OHLCV_COLUMNS,
+    FILTERED_COLUMNS,
+    EXPORT_COLUMNS,
+)
 from shared.symbols_intervals import SYMBOLS, INTERVALS
 from filtered_func import (
     run_conditional_lateral_backtest,
+    run_portfolio_backtest,
     save_result_to_table,
-    calculate_statics,
+    compute_statics,
+    load_statics,
+    load_profit_rate,
+    latest_run_id,
+)
+from signal_index import signal_index
+from catalog import dataset_catalog, serialize_entry
+from walk_forward import run_walk_forward
+from backtest_guard import BacktestRejected, backtest_slot
+from perf import PerfRoute, encode_json, perf_middleware, perf_stats
+from strategy_expr import compile_strategy, is_derived
+from indicator_cache import derived_indicator_rows
+from hot_cache import hot_cache
+import index_advisor
+from live_stream import candle_events
+from risk_analytics import DRAWDOWN_POINTS, risk_analytics
+from monte_carlo import (
+    MC_BAND_POINTS,
+    MC_DEFAULT_SIMS,
+    MC_MAX_SIMS,
+    monte_carlo,
 )
+from run_compare import COMPARE_POINTS, MAX_COMPARE_RUNS, compare_runs, list_runs
 from pydantic import BaseModel
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from datetime import datetime as dt
-from shared.connect_db import engine
+from shared.connect_db import engine, get_engine
 from sqlalchemy import text, select, distinct
-from typing import Optional
+from typing import Literal, Optional
+from contextlib import asynccontextmanager
 import math
+import hashlib
+import json
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 공유 메모리 캐시는 백그라운드에서 적재 (시간/메모리 한도 안에서, 그동안은 DB 에서 읽는다)
+    hot_cache.start_warm_up()
+    yield
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# 엔드포인트별 단계 시간 측정 (Server-Timing 헤더, /debug/perf)
+app.router.route_class = PerfRoute
+app.middleware("http")(perf_middleware)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_response(lines) -> StreamingResponse:
+    return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
 
 # CORS 설정
 app.add_middleware(
@@ -30,10 +79,14 @@ app.add_middleware(
 
 # OHLCV 필터링 결과 조회
 @app.get("/filtered-ohlcv")
-def read_filtered_ohlcv():
+def read_filtered_ohlcv(format: str = "json"):
+    if format == "ndjson":
+        return ndjson_response(
+            stream_data_from_table(table_name="filtered", return_type=FILTERED_COLUMNS)
+        )
     try:
         data = get_filtered_data()
-        return jsonable_encoder(data)
+        return encode_json(data)
     except Exception as e:
         print(repr(e))
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -62,7 +115,7 @@ def get_candle_data(entry_time: str, exit_time: str, symbol: str, interval: str)
             min_value=entry_time,
             max_value=exit_time,
         )
-        return jsonable_encoder(data)
+        return encode_json(data)
     except Exception as e:
         print(repr(e))
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -70,19 +123,45 @@ def get_candle_data(entry_time: str, exit_time: str, symbol: str, interval: str)
 
 # 전체 OHLCV 조회
 @app.get("/ohlcv/{symbol}/{interval}")
-def read_ohlcv(symbol: str, interval: str) -> list:
+def read_ohlcv(symbol: str, interval: str, format: str = "json") -> list:
     symbol = symbol.upper()
     interval = interval.lower()
     if symbol not in SYMBOLS or interval not in INTERVALS:
         raise HTTPException(status_code=400, detail="Invalid symbol or interval")
+    if format == "ndjson":
+        return ndjson_response(
+            stream_data_from_table(
+                table_name=f"{symbol}_{interval}".lower(), return_type=OHLCV_COLUMNS
+            )
+        )
     try:
         data = get_ohlcv_data(symbol, interval)
-        return jsonable_encoder(data)
+        return encode_json(data)
     except Exception as e:
         print(f"Error fetching data for {symbol}_{interval}: {repr(e)}")
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+# 새로 마감된 캔들 + 지표를 SSE 로 전달 (수집기 NOTIFY 기반)
+@app.get("/stream/ohlcv/{symbol}/{interval}")
+async def stream_ohlcv(
+    request: Request, symbol: str, interval: str, since: Optional[int] = None
+):
+    symbol = symbol.upper()
+    interval = interval.lower()
+    if symbol not in SYMBOLS or interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail="Invalid symbol or interval")
+    # EventSource 재연결 시 마지막으로 받은 캔들 이후부터 이어서 보낸다
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+    return StreamingResponse(
+        candle_events(request, symbol, interval, since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # 💡 백테스트 전략 저장용 요청 모델
 class StrategyRequest(BaseModel):
     symbol: str
@@ -93,19 +172,31 @@ class StrategyRequest(BaseModel):
     end_time: Optional[str] = None
 
 
+def _record_strategy(pairs, strategy_sql: str):
+    # 인덱스 제안용 조건 집계 (실패해도 백테스트 결과에는 영향 없음)
+    try:
+        compiled = compile_strategy(strategy_sql)
+        for symbol, interval in pairs:
+            index_advisor.record_strategy(f"{symbol}_{interval}".lower(), compiled)
+    except Exception as e:
+        print(repr(e))
+
+
 # 전략 저장 및 실행
 @app.post("/save_strategy")
 def save_strategy(req: StrategyRequest):
     try:
-        result_df = run_conditional_lateral_backtest(
-            symbol=req.symbol,
-            interval=req.interval,
-            strategy_sql=req.strategy_sql,
-            risk_reward_ratio=req.risk_reward_ratio,
-            start_time=req.start_time,
-            end_time=req.end_time,
-        )
+        with backtest_slot():
+            result_df = run_conditional_lateral_backtest(
+                symbol=req.symbol,
+                interval=req.interval,
+                strategy_sql=req.strategy_sql,
+                risk_reward_ratio=req.risk_reward_ratio,
+                start_time=req.start_time,
+                end_time=req.end_time,
+            )
         save_result_to_table(result_df)
+        _record_strategy([(req.symbol, req.interval)], req.strategy_sql)
         if result_df.empty:
             return {"message": "전략 실행, 결과 없음"}
         return {
@@ -113,6 +204,78 @@ def save_strategy(req: StrategyRequest):
             "rows": len(result_df),
             "total_profit_rate": result_df["cum_profit_rate"].iloc[-1],
         }
+    except BacktestRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        print(repr(e))
+        raise HTTPException(status_code=500, detail="Error while running strategy")
+
+
+class PairRequest(BaseModel):
+    symbol: str
+    interval: str
+
+
+# 💡 여러 코인/간격 포트폴리오 백테스트 요청 모델
+class PortfolioRequest(BaseModel):
+    pairs: list[PairRequest]
+    strategy_sql: str
+    risk_reward_ratio: float
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+
+
+# 포트폴리오 전략 저장 및 실행
+@app.post("/save_portfolio_strategy")
+def save_portfolio_strategy(req: PortfolioRequest):
+    try:
+        with backtest_slot():
+            result_df, pair_statics = run_portfolio_backtest(
+                pairs=[(p.symbol, p.interval) for p in req.pairs],
+                strategy_sql=req.strategy_sql,
+                risk_reward_ratio=req.risk_reward_ratio,
+                start_time=req.start_time,
+                end_time=req.end_time,
+            )
+        statics = {**compute_statics(result_df), "pairs": pair_statics}
+        save_result_to_table(result_df, statics)
+        _record_strategy([(p.symbol, p.interval) for p in req.pairs], req.strategy_sql)
+        if result_df.empty:
+            return {"message": "전략 실행, 결과 없음", "pairs": pair_statics}
+        return {
+            "message": "전략 실행 및 결과 저장 완료",
+            "rows": len(result_df),
+            "total_profit_rate": result_df["cum_profit_rate"].iloc[-1],
+            "statics": statics,
+        }
+    except BacktestRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception as e:
+        print(repr(e))
+        raise HTTPException(status_code=500, detail="Error while running strategy")
+
+
+# 💡 구간별(walk-forward / rolling) 평가 요청 모델
+class WalkForwardRequest(BaseModel):
+    symbol: str
+    interval: str
+    strategy_sql: str
+    risk_reward_ratio: float
+    start_time: Optional[str] = None
+    end_time: Optional[str] = None
+    n_windows: int = 10
+    mode: str = "rolling"
+    anchored: bool = False
+
+
+# 구간별 전략 안정성 평가 (결과는 저장하지 않음)
+@app.post("/walk-forward")
+def walk_forward(req: WalkForwardRequest):
+    try:
+        with backtest_slot():
+            return run_walk_forward(**req.model_dump())
+    except BacktestRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
         print(repr(e))
         raise HTTPException(status_code=500, detail="Error while running strategy")
@@ -122,38 +285,123 @@ def save_strategy(req: StrategyRequest):
 @app.get("/filtered-profit-rate")
 def get_filtered_profit_rate():
     try:
-        data = get_data_from_table(
-            table_name="filtered",
-            return_type=["entry_time", "profit_rate", "cum_profit_rate"],
-        )
-        return jsonable_encoder(data)
+        # 결과 저장 시 미리 계산된 곡선이 있으면 그대로 사용
+        data = load_profit_rate()
+        if data is None:
+            data = get_data_from_table(
+                table_name="filtered",
+                return_type=["entry_time", "profit_rate", "cum_profit_rate"],
+            )
+        return encode_json(data)
     except Exception as e:
         print(repr(e))
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
+# 백테스트 결과 전체 내보내기 (NDJSON 스트리밍, 미청산 거래 포함)
+@app.get("/export/filtered")
+def export_filtered():
+    return ndjson_response(
+        stream_data_from_table(
+            table_name="filtered", return_type=EXPORT_COLUMNS, dropna=False
+        )
+    )
+
+
 # 통계 데이터 조회
 @app.get("/filtered-tp-sl-rate")
 def get_filtered_tp_sl_rate():
     try:
-        statics = calculate_statics()
+        statics = load_statics()
         return statics
     except Exception as e:
         print(repr(e))
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
 
-# ⚡ 테이블에서 MIN/MAX timestamp 반환
+# 위험 지표 (Sharpe/Sortino/Calmar, 낙폭 기간, 연속 승패, 월별/연도별 수익률)
+@app.get("/risk-analytics")
+def get_risk_analytics(
+    run_id: Optional[int] = None,
+    points: int = Query(DRAWDOWN_POINTS, ge=10, le=5000),
+):
+    try:
+        result = risk_analytics(run_id, points)
+    except Exception as e:
+        print(repr(e))
+        raise HTTPException(status_code=500, detail="위험 지표 계산 실패")
+    if result is None:
+        raise HTTPException(status_code=404, detail="저장된 백테스트 결과가 없습니다.")
+    return result
+
+
+# 거래 순서 몬테카를로 (부트스트랩/순열): 최종 수익률, MDD, 파산 확률 분포와 백분위 밴드
+@app.get("/monte-carlo")
+def get_monte_carlo(
+    run_id: Optional[int] = None,
+    method: Literal["bootstrap", "permute"] = "bootstrap",
+    n_sims: int = Query(MC_DEFAULT_SIMS, ge=100, le=MC_MAX_SIMS),
+    seed: int = 0,
+    ruin_drawdown: float = Query(50.0, gt=0, le=100),
+    points: int = Query(MC_BAND_POINTS, ge=10, le=1000),
+):
+    try:
+        result = monte_carlo(run_id, method, n_sims, seed, ruin_drawdown, points)
+    except Exception as e:
+        print(repr(e))
+        raise HTTPException(status_code=500, detail="몬테카를로 시뮬레이션 실패")
+    if result is None:
+        raise HTTPException(status_code=404, detail="저장된 백테스트 결과가 없습니다.")
+    return result
+
+
+@app.get("/runs")
+def get_runs(limit: int = Query(50, ge=1, le=500)):
+    return list_runs(limit)
+
+
+@app.get("/compare-runs")
+def get_compare_runs(
+    run_ids: list[int] = Query(...),
+    points: int = Query(COMPARE_POINTS, ge=10, le=5000),
+):
+    # 여러 실행의 누적 수익률을 같은 시간 격자에 맞춰 한 번에 반환
+    if len(run_ids) > MAX_COMPARE_RUNS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"한 번에 최대 {MAX_COMPARE_RUNS}개까지 비교할 수 있습니다.",
+        )
+    try:
+        result = compare_runs(run_ids, points)
+    except Exception as e:
+        print(repr(e))
+        raise HTTPException(status_code=500, detail="실행 비교 실패")
+    if not result["runs"]:
+        raise HTTPException(status_code=404, detail="저장된 백테스트 결과가 없습니다.")
+    return result
+
+
+# ⚡ 테이블 시작/종료 시간 반환 (수집기가 관리하는 카탈로그 우선)
 @app.get("/time-range")
 def get_time_range(symbol: str, interval: str):
-    table_name = f"{symbol}_{interval}".lower()
-    query = f"""
-        SELECT MIN(timestamp) AS start_time, MAX(timestamp) AS end_time
-        FROM "{table_name}"
-    """
+    if symbol.upper() not in SYMBOLS or interval.lower() not in INTERVALS:
+        raise HTTPException(status_code=400, detail="Invalid symbol or interval")
+
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text(query)).mappings().fetchone()
+        entry = dataset_catalog.get(symbol, interval)
+        if entry is not None:
+            result = {
+                "start_time": entry["first_timestamp"],
+                "end_time": entry["last_timestamp"],
+            }
+        else:
+            table_name = f"{symbol}_{interval}".lower()
+            query = f"""
+                SELECT MIN(timestamp) AS start_time, MAX(timestamp) AS end_time
+                FROM "{table_name}"
+            """
+            with get_engine("reader").connect() as conn:
+                result = conn.execute(text(query)).mappings().fetchone()
         return {
             "start_time": (
                 result["start_time"].isoformat() if result["start_time"] else None
@@ -165,6 +413,46 @@ def get_time_range(symbol: str, interval: str):
         raise HTTPException(status_code=500, detail="DB 조회 실패")
 
 
+# 전체 코인/간격의 데이터셋 메타데이터 (시작/종료, 행 수, 누락 구간 수)
+@app.get("/catalog")
+def get_catalog():
+    try:
+        return [serialize_entry(e) for e in dataset_catalog.all().values()]
+    except Exception as e:
+        print(repr(e))
+        raise HTTPException(status_code=500, detail="카탈로그 조회 실패")
+
+
+# 데이터 버전 (프론트엔드 캐시 키): 수집 데이터는 카탈로그, 백테스트 결과는 run_id
+# 수집기는 새 행이 없어도 매 루프 updated_at 을 갱신하므로 (행 수, 마지막 캔들 시각) 만 사용
+@app.get("/data-version")
+def get_data_version(request: Request):
+    try:
+        pairs = {
+            f"{symbol}_{interval}": (
+                f"{e['row_count']}"
+                f":{e['last_timestamp'].isoformat() if e['last_timestamp'] else ''}"
+            )
+            for (symbol, interval), e in dataset_catalog.all().items()
+        }
+        body = {
+            "datasets": hashlib.sha1(
+                json.dumps(pairs, sort_keys=True).encode()
+            ).hexdigest()[:16],
+            "results": latest_run_id(),
+            "pairs": pairs,
+        }
+    except Exception as e:
+        print(repr(e))
+        raise HTTPException(status_code=500, detail="데이터 버전 조회 실패")
+
+    etag = f'"{body["datasets"]}-{body["results"]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(body, headers=headers)
+
+
 @app.get("/filtered-time-range")
 def get_filtered_entry_time_range():
     query = """
@@ -213,6 +501,18 @@ def get_indicator_data(
 ):
     table_name = f"{symbol}_{interval}".lower()
 
+    if is_derived(indicator):
+        # 파라미터 지표 (ema(close,50) 등) 는 계산 캐시에서 구간만 잘라서 반환
+        try:
+            return encode_json(
+                derived_indicator_rows(table_name, indicator, entry_time, exit_time)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            print(repr(e))
+            raise HTTPException(status_code=500, detail=f"지표({indicator}) 조회 실패")
+
     indicator_map = {
         "boll": ["boll_upper", "boll_lower", "boll_ma"],
         "rsi": ["rsi", "rsi_signal"],
@@ -231,12 +531,18 @@ def get_indicator_data(
     )
 
     try:
-        with engine.connect() as conn:
-            rows = (
-                conn.execute(query, {"start": entry_time, "end": exit_time})
-                .mappings()
-                .all()
-            )
+        hot = hot_cache.frame(
+            table_name, ["timestamp", *columns], entry_time, exit_time
+        )
+        if hot is not None:
+            rows = hot.to_dict(orient="records")
+        else:
+            with get_engine("reader").connect() as conn:
+                rows = (
+                    conn.execute(query, {"start": entry_time, "end": exit_time})
+                    .mappings()
+                    .all()
+                )
 
         results = []
         seen = set()
@@ -244,7 +550,10 @@ def get_indicator_data(
             timestamp = row["timestamp"]
             for col in columns:
                 val = row[col]
-                if isinstance(val, float) and (math.isinf(val) or math.isnan(val)):
+                # DB 의 NULL 과 공유 메모리 캐시의 NaN 은 같은 결측값 -> 둘 다 생략
+                if val is None or (
+                    isinstance(val, float) and (math.isinf(val) or math.isnan(val))
+                ):
                     continue
                 key = (timestamp, col)
                 if key in seen:
@@ -263,7 +572,7 @@ def get_indicator_data(
                     }
                 )
 
-        return jsonable_encoder(results)
+        return encode_json(results)
 
     except Exception as e:
         print(repr(e))
@@ -295,3 +604,36 @@ def get_indicators_in_range(entry_time: str, exit_time: str):
     except Exception as e:
         print(repr(e))
         raise HTTPException(status_code=500, detail="보조지표 범위 조회 실패")
+
+
+@app.get("/debug/signal-index")
+def get_signal_index_stats():
+    return signal_index.stats()
+
+
+# 엔드포인트/단계별 최근 요청 소요 시간 분포
+@app.get("/debug/perf")
+def get_perf_stats():
+    return perf_stats.snapshot()
+
+
+@app.get("/debug/hot-cache")
+def get_hot_cache_stats():
+    return hot_cache.stats()
+
+
+# 저장된 전략 조건 기반 인덱스 제안 + 적용된 인덱스 목록 (읽기 전용)
+# 인덱스 생성/삭제는 운영자가 CLI 로 실행: python -m index_advisor apply|prune
+@app.get("/index-advisor")
+def get_index_advisor():
+    try:
+        return encode_json(
+            {
+                "proposals": index_advisor.propose(),
+                "indexes": index_advisor.registry(),
+            }
+        )
+    except Exception as e:
+        print(repr(e))
+        raise HTTPException(status_code=500, detail="인덱스 제안 조회 실패")
+
@@ -0,0 +1,166 @@
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from filtered_func import latest_run_id
+from risk_analytics import load_run
+
+METHODS = ("bootstrap", "permute")
+MC_DEFAULT_SIMS = 10_000
+MC_MAX_SIMS = 100_000
+# 블록당 (시뮬레이션 수 x 거래 수) 행렬 메모리 한도
+MC_BLOCK_MB = float(os.getenv("MONTE_CARLO_BLOCK_MB", "64"))
+# 백분위 밴드는 앞쪽 시뮬레이션 일부로만 계산 (밴드용 행렬 크기 제한)
+MC_BAND_SIMS = int(os.getenv("MONTE_CARLO_BAND_SIMS", "10000"))
+MC_BAND_POINTS = 100
+PERCENTILES = (5, 25, 50, 75, 95)
+HISTOGRAM_BINS = 50
+# 블록 안에서 동시에 잡는 float64/int64 행렬 수 (인덱스, 자본 곡선, 고점)
+_MATRICES_PER_BLOCK = 3
+
+
+def _block_sims(n_trades: int, block_bytes: int) -> int:
+    return max(1, block_bytes // (_MATRICES_PER_BLOCK * 8 * n_trades))
+
+
+def _sample_block(rng, returns: np.ndarray, sims: int, method: str) -> np.ndarray:
+    n = returns.size
+    if method == "bootstrap":
+        # 복원 추출 -> 최종 수익률도 분포를 가진다
+        return returns[rng.integers(0, n, (sims, n))]
+    # 순서만 섞기 -> 최종 수익률은 같고 경로(낙폭)만 달라진다
+    return rng.permuted(np.tile(returns, (sims, 1)), axis=1)
+
+
+def _distribution(values: np.ndarray) -> dict:
+    # 순열의 최종 수익률처럼 값이 부동소수 오차만큼만 다르면 구간을 나눌 수 없으므로 반올림
+    counts, edges = np.histogram(values.round(6), bins=HISTOGRAM_BINS)
+    return {
+        "mean": float(values.mean()),
+        "percentiles": {
+            f"p{q}": float(v)
+            for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        },
+        "histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def _rank(values: np.ndarray, value: float) -> float:
+    # 시뮬레이션 중 historical 값보다 작은 비율 (%)
+    return float(np.mean(values < value) * 100)
+
+
+def simulate_trades(
+    profit_rate: np.ndarray,
+    method: str = "bootstrap",
+    n_sims: int = MC_DEFAULT_SIMS,
+    seed: int = 0,
+    ruin_drawdown: float = 50.0,
+    points: int = MC_BAND_POINTS,
+    block_bytes: int = int(MC_BLOCK_MB * 1024 * 1024),
+) -> dict:
+    # 거래 수익률 순서를 n_sims 번 다시 뽑아 (시뮬레이션 x 거래) cumprod 로 자본 곡선을 만든다
+    if method not in METHODS:
+        raise ValueError(f"unknown method: {method}")
+    returns = np.nan_to_num(np.asarray(profit_rate, dtype="float64")) / 100
+    n = returns.size
+    if n == 0:
+        return {"trades": 0}
+
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    # 밴드용 열: 거래 번호를 points 개 이하로 고르게
+    columns = np.unique(np.linspace(0, n - 1, min(points, n)).round().astype(int))
+    band_sims = min(n_sims, MC_BAND_SIMS)
+    band_values = np.empty((band_sims, columns.size))
+    final = np.empty(n_sims)
+    mdd = np.empty(n_sims)
+    ruined = np.empty(n_sims, dtype=bool)
+    ruin_level = 1 - ruin_drawdown / 100
+
+    block = _block_sims(n, block_bytes)
+    for start in range(0, n_sims, block):
+        stop = min(start + block, n_sims)
+        equity = _sample_block(rng, returns, stop - start, method)
+        equity += 1
+        np.cumprod(equity, axis=1, out=equity)
+
+        final[start:stop] = equity[:, -1]
+        ruined[start:stop] = equity.min(axis=1) <= ruin_level
+        if start < band_sims:
+            band_values[start : min(stop, band_sims)] = equity[
+                : band_sims - start, columns
+            ]
+        # 낙폭: 시작 자본(1.0)도 고점에 포함, 고점 배열을 제자리에서 비율로 바꿔 메모리 재사용
+        peak = np.maximum.accumulate(equity, axis=1)
+        np.maximum(peak, 1.0, out=peak)
+        np.divide(equity, peak, out=peak)
+        mdd[start:stop] = peak.min(axis=1)
+
+    final = (final - 1) * 100
+    mdd = (mdd - 1) * 100
+
+    historical_equity = np.cumprod(1 + returns)
+    historical_peak = np.maximum(np.maximum.accumulate(historical_equity), 1.0)
+    historical_final = float((historical_equity[-1] - 1) * 100)
+    historical_mdd = float((historical_equity / historical_peak).min() * 100 - 100)
+
+    bands = np.percentile((band_values - 1) * 100, PERCENTILES, axis=0)
+    return {
+        "method": method,
+        "n_sims": n_sims,
+        "trades": int(n),
+        "seed": seed,
+        "ruin_drawdown": ruin_drawdown,
+        "risk_of_ruin": float(ruined.mean() * 100),
+        "prob_loss": float(np.mean(final < 0) * 100),
+        "final_return": _distribution(final),
+        "max_drawdown": _distribution(mdd),
+        "historical": {
+            "final_return": historical_final,
+            "max_drawdown": historical_mdd,
+            "final_return_rank": _rank(final, historical_final),
+            "max_drawdown_rank": _rank(mdd, historical_mdd),
+        },
+        "bands": {
+            "trade": (columns + 1).tolist(),
+            **{f"p{q}": band.tolist() for q, band in zip(PERCENTILES, bands)},
+            "historical": ((historical_equity[columns] - 1) * 100).tolist(),
+        },
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+    }
+
+
+@lru_cache(maxsize=32)
+def _simulate_run(
+    run_id: int, method: str, n_sims: int, seed: int, ruin_drawdown: float, points: int
+) -> dict:
+    # 저장된 결과와 시드가 같으면 결과도 같으므로 인자 조합별로 한 번만 계산
+    run = load_run(run_id)
+    if run is None:
+        raise LookupError(run_id)
+    return {
+        "run_id": run_id,
+        **simulate_trades(
+            run["profit_rate"], method, n_sims, seed, ruin_drawdown, points
+        ),
+    }
+
+
+def monte_carlo(
+    run_id: int | None = None,
+    method: str = "bootstrap",
+    n_sims: int = MC_DEFAULT_SIMS,
+    seed: int = 0,
+    ruin_drawdown: float = 50.0,
+    points: int = MC_BAND_POINTS,
+) -> dict | None:
+    # run_id 가 없으면 가장 최근 결과
+    if run_id is None:
+        run_id = latest_run_id()
+    try:
+        return _simulate_run(run_id, method, n_sims, seed, ruin_drawdown, points)
+    except LookupError:
+        return None
@@ -0,0 +1,254 @@
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# 엔드포인트/단계별로 최근 N 개 요청의 소요 시간을 유지
+PERF_WINDOW = int(os.getenv("PERF_WINDOW", "500"))
+# ?profile=1 요청의 스택 샘플링 간격
+PROFILE_INTERVAL = float(os.getenv("PERF_PROFILE_INTERVAL_MS", "2")) / 1000
+# 인증 없이 모든 경로의 스택을 노출하므로 기본은 꺼둔다 (필요할 때만 켠다)
+PROFILE_ENABLED = os.getenv("PERF_PROFILE_ENABLED", "false").lower() in ("1", "true")
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# 하위 단계 (endpoint 안에서 겹치지 않게 측정)
+LEAF_STAGES = ("db", "pandas", "encode")
+
+
+class RequestTimings:
+    def __init__(self):
+        self.stages = defaultdict(float)
+        # 요청을 처리한 스레드 (프로파일러가 이 스레드만 샘플링)
+        self.threads = set()
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("perf_timings", default=None)
+
+
+@contextmanager
+def span(name: str, sample_thread: bool = True):
+    # 현재 요청의 name 단계에 소요 시간 누적 (요청 밖에서는 아무것도 하지 않음)
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    if sample_thread:
+        timings.threads.add(threading.get_ident())
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.stages[name] += time.perf_counter() - started
+
+
+def encode_json(data):
+    with span("encode"):
+        return jsonable_encoder(data)
+
+
+# ✅ 모든 SQL 실행 시간을 db 단계로 집계
+def _record_db(started: float):
+    timings = _current.get()
+    if timings is not None:
+        timings.stages["db"] += time.perf_counter() - started
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("perf_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_db(conn.info["perf_started"].pop())
+
+
+# 실패한 SQL 은 after_cursor_execute 가 없으므로 여기서 꺼낸다 (풀 연결에 쌓이지 않도록)
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    started = (
+        context.connection.info.get("perf_started") if context.connection else None
+    )
+    if started:
+        _record_db(started.pop())
+
+
+def _timed_endpoint(endpoint):
+    # 엔드포인트 함수 자체의 실행 시간 (검증/응답 직렬화 제외)
+    if inspect.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            with span("endpoint"):
+                return await endpoint(*args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with span("endpoint"):
+            return endpoint(*args, **kwargs)
+
+    return wrapper
+
+
+class PerfRoute(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            # 이벤트 루프 스레드는 다른 요청과 공유하므로 샘플링하지 않는다
+            with span("handler", sample_thread=False):
+                return await handler(request)
+
+        return timed_handler
+
+
+def breakdown(timings: RequestTimings, total: float) -> dict[str, float]:
+    # 초 단위 누적값 -> 겹치지 않는 단계별 ms
+    stages = timings.stages
+    leaf = {name: stages.get(name, 0.0) for name in LEAF_STAGES}
+    endpoint = stages.get("endpoint", 0.0)
+    handler = stages.get("handler", 0.0)
+    result = {name: value * 1000 for name, value in leaf.items() if value}
+    if endpoint:
+        result["app"] = max(endpoint - sum(leaf.values()), 0.0) * 1000
+    if handler:
+        # 요청 검증, 스레드풀 대기, FastAPI 응답 직렬화
+        result["response"] = max(handler - endpoint, 0.0) * 1000
+    result["total"] = total * 1000
+    return result
+
+
+def server_timing_header(stages: dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={ms:.2f}" for name, ms in stages.items())
+
+
+class PerfStats:
+    def __init__(self, window: int = PERF_WINDOW):
+        self.window = window
+        self.requests = Counter()
+        self.samples = defaultdict(lambda: defaultdict(lambda: deque(maxlen=window)))
+        self.lock = threading.Lock()
+
+    def record(self, endpoint: str, stages: dict[str, float]):
+        with self.lock:
+            self.requests[endpoint] += 1
+            for name, ms in stages.items():
+                self.samples[endpoint][name].append(ms)
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            samples = {
+                endpoint: {name: np.array(values) for name, values in stages.items()}
+                for endpoint, stages in self.samples.items()
+            }
+            requests = dict(self.requests)
+
+        bins = [0, *HISTOGRAM_BUCKETS_MS, np.inf]
+        labels = [f"le_{b}ms" for b in HISTOGRAM_BUCKETS_MS] + ["inf"]
+        result = {}
+        for endpoint, stages in sorted(samples.items()):
+            result[endpoint] = {"requests": requests[endpoint], "stages": {}}
+            for name, values in stages.items():
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                counts, _ = np.histogram(values, bins=bins)
+                result[endpoint]["stages"][name] = {
+                    "count": int(values.size),
+                    "mean_ms": float(values.mean()),
+                    "p50_ms": float(p50),
+                    "p95_ms": float(p95),
+                    "p99_ms": float(p99),
+                    "max_ms": float(values.max()),
+                    "histogram": dict(zip(labels, counts.tolist())),
+                }
+        return {"window": self.window, "endpoints": result}
+
+
+class StackSampler:
+    # 요청을 처리하는 스레드의 스택을 주기적으로 수집 (flamegraph 용 collapsed 형식)
+    def __init__(self, timings: RequestTimings, interval: float = PROFILE_INTERVAL):
+        self.timings = timings
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.timings.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[self._collapse(frame)] += 1
+                    self.samples += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            filename = os.path.basename(code.co_filename)
+            names.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def collapsed(self) -> str:
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+
+perf_stats = PerfStats()
+
+
+async def perf_middleware(request, call_next):
+    timings = RequestTimings()
+    token = _current.set(timings)
+    profiling = PROFILE_ENABLED and request.query_params.get("profile") == "1"
+    sampler = StackSampler(timings).start() if profiling else None
+    started = time.perf_counter()
+    try:
+        # 스트리밍 응답은 헤더를 보내기 전까지만 측정된다
+        response = await call_next(request)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+        _current.reset(token)
+    stages = breakdown(timings, time.perf_counter() - started)
+
+    # 등록되지 않은 경로는 하나로 묶어서 키가 무한히 늘지 않도록
+    route = request.scope.get("route")
+    endpoint = f"{request.method} {route.path}" if route else "unmatched"
+    perf_stats.record(endpoint, stages)
+
+    if sampler is not None:
+        response = PlainTextResponse(
+            sampler.collapsed(),
+            headers={"X-Profile-Samples": str(sampler.samples)},
+        )
+    response.headers["Server-Timing"] = server_timing_header(stages)
+    return response
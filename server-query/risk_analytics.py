@@ -0,0 +1,174 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from shared.connect_db import engine
+from filtered_func import latest_run_id
+
+SECONDS_PER_YEAR = 365.25 * 24 * 3600
+# 그래프용 낙폭 곡선의 최대 점 수
+DRAWDOWN_POINTS = int(os.getenv("RISK_DRAWDOWN_POINTS", "500"))
+
+
+def _runs(mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # 연속된 True 구간의 [시작, 끝) 위치
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _longest_run(mask: np.ndarray) -> int:
+    starts, ends = _runs(mask)
+    return int((ends - starts).max()) if starts.size else 0
+
+
+def _period_returns(keys: np.ndarray, growth: np.ndarray) -> list[dict]:
+    # 정렬된 기간 키별 복리 수익률 (reduceat 으로 구간 곱)
+    if keys.size == 0:
+        return []
+    starts = np.concatenate([[0], np.flatnonzero(keys[1:] != keys[:-1]) + 1])
+    returns = (np.multiply.reduceat(growth, starts) - 1) * 100
+    trades = np.diff(np.append(starts, keys.size))
+    return [
+        {"period": str(k), "return": float(r), "trades": int(n)}
+        for k, r, n in zip(keys[starts], returns, trades)
+    ]
+
+
+def _downsample_drawdown(times: np.ndarray, drawdown: np.ndarray, points: int):
+    # 구간별 최저점을 남겨 낙폭의 깊이가 줄어들지 않도록
+    if drawdown.size <= points:
+        starts = np.arange(drawdown.size)
+        values = drawdown
+    else:
+        starts = np.unique(
+            np.linspace(0, drawdown.size, points, endpoint=False).astype(int)
+        )
+        values = np.minimum.reduceat(drawdown, starts)
+    return {
+        "time": times[starts].astype("datetime64[s]").astype(str).tolist(),
+        "drawdown": values.tolist(),
+    }
+
+
+def compute_risk(
+    equity_time: np.ndarray,
+    profit_rate: np.ndarray,
+    cum_profit_rate: np.ndarray,
+    points: int = DRAWDOWN_POINTS,
+) -> dict:
+    # 거래 단위 누적 수익률 곡선에서 위험 지표를 한 번에 계산
+    times = np.asarray(equity_time, dtype="float64")
+    returns = np.nan_to_num(np.asarray(profit_rate, dtype="float64")) / 100
+    equity = 1 + np.asarray(cum_profit_rate, dtype="float64") / 100
+    n = returns.size
+    if n == 0:
+        return {"trades": 0}
+
+    # 낙폭: 시작 자본(1.0)도 고점에 포함
+    peak = np.maximum(np.maximum.accumulate(equity), 1.0)
+    drawdown = (equity / peak - 1) * 100
+    underwater = drawdown < 0
+    starts, ends = _runs(underwater)
+    if starts.size:
+        # 낙폭 기간: 직전 고점 거래 ~ 회복한 거래 (미회복이면 마지막 거래)
+        begin = times[np.maximum(starts - 1, 0)]
+        finish = times[np.minimum(ends, n - 1)]
+        longest = int(np.argmax(finish - begin))
+        longest_drawdown = {
+            "days": float((finish[longest] - begin[longest]) / 86400),
+            "trades": int(ends[longest] - starts[longest]),
+            "start": str(begin[longest].astype("datetime64[s]")),
+            "end": str(finish[longest].astype("datetime64[s]")),
+            "recovered": bool(ends[longest] < n),
+        }
+    else:
+        longest_drawdown = {
+            "days": 0.0,
+            "trades": 0,
+            "start": None,
+            "end": None,
+            "recovered": True,
+        }
+
+    # 연 환산: 거래 간격이 일정하지 않으므로 기간 내 거래 수로 환산
+    years = (times[-1] - times[0]) / SECONDS_PER_YEAR
+    trades_per_year = n / years if years > 0 else np.nan
+    std = returns.std(ddof=1) if n > 1 else np.nan
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    mean = returns.mean()
+    sharpe = mean / std * np.sqrt(trades_per_year) if std > 0 else np.nan
+    sortino = mean / downside * np.sqrt(trades_per_year) if downside > 0 else np.nan
+    cagr = equity[-1] ** (1 / years) - 1 if years > 0 and equity[-1] > 0 else np.nan
+    max_drawdown = drawdown.min()
+    calmar = cagr * 100 / -max_drawdown if max_drawdown < 0 else np.nan
+
+    month = times.astype("datetime64[s]").astype("datetime64[M]")
+    year = month.astype("datetime64[Y]")
+    growth = 1 + returns
+
+    def number(value):
+        # JSON 에는 NaN/inf 를 넣을 수 없다
+        return float(value) if np.isfinite(value) else None
+
+    return {
+        "trades": int(n),
+        "years": number(years),
+        "cagr": number(cagr * 100),
+        "sharpe": number(sharpe),
+        "sortino": number(sortino),
+        "calmar": number(calmar),
+        "volatility": number(std * np.sqrt(trades_per_year) * 100),
+        "max_drawdown": float(max_drawdown),
+        "longest_drawdown": longest_drawdown,
+        "max_win_streak": _longest_run(returns > 0),
+        "max_loss_streak": _longest_run(returns < 0),
+        "monthly": _period_returns(month, growth),
+        "yearly": _period_returns(year, growth),
+        "drawdown_series": _downsample_drawdown(
+            times.astype("datetime64[s]"), drawdown, points
+        ),
+    }
+
+
+def load_run(run_id: int) -> dict | None:
+    query = """
+        SELECT equity_time, profit_rate, cum_profit_rate
+        FROM filtered_stats
+        WHERE run_id = :run_id
+    """
+    try:
+        with engine.connect() as conn:
+            row = conn.execute(text(query), {"run_id": run_id}).mappings().fetchone()
+    except ProgrammingError:
+        # 아직 통계 테이블이 없는 경우 (결과 저장 이전)
+        return None
+    return dict(row) if row else None
+
+
+@lru_cache(maxsize=32)
+def _risk_for_run(run_id: int, points: int) -> dict:
+    # 저장된 결과는 바뀌지 않으므로 run_id 별로 한 번만 계산 (없는 run 은 예외라 캐시되지 않음)
+    run = load_run(run_id)
+    if run is None:
+        raise LookupError(run_id)
+    return {
+        "run_id": run_id,
+        **compute_risk(
+            run["equity_time"], run["profit_rate"], run["cum_profit_rate"], points
+        ),
+    }
+
+
+def risk_analytics(
+    run_id: int | None = None, points: int = DRAWDOWN_POINTS
+) -> dict | None:
+    # run_id 가 없으면 가장 최근 결과
+    if run_id is None:
+        run_id = latest_run_id()
+    try:
+        return _risk_for_run(run_id, points)
+    except LookupError:
+        return None
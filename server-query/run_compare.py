@@ -0,0 +1,134 @@
+import os
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from shared.connect_db import engine
+from risk_analytics import compute_risk
+
+# 한 번에 비교할 수 있는 최대 실행 수
+MAX_COMPARE_RUNS = int(os.getenv("MAX_COMPARE_RUNS", "10"))
+# 곡선당 기본 점 수 (실행 수와 관계없이 응답 크기를 제한)
+COMPARE_POINTS = int(os.getenv("COMPARE_POINTS", "400"))
+
+# 비교 표에 넣는 통계 (filtered_stats.stats)
+STATS_KEYS = ("total_count", "tp_rate", "final_profit_rate", "expectancy", "mdd")
+# 위험 지표 (risk_analytics)
+RISK_KEYS = ("cagr", "sharpe", "sortino", "calmar", "max_drawdown")
+
+
+def list_runs(limit: int = 50) -> list[dict]:
+    # 곡선 배열은 읽지 않고 목록에 필요한 값만
+    query = """
+        SELECT run_id, created_at, symbol, interval, strategy,
+               COALESCE(array_length(equity_time, 1), 0) AS trades,
+               (stats->>'final_profit_rate')::float AS final_profit_rate
+        FROM filtered_stats
+        ORDER BY run_id DESC
+        LIMIT :limit
+    """
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text(query), {"limit": limit}).mappings().all()
+    except ProgrammingError:
+        return []
+    return [
+        {**row, "created_at": row["created_at"].isoformat()} for row in map(dict, rows)
+    ]
+
+
+def _load_runs(run_ids: list[int]) -> list[dict]:
+    query = """
+        SELECT run_id, created_at, symbol, interval, strategy, stats,
+               equity_time, profit_rate, cum_profit_rate
+        FROM filtered_stats
+        WHERE run_id = ANY(:run_ids)
+    """
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text(query), {"run_ids": run_ids}).mappings().all()
+    except ProgrammingError:
+        return []
+    # 요청한 순서대로
+    by_id = {row["run_id"]: dict(row) for row in rows}
+    return [by_id[run_id] for run_id in run_ids if run_id in by_id]
+
+
+def align_curves(
+    curves: list[tuple[np.ndarray, np.ndarray]], points: int
+) -> tuple[np.ndarray, list[np.ndarray], list[np.ndarray]]:
+    # 모든 곡선의 기간을 덮는 균일한 시간 격자로 구간별 (마지막 값, 최저값) 으로 줄인다
+    # - 마지막 값: 격자 시점 이전의 마지막 거래 값 (첫 거래 이전은 NaN)
+    # - 최저값: 직전 격자 시점 ~ 이번 격자 시점 사이의 최저 (격자 사이의 낙폭이 사라지지 않도록)
+    starts = [times[0] for times, _ in curves if times.size]
+    ends = [times[-1] for times, _ in curves if times.size]
+    if not starts:
+        return np.empty(0), [np.empty(0) for _ in curves], [np.empty(0) for _ in curves]
+    grid = np.linspace(min(starts), max(ends), points)
+    aligned, lows = [], []
+    for times, values in curves:
+        idx = np.searchsorted(times, grid, side="right") - 1
+        out = np.full(grid.size, np.nan)
+        valid = idx >= 0
+        out[valid] = values[idx[valid]]
+        aligned.append(out)
+
+        # 거래 -> 속한 구간 (g[j-1], g[j]], 구간은 직전 격자 시점의 값에서 시작
+        low = np.full(grid.size, np.inf)
+        np.minimum.at(low, np.searchsorted(grid, times, side="left"), values)
+        low[1:] = np.fmin(low[1:], out[:-1])
+        low[np.isinf(low)] = np.nan
+        lows.append(low)
+    return grid, aligned, lows
+
+
+def compare_runs(run_ids: list[int], points: int = COMPARE_POINTS) -> dict:
+    runs = _load_runs(list(dict.fromkeys(run_ids))[:MAX_COMPARE_RUNS])
+    grid, aligned, lows = align_curves(
+        [
+            (
+                np.asarray(run["equity_time"] or [], dtype="float64"),
+                np.asarray(run["cum_profit_rate"] or [], dtype="float64"),
+            )
+            for run in runs
+        ],
+        points,
+    )
+
+    result = []
+    for run, curve, low in zip(runs, aligned, lows):
+        # 이미 읽은 배열로 계산 (실행마다 다시 조회하지 않는다)
+        risk = compute_risk(
+            run["equity_time"] or [],
+            run["profit_rate"] or [],
+            run["cum_profit_rate"] or [],
+        )
+        result.append(
+            {
+                "run_id": run["run_id"],
+                "label": f"#{run['run_id']} {run['strategy']} [{run['symbol']} {run['interval']}]",
+                "created_at": run["created_at"].isoformat(),
+                "symbol": run["symbol"],
+                "interval": run["interval"],
+                "strategy": run["strategy"],
+                # JSON 에 NaN 을 넣을 수 없으므로 None
+                "cum_profit_rate": [
+                    None if np.isnan(v) else float(v) for v in curve.tolist()
+                ],
+                "cum_profit_rate_low": [
+                    None if np.isnan(v) else float(v) for v in low.tolist()
+                ],
+                "stats": {
+                    **{key: run["stats"].get(key) for key in STATS_KEYS},
+                    **{key: risk.get(key) for key in RISK_KEYS},
+                },
+            }
+        )
+    return {
+        "time": pd.to_datetime(grid, unit="s", utc=True)
+        .strftime("%Y-%m-%dT%H:%M:%SZ")
+        .tolist(),
+        "runs": result,
+    }
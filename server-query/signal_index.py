@@ -0,0 +1,322 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+from shared.connect_db import engine, get_engine
+from catalog import CATALOG_CHANNEL, rewritten_tables
+from db_listener import listener
+from strategy_expr import CompiledStrategy, compile_strategy
+from backtest_kernel import to_epoch_ns
+
+# 조건이 이 횟수 이상 사용되면 비트맵으로 만든다
+MIN_HITS = int(os.getenv("SIGNAL_INDEX_MIN_HITS", "2"))
+# 테이블당 유지하는 비트맵 수 (초과 시 적게 쓰인 조건부터 제거)
+MAX_ATOMS = int(os.getenv("SIGNAL_INDEX_MAX_ATOMS", "64"))
+# 시작 시 참고하는 실행 이력 수
+HISTORY_LIMIT = int(os.getenv("SIGNAL_INDEX_HISTORY", "500"))
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+ARRAY_MAX = 4096  # 이보다 많으면 비트셋 컨테이너 사용
+
+
+def _to_container(low_bits: np.ndarray):
+    # low_bits: 정렬된 uint16 위치
+    if low_bits.size <= ARRAY_MAX:
+        return low_bits.astype(np.uint16)
+    dense = np.zeros(CHUNK_SIZE, dtype=bool)
+    dense[low_bits] = True
+    return np.packbits(dense, bitorder="little")
+
+
+def _is_bitset(container: np.ndarray) -> bool:
+    return container.dtype == np.uint8
+
+
+def _container_positions(container: np.ndarray) -> np.ndarray:
+    if _is_bitset(container):
+        return np.flatnonzero(np.unpackbits(container, bitorder="little"))
+    return container.astype(np.int64)
+
+
+class RoaringBitmap:
+    # 상위 16비트로 청크를 나누고, 희소 청크는 uint16 배열 / 밀집 청크는 비트셋으로 저장
+    def __init__(self, containers: dict | None = None):
+        self.containers = containers or {}
+
+    @classmethod
+    def from_positions(cls, positions: np.ndarray) -> "RoaringBitmap":
+        positions = np.asarray(positions, dtype=np.int64)
+        containers = {}
+        if positions.size:
+            keys = positions >> CHUNK_BITS
+            bounds = np.flatnonzero(np.diff(keys)) + 1
+            for chunk in np.split(positions, bounds):
+                containers[int(chunk[0] >> CHUNK_BITS)] = _to_container(
+                    chunk & (CHUNK_SIZE - 1)
+                )
+        return cls(containers)
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray, offset: int = 0) -> "RoaringBitmap":
+        return cls.from_positions(np.flatnonzero(mask) + offset)
+
+    def positions(self) -> np.ndarray:
+        parts = [
+            _container_positions(self.containers[key]) + (key << CHUNK_BITS)
+            for key in sorted(self.containers)
+        ]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def replace_tail(self, start: int, mask: np.ndarray):
+        # start 위치부터를 새 마스크로 교체 (수집기가 갱신한 마지막 캔들 + 신규 캔들)
+        first_key = start >> CHUNK_BITS
+        kept = np.empty(0, dtype=np.int64)
+        if first_key in self.containers:
+            head = _container_positions(self.containers[first_key])
+            kept = head[head < (start & (CHUNK_SIZE - 1))] + (first_key << CHUNK_BITS)
+        for key in [k for k in self.containers if k >= first_key]:
+            del self.containers[key]
+        tail = RoaringBitmap.from_positions(
+            np.concatenate([kept, np.flatnonzero(mask) + start])
+        )
+        self.containers.update(tail.containers)
+
+    def __and__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        containers = {}
+        for key in self.containers.keys() & other.containers.keys():
+            a, b = self.containers[key], other.containers[key]
+            if _is_bitset(a) and _is_bitset(b):
+                merged = np.bitwise_and(a, b)
+                low_bits = np.flatnonzero(np.unpackbits(merged, bitorder="little"))
+            elif _is_bitset(a) or _is_bitset(b):
+                bits, arr = (a, b) if _is_bitset(a) else (b, a)
+                arr = arr.astype(np.int64)
+                low_bits = arr[(bits[arr >> 3] >> (arr & 7)) & 1 == 1]
+            else:
+                low_bits = np.intersect1d(a, b, assume_unique=True)
+            if low_bits.size:
+                containers[key] = _to_container(low_bits)
+        return RoaringBitmap(containers)
+
+    def cardinality(self) -> int:
+        return int(
+            sum(
+                np.unpackbits(c).sum() if _is_bitset(c) else c.size
+                for c in self.containers.values()
+            )
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(c.nbytes for c in self.containers.values())
+
+
+def _entry_mask(df: pd.DataFrame) -> np.ndarray:
+    # 백테스트 진입 조건 (close > low * 1.005) - 건수 제한은 이 조건까지 적용한 뒤 센다
+    close = df["close"].to_numpy(dtype="float64")
+    return close > df["low"].to_numpy(dtype="float64") * 1.005
+
+
+def _to_epoch_ns(series: pd.Series) -> np.ndarray:
+    values = pd.to_datetime(series, utc=True).dt.tz_convert(None)
+    return values.to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+class TableSignalIndex:
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+        # 비트맵 생성/갱신(DB 읽기)은 테이블별로 (다른 테이블 백테스트를 막지 않도록)
+        self.lock = threading.Lock()
+        # 재계산 알림으로 버려진 인덱스 (진행 중이던 조회 결과는 쓰지 않는다)
+        self.dropped = False
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.bitmaps: OrderedDict[str, RoaringBitmap] = OrderedDict()
+        self.tradable = RoaringBitmap()
+
+    def _read(self, columns: set[str], since_ns: int | None = None) -> pd.DataFrame:
+        columns = set(columns) | {"close", "low"}
+        cols = ", ".join(f'"{c}"' for c in ["timestamp", *sorted(columns)])
+        where = "WHERE timestamp >= :since" if since_ns is not None else ""
+        query = text(
+            f'SELECT {cols} FROM "{self.table_name}" {where} ORDER BY timestamp'
+        )
+        params = {}
+        if since_ns is not None:
+            params["since"] = pd.Timestamp(
+                since_ns, unit="ns", tz="UTC"
+            ).to_pydatetime()
+        with get_engine("analytics").connect() as conn:
+            return pd.read_sql(query, conn, params=params)
+
+    def refresh(self):
+        # 마지막 캔들부터 다시 읽어 신규/갱신된 행만 반영
+        if self.timestamps.size == 0:
+            return
+        columns = set()
+        for atom in self.bitmaps:
+            columns |= compile_strategy(atom).columns
+        df = self._read(columns, since_ns=int(self.timestamps[-1]))
+        if df.empty:
+            return
+        start = self.timestamps.size - 1
+        self.timestamps = np.concatenate(
+            [self.timestamps[:start], _to_epoch_ns(df["timestamp"])]
+        )
+        self.tradable.replace_tail(start, _entry_mask(df))
+        for atom, bitmap in self.bitmaps.items():
+            bitmap.replace_tail(start, compile_strategy(atom).mask(df))
+
+    def materialize(self, atom: str):
+        df = self._read(set(compile_strategy(atom).columns))
+        timestamps = _to_epoch_ns(df["timestamp"])
+        if self.timestamps.size and timestamps.size != self.timestamps.size:
+            # 다른 비트맵과 위치가 어긋나면 전체 재구성
+            self.bitmaps.clear()
+        self.timestamps = timestamps
+        self.tradable = RoaringBitmap.from_mask(_entry_mask(df))
+        self.bitmaps[atom] = RoaringBitmap.from_mask(compile_strategy(atom).mask(df))
+
+    def nbytes(self) -> int:
+        return (
+            self.timestamps.nbytes
+            + self.tradable.nbytes
+            + sum(b.nbytes for b in self.bitmaps.values())
+        )
+
+
+class SignalIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tables: dict[str, TableSignalIndex] = {}
+        self.usage: Counter[tuple[str, str]] = Counter()
+        self.history_loaded = False
+        self.subscribed = False
+
+    def forget(self, payload: str | None):
+        # 과거 행이 다시 쓰인 테이블의 비트맵은 꼬리 갱신으로 맞출 수 없어 버린다 (사용 횟수는 유지)
+        tables = rewritten_tables(payload)
+        with self.lock:
+            for name in list(self.tables):
+                if tables is None or name in tables:
+                    self.tables.pop(name).dropped = True
+
+    @staticmethod
+    def atoms(compiled: CompiledStrategy) -> list[str]:
+        return [str(cond) for cond in compiled.conditions]
+
+    def _load_history(self):
+        # 저장된 실행 이력(filtered_stats)에서 자주 쓰인 조건을 학습
+        self.history_loaded = True
+        query = text(
+            "SELECT symbol, interval, strategy FROM filtered_stats "
+            "ORDER BY run_id DESC LIMIT :limit"
+        )
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(query, {"limit": HISTORY_LIMIT}).fetchall()
+        except ProgrammingError:
+            return
+        for symbol, interval, strategy in rows:
+            if not strategy or "," in (symbol or "") + (interval or ""):
+                continue
+            try:
+                compiled = compile_strategy(strategy)
+            except ValueError:
+                continue
+            if compiled.derived:
+                continue
+            table_name = f"{symbol}_{interval}".lower()
+            self.usage.update((table_name, atom) for atom in self.atoms(compiled))
+
+    def _evict(self, table: TableSignalIndex):
+        # 사용 횟수가 가장 적은 조건부터 제거 (동률이면 가장 오래전에 쓰인 것)
+        while len(table.bitmaps) > MAX_ATOMS:
+            coldest = min(
+                table.bitmaps, key=lambda atom: self.usage[(table.table_name, atom)]
+            )
+            del table.bitmaps[coldest]
+
+    def lookup(
+        self,
+        table_name: str,
+        compiled: CompiledStrategy,
+        start_ns: int | None = None,
+        end_ns: int | None = None,
+    ) -> np.ndarray | None:
+        # 모든 조건이 비트맵으로 준비되어 있으면 진입 시점(epoch ns) 배열을 반환
+        # (진입 조건 close > low * 1.005 와 기간까지 적용 -> SQL 의 진입 후보와 같은 건수)
+        if compiled.derived:
+            # 파라미터 지표는 테이블 컬럼이 아니라 비트맵을 만들 수 없다
+            return None
+        with self.lock:
+            if not self.subscribed:
+                self.subscribed = True
+                listener.subscribe(CATALOG_CHANNEL, self.forget)
+            if not self.history_loaded:
+                self._load_history()
+
+            atoms = self.atoms(compiled)
+            self.usage.update((table_name, atom) for atom in atoms)
+            if any(self.usage[(table_name, atom)] < MIN_HITS for atom in atoms):
+                return None
+
+            table = self.tables.setdefault(table_name, TableSignalIndex(table_name))
+
+        with table.lock:
+            table.refresh()
+            for atom in atoms:
+                if atom not in table.bitmaps:
+                    table.materialize(atom)
+                table.bitmaps.move_to_end(atom)
+            self._evict(table)
+            if table.dropped or any(atom not in table.bitmaps for atom in atoms):
+                return None
+
+            result = table.tradable
+            for atom in atoms:
+                result = result & table.bitmaps[atom]
+            times = table.timestamps[result.positions()]
+        if start_ns is not None:
+            times = times[times >= start_ns]
+        if end_ns is not None:
+            times = times[times <= end_ns]
+        return times
+
+    def stats(self) -> dict:
+        with self.lock:
+            tables = list(self.tables.items())
+        result = {}
+        for name, table in tables:
+            with table.lock:
+                result[name] = {
+                    "rows": int(table.timestamps.size),
+                    "bytes": table.nbytes(),
+                    "atoms": {
+                        atom: bitmap.cardinality()
+                        for atom, bitmap in table.bitmaps.items()
+                    },
+                }
+        return result
+
+
+signal_index = SignalIndex()
+
+
+def entry_times_from_index(
+    table_name: str,
+    compiled: CompiledStrategy,
+    start_time: str = None,
+    end_time: str = None,
+) -> list | None:
+    positions = signal_index.lookup(
+        table_name, compiled, to_epoch_ns(start_time), to_epoch_ns(end_time)
+    )
+    if positions is None:
+        return None
+    return pd.to_datetime(positions, unit="ns", utc=True).to_pydatetime().tolist()
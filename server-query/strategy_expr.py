@@ -0,0 +1,285 @@
+import re
+import operator
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Mapping
+
+import numpy as np
+
+# 전략 빌더(pages/backtest.py)에서 선택 가능한 컬럼
+FIELDS = (
+    "open",
+    "high",
+    "low",
+    "close",
+    "volume",
+    "rsi",
+    "rsi_signal",
+    "ema_7",
+    "ema_25",
+    "ema_99",
+    "macd",
+    "macd_signal",
+    "boll_ma",
+    "boll_upper",
+    "boll_lower",
+    "volume_ma_20",
+)
+
+# 파라미터 지표: 이름 -> 기본 입력 컬럼 (예: ema(close,50), rsi(14))
+# 테이블 컬럼이 아니므로 indicator_cache 에서 계산한다
+FUNCTIONS = {
+    "ema": "close",
+    "sma": "close",
+    "rsi": "close",
+}
+SOURCE_FIELDS = ("open", "high", "low", "close", "volume")
+MAX_PERIOD = 1000
+
+# 컬럼 → 압축된 지표 그룹 (what_indicators 표기용)
+INDICATOR_GROUPS = {
+    "rsi": "rsi",
+    "rsi_signal": "rsi",
+    "ema_7": "ema_7",
+    "ema_25": "ema_25",
+    "ema_99": "ema_99",
+    "macd": "macd",
+    "macd_signal": "macd",
+    "boll_ma": "boll",
+    "boll_upper": "boll",
+    "boll_lower": "boll",
+}
+
+# 연산자: (정규화 표기, SQL 표기, NumPy 연산)
+OPERATORS = {
+    ">": (">", ">", operator.gt),
+    ">=": (">=", ">=", operator.ge),
+    "<": ("<", "<", operator.lt),
+    "<=": ("<=", "<=", operator.le),
+    "==": ("==", "=", operator.eq),
+    "=": ("==", "=", operator.eq),
+    "!=": ("!=", "<>", operator.ne),
+    "<>": ("!=", "<>", operator.ne),
+}
+
+TOKEN_RE = re.compile(
+    r"\s*(?:"
+    r"(?P<num>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)(?![A-Za-z0-9_.])"
+    r"|(?P<name>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<op>>=|<=|==|!=|<>|=|>|<)"
+    r"|(?P<punct>[(),])"
+    r")"
+)
+DERIVED_RE = re.compile(r"^(?P<fn>[a-z]+)\((?P<source>[a-z]+),(?P<period>\d+)\)$")
+
+
+@dataclass(frozen=True)
+class Condition:
+    left: str
+    op: str
+    right: str | float  # 컬럼명 또는 상수
+
+    @property
+    def is_constant(self) -> bool:
+        return not isinstance(self.right, str)
+
+    @property
+    def is_derived(self) -> bool:
+        return is_derived(self.left) or (
+            isinstance(self.right, str) and is_derived(self.right)
+        )
+
+    def __str__(self) -> str:
+        right = (
+            self.right if isinstance(self.right, str) else _format_number(self.right)
+        )
+        return f"{self.left} {self.op} {right}"
+
+
+@dataclass(frozen=True)
+class CompiledStrategy:
+    expression: str  # 정규화된 표현식 (캐시 키)
+    conditions: tuple[Condition, ...]
+    sql: str  # 파라미터 바인딩용 WHERE 조건
+    bind_params: tuple[tuple[str, float], ...]
+    columns: frozenset[str]  # 참조하는 컬럼 집합
+
+    @property
+    def params(self) -> dict:
+        return dict(self.bind_params)
+
+    @property
+    def derived(self) -> frozenset[str]:
+        # 계산해서 붙여야 하는 파라미터 지표 (SQL 로는 평가할 수 없다)
+        return frozenset(c for c in self.columns if is_derived(c))
+
+    @property
+    def indicators(self) -> tuple[str, ...]:
+        return tuple(
+            sorted(
+                {INDICATOR_GROUPS[c] for c in self.columns if c in INDICATOR_GROUPS}
+                | self.derived
+            )
+        )
+
+    def mask(self, data: Mapping[str, np.ndarray]) -> np.ndarray:
+        # SQL 과 같게 NULL(NaN) 이 포함된 비교는 거짓으로 처리
+        result = None
+        for cond in self.conditions:
+            left = np.asarray(data[cond.left], dtype="float64")
+            right = (
+                np.asarray(data[cond.right], dtype="float64")
+                if isinstance(cond.right, str)
+                else cond.right
+            )
+            m = OPERATORS[cond.op][2](left, right) & ~np.isnan(left)
+            if isinstance(cond.right, str):
+                m &= ~np.isnan(right)
+            result = m if result is None else result & m
+        return result
+
+
+def is_derived(name: str) -> bool:
+    return "(" in name
+
+
+def split_derived(name: str) -> tuple[str, str, int]:
+    # "ema(close,50)" -> ("ema", "close", 50)
+    m = DERIVED_RE.match(name)
+    if m is None:
+        raise ValueError(f"알 수 없는 지표: {name}")
+    return m["fn"], m["source"], int(m["period"])
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _tokenize(expression: str) -> list[tuple[str, str]]:
+    tokens = []
+    pos = 0
+    expression = expression.rstrip()
+    while pos < len(expression):
+        m = TOKEN_RE.match(expression, pos)
+        if m is None or m.end() == pos:
+            raise ValueError(f"전략 구문 오류: '{expression[pos:].strip()}'")
+        kind = m.lastgroup
+        tokens.append((kind, m.group(kind)))
+        pos = m.end()
+    return tokens
+
+
+def _parse_call(fn: str, tokens: list[tuple[str, str]], i: int) -> tuple[str, int]:
+    # fn ( [source ,] period ) -> 정규화된 이름 "fn(source,period)"
+    args = []
+    i += 1
+    while True:
+        if i + 1 >= len(tokens):
+            raise ValueError(f"전략 구문 오류: {fn}( 가 닫히지 않았습니다")
+        kind, word = tokens[i]
+        if kind not in ("name", "num"):
+            raise ValueError(f"전략 구문 오류: '{word}'")
+        args.append((kind, word))
+        kind, word = tokens[i + 1]
+        i += 2
+        if word == ")":
+            break
+        if word != ",":
+            raise ValueError(f"전략 구문 오류: '{word}'")
+
+    if len(args) == 1:
+        args.insert(0, ("name", FUNCTIONS[fn]))
+    if len(args) != 2 or args[0][0] != "name" or args[1][0] != "num":
+        raise ValueError(f"{fn} 인자 오류: {fn}(컬럼, 기간) 또는 {fn}(기간)")
+    source = args[0][1].lower()
+    if source not in SOURCE_FIELDS:
+        raise ValueError(f"{fn} 의 입력으로 사용할 수 없는 컬럼: {source}")
+    period = float(args[1][1])
+    if not period.is_integer() or not 1 <= period <= MAX_PERIOD:
+        raise ValueError(f"{fn} 기간은 1~{MAX_PERIOD} 사이의 정수여야 합니다")
+    return f"{fn}({source},{int(period)})", i
+
+
+def _parse_operand(tokens: list[tuple[str, str]], i: int) -> tuple[str | None, int]:
+    # 컬럼 또는 파라미터 지표 (알 수 없으면 None)
+    kind, word = tokens[i]
+    if kind != "name":
+        return None, i + 1
+    name = word.lower()
+    if i + 1 < len(tokens) and tokens[i + 1] == ("punct", "("):
+        if name not in FUNCTIONS:
+            raise ValueError(f"알 수 없는 지표: {word}")
+        return _parse_call(name, tokens, i + 1)
+    return (name if name in FIELDS else None), i + 1
+
+
+def parse_strategy(expression: str) -> tuple[Condition, ...]:
+    tokens = _tokenize(expression)
+    conditions = []
+    i = 0
+    while True:
+        if i + 3 > len(tokens):
+            raise ValueError("전략 구문 오류: 조건이 완성되지 않았습니다")
+        left, i = _parse_operand(tokens, i)
+        if left is None:
+            raise ValueError(f"알 수 없는 지표: {tokens[i - 1][1]}")
+        if i >= len(tokens):
+            raise ValueError("전략 구문 오류: 조건이 완성되지 않았습니다")
+        ok, op = tokens[i]
+        if ok != "op":
+            raise ValueError(f"알 수 없는 연산자: {op}")
+        if i + 1 >= len(tokens):
+            raise ValueError("전략 구문 오류: 조건이 완성되지 않았습니다")
+        rk, right = tokens[i + 1]
+        if rk == "num":
+            right_value, i = float(right), i + 2
+        else:
+            right_value, i = _parse_operand(tokens, i + 1)
+            if right_value is None:
+                raise ValueError(f"올바르지 않은 비교 대상: {right}")
+        conditions.append(Condition(left, OPERATORS[op][0], right_value))
+
+        if i == len(tokens):
+            break
+        kind, word = tokens[i]
+        if kind != "name" or word.lower() != "and":
+            raise ValueError(f"전략 구문 오류: '{word}'")
+        i += 1
+    return tuple(conditions)
+
+
+def normalize_strategy(expression: str) -> str:
+    return " and ".join(str(c) for c in parse_strategy(expression))
+
+
+@lru_cache(maxsize=512)
+def _compile(expression: str) -> CompiledStrategy:
+    conditions = parse_strategy(expression)
+
+    predicates = []
+    bind_params = []
+    columns = set()
+    for i, cond in enumerate(conditions):
+        sql_op = OPERATORS[cond.op][1]
+        columns.add(cond.left)
+        if isinstance(cond.right, str):
+            columns.add(cond.right)
+            predicates.append(f'"{cond.left}" {sql_op} "{cond.right}"')
+        else:
+            name = f"cond_{i}"
+            bind_params.append((name, cond.right))
+            predicates.append(f'"{cond.left}" {sql_op} :{name}')
+
+    return CompiledStrategy(
+        expression=" and ".join(str(c) for c in conditions),
+        conditions=conditions,
+        sql=" AND ".join(predicates),
+        bind_params=tuple(bind_params),
+        columns=frozenset(columns),
+    )
+
+
+@lru_cache(maxsize=512)
+def compile_strategy(expression: str) -> CompiledStrategy:
+    # 같은 전략은 표기(공백/대소문자)가 달라도 한 번만 컴파일
+    return _compile(normalize_strategy(expression))
@@ -0,0 +1,192 @@
+import numpy as np
+
+from shared.symbols_intervals import SYMBOLS, INTERVALS
+from strategy_expr import compile_strategy
+from backtest_guard import admit_backtest
+from backtest_kernel import (
+    SL,
+    TP,
+    RangeExtrema,
+    find_entries,
+    load_series,
+    resolve_ambiguous_exits,
+    simulate_trades,
+    to_epoch_ns,
+)
+
+MODES = ("rolling", "walk_forward")
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0.0], np.cumsum(values, dtype="float64")])
+
+
+def _window_bounds(
+    start_ns: int, end_ns: int, n_windows: int, mode: str, anchored: bool
+) -> list[tuple[int, int, int | None, int | None]]:
+    # (평가 시작, 평가 끝, 학습 시작, 학습 끝) - 시간 기준 등분
+    if mode == "rolling":
+        edges = np.linspace(start_ns, end_ns, n_windows + 1).astype("int64")
+        return [
+            (int(edges[i]), int(edges[i + 1]), None, None) for i in range(n_windows)
+        ]
+
+    # walk_forward: N+1 구간 중 k 번째(또는 0..k)를 학습, k+1 번째를 평가
+    edges = np.linspace(start_ns, end_ns, n_windows + 2).astype("int64")
+    return [
+        (
+            int(edges[i + 1]),
+            int(edges[i + 2]),
+            int(edges[0] if anchored else edges[i]),
+            int(edges[i + 1]),
+        )
+        for i in range(n_windows)
+    ]
+
+
+def _iso(epoch_ns: int) -> str:
+    return (
+        np.datetime64(int(epoch_ns), "ns").astype("datetime64[s]").astype(str)
+        + "+00:00"
+    )
+
+
+class TradeSummary:
+    # 전체 거래에 대한 누적합을 한 번 만들어 두고 구간 통계를 O(1) 로 계산
+    def __init__(self, entry_time: np.ndarray, result: np.ndarray, rate: np.ndarray):
+        self.entry_time = entry_time
+        self.rate = rate
+        closed = (result == TP) | (result == SL)
+        self.tp = _prefix(result == TP)
+        self.closed = _prefix(closed)
+        self.sum = _prefix(np.where(closed, rate, 0.0))
+        self.sum_sq = _prefix(np.where(closed, rate**2, 0.0))
+        self.log_growth = _prefix(np.log1p(rate / 100))
+
+    def window(self, start_ns: int, end_ns: int) -> dict:
+        a, b = np.searchsorted(self.entry_time, [start_ns, end_ns], side="left")
+        closed = int(self.closed[b] - self.closed[a])
+        tp = int(self.tp[b] - self.tp[a])
+        mean = (self.sum[b] - self.sum[a]) / closed if closed else 0.0
+        var = (
+            ((self.sum_sq[b] - self.sum_sq[a]) - closed * mean**2) / (closed - 1)
+            if closed > 1
+            else 0.0
+        )
+
+        # 구간 내 누적 수익률 곡선의 MDD
+        equity = np.exp(self.log_growth[a + 1 : b + 1] - self.log_growth[a])
+        if equity.size:
+            peak = np.maximum.accumulate(np.concatenate([[1.0], equity]))[1:]
+            mdd = float(((equity - peak) / peak).min() * 100)
+        else:
+            mdd = 0.0
+
+        return {
+            "trades": int(b - a),
+            "total_count": closed,
+            "tp_count": tp,
+            "tp_rate": tp * 100 / closed if closed else 0.0,
+            "profit_rate_mean": float(mean),
+            "profit_rate_std": float(np.sqrt(max(var, 0.0))),
+            "final_profit_rate": float(
+                (np.exp(self.log_growth[b] - self.log_growth[a]) - 1) * 100
+            ),
+            "mdd": mdd,
+        }
+
+
+def _stability(values: list[float]) -> dict:
+    values = np.asarray(values, dtype="float64")
+    if values.size == 0:
+        return {"mean": 0.0, "std": 0.0, "min": 0.0, "max": 0.0, "positive_ratio": 0.0}
+    return {
+        "mean": float(values.mean()),
+        "std": float(values.std(ddof=1)) if values.size > 1 else 0.0,
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "positive_ratio": float((values > 0).mean()),
+    }
+
+
+def run_walk_forward(
+    symbol: str,
+    interval: str,
+    strategy_sql: str,
+    risk_reward_ratio: float,
+    start_time: str = None,
+    end_time: str = None,
+    n_windows: int = 10,
+    mode: str = "rolling",
+    anchored: bool = False,
+    resolve_intrabar: bool = True,
+) -> dict:
+    if symbol.upper() not in SYMBOLS or interval.lower() not in INTERVALS:
+        raise ValueError(f"Invalid symbol or interval: {symbol}_{interval}")
+    if mode not in MODES:
+        raise ValueError(f"Invalid mode: {mode}")
+    if not 1 <= n_windows <= 500:
+        raise ValueError("n_windows must be between 1 and 500")
+    table_name = f"{symbol}_{interval}".lower()
+    compiled = compile_strategy(strategy_sql)
+
+    # 시계열은 한 번만 읽고, 진입 마스크와 청산 위치도 한 번만 계산해 모든 구간에서 재사용
+    series = load_series(table_name, compiled.columns, start_time)
+    timestamps = series["timestamp"]
+    if timestamps.size == 0:
+        return {"windows": [], "stability": {}}
+
+    entry_idx = find_entries(series, compiled, start_time, end_time)
+    # /save_strategy 와 같은 진입 수 한도 (진입 시점을 이미 구했으므로 정확한 수)
+    admit_backtest(entry_idx.size, "kernel", table_name)
+    trades = simulate_trades(
+        series,
+        entry_idx,
+        risk_reward_ratio,
+        RangeExtrema(series["low"], series["high"]),
+    )
+    if resolve_intrabar:
+        resolve_ambiguous_exits(symbol, interval, series, trades)
+    summary = TradeSummary(
+        timestamps[entry_idx], trades["result"], trades["profit_rate"]
+    )
+
+    start_ns = to_epoch_ns(start_time) or int(timestamps[0])
+    end_ns = (to_epoch_ns(end_time) or int(timestamps[-1])) + 1
+    windows = []
+    for test_start, test_end, train_start, train_end in _window_bounds(
+        start_ns, end_ns, n_windows, mode, anchored
+    ):
+        window = {
+            "start_time": _iso(test_start),
+            "end_time": _iso(test_end),
+            "test": summary.window(test_start, test_end),
+        }
+        if train_start is not None:
+            window["train_start_time"] = _iso(train_start)
+            window["train"] = summary.window(train_start, train_end)
+        windows.append(window)
+
+    tests = [w["test"] for w in windows]
+    stability = {
+        key: _stability([t[key] for t in tests])
+        for key in ("final_profit_rate", "tp_rate", "mdd", "profit_rate_mean")
+    }
+    if mode == "walk_forward":
+        # 학습 대비 평가 구간 수익률 비율 (과적합 지표)
+        stability["test_train_return_ratio"] = _stability(
+            [
+                w["test"]["final_profit_rate"] / w["train"]["final_profit_rate"]
+                for w in windows
+                if w["train"]["final_profit_rate"]
+            ]
+        )
+
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "strategy": compiled.expression,
+        "mode": mode,
+        "windows": windows,
+        "stability": stability,
+    }
@@ -1,7 +1,10 @@
 import os
+import time
+import threading
 from dotenv import load_dotenv
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
 
 env_path = Path(__file__).resolve().parents[1] / ".env"
 load_dotenv(dotenv_path=env_path)
@@ -13,4 +16,101 @@ POSTGRES_USER = os.getenv("POSTGRES_USER")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 POSTGRES_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
 
-engine = create_engine(POSTGRES_URL)
\ No newline at end of file
+# 역할별 엔진
+# - writer: 수집기 쓰기, 백테스트 결과 저장, 방금 쓴 데이터를 바로 읽는 조회
+# - reader: 차트/OHLCV 조회 (복제본 사용 가능)
+# - analytics: 백테스트 등 무거운 분석 쿼리 (복제본 사용 가능, 별도 풀)
+ROLES = ("writer", "reader", "analytics")
+
+# PgBouncer(transaction pooling) 뒤에서는 앱 쪽 풀을 두지 않는다
+PGBOUNCER = os.getenv("POSTGRES_PGBOUNCER", "").lower() in ("1", "true", "yes")
+# 복제 지연이 이 값(초)을 넘으면 primary(writer) 로 대체
+MAX_REPLICA_LAG = float(os.getenv("POSTGRES_MAX_REPLICA_LAG", "5"))
+LAG_CHECK_INTERVAL = float(os.getenv("POSTGRES_LAG_CHECK_INTERVAL", "5"))
+
+
+def _setting(name: str, role: str, default: str) -> str:
+    # POSTGRES_{ROLE}_{NAME} > POSTGRES_{NAME} > 기본값 (서비스별로 .env / compose 에서 지정)
+    return os.getenv(f"POSTGRES_{role.upper()}_{name}", os.getenv(f"POSTGRES_{name}", default))
+
+
+def _role_url(role: str) -> str:
+    if role == "writer":
+        return POSTGRES_URL
+    return os.getenv(f"POSTGRES_{role.upper()}_URL") or os.getenv("POSTGRES_REPLICA_URL") or POSTGRES_URL
+
+
+def _create_engine(url: str, role: str):
+    # 복제본이 응답하지 않을 때 연결 시도에서 오래 멈추지 않도록 (writer 는 기본값 유지)
+    connect_args = {} if role == "writer" else {"connect_timeout": int(_setting("CONNECT_TIMEOUT", role, "3"))}
+    if PGBOUNCER:
+        return create_engine(url, poolclass=NullPool, connect_args=connect_args)
+    return create_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=int(_setting("POOL_SIZE", role, "5")),
+        max_overflow=int(_setting("MAX_OVERFLOW", role, "10")),
+        pool_recycle=int(_setting("POOL_RECYCLE", role, "1800")),
+        pool_timeout=float(_setting("POOL_TIMEOUT", role, "30")),
+        pool_pre_ping=_setting("POOL_PRE_PING", role, "true").lower() in ("1", "true", "yes"),
+    )
+
+
+engine = _create_engine(POSTGRES_URL, "writer")
+
+_engines = {"writer": engine}
+_replica_state = {}  # role -> (마지막 확인 시각, 사용 가능 여부)
+_probing = set()  # 지금 지연을 확인 중인 role
+_lock = threading.Lock()
+
+REPLICA_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def replica_lag_seconds(role_engine) -> float:
+    with role_engine.connect() as conn:
+        return float(conn.execute(REPLICA_LAG_QUERY).scalar())
+
+
+def _replica_available(role: str, role_engine) -> bool:
+    # 네트워크 확인은 _lock 밖에서 한 스레드만, 나머지는 확인이 끝날 때까지 직전 결과 사용
+    with _lock:
+        checked_at, available = _replica_state.get(role, (0.0, False))
+        if time.monotonic() - checked_at < LAG_CHECK_INTERVAL or role in _probing:
+            return available
+        _probing.add(role)
+    try:
+        available = replica_lag_seconds(role_engine) <= MAX_REPLICA_LAG
+    except Exception as e:
+        print(f"[connect_db] {role} 복제본 확인 실패, primary 사용: {repr(e)}")
+        available = False
+    finally:
+        with _lock:
+            _replica_state[role] = (time.monotonic(), available)
+            _probing.discard(role)
+    return available
+
+
+def get_engine(role: str = "writer"):
+    if role not in ROLES:
+        raise ValueError(f"Unknown engine role: {role}")
+    with _lock:
+        if role not in _engines:
+            _engines[role] = _create_engine(_role_url(role), role)
+        role_engine = _engines[role]
+    if role == "writer" or _role_url(role) == POSTGRES_URL:
+        return role_engine
+    # 복제본이 지연되거나 연결되지 않으면 primary 로 대체
+    return role_engine if _replica_available(role, role_engine) else engine
+
+
+def dispose_engines(close: bool = True):
+    # fork 된 자식 프로세스에서는 close=False 로 부모의 커넥션을 건드리지 않고 풀만 비운다
+    with _lock:
+        for role_engine in _engines.values():
+            role_engine.dispose(close=close)
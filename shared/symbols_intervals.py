@@ -1,3 +1,8 @@
 SYMBOLS = ["BTC", "ETH", "XRP", "SOL"]
 
 INTERVALS = ["15m", "1h", "4h", "1d"]
+
+# 가장 세밀한 수집 간격 (상위 간격 캔들의 내부 경로 확인용)
+BASE_INTERVAL = "15m"
+
+INTERVAL_MINUTES = {"15m": 15, "1h": 60, "4h": 240, "1d": 1440}
@@ -0,0 +1,81 @@
+import threading
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import text
+
+from shared.connect_db import engine
+from catalog import dataset_catalog
+from hot_cache import hot_cache
+
+# server-query / benchmarks 의 conftest.py 가 가져다 쓰는 pytest fixture (테스트에서는 이름으로 요청)
+
+
+@pytest.fixture
+def appended_candle():
+    # 수집기처럼 테이블 끝에 캔들 하나를 추가하고 카탈로그(데이터 버전)도 갱신, 블록을 나가면 되돌린다
+    def bump_catalog(conn, table_name, rows):
+        symbol, interval = table_name.split("_")
+        conn.execute(
+            text(
+                "UPDATE dataset_catalog SET row_count = row_count + :rows, "
+                "updated_at = now() WHERE symbol = :symbol AND interval = :interval"
+            ),
+            {"rows": rows, "symbol": symbol.upper(), "interval": interval},
+        )
+
+    @contextmanager
+    def append(table_name: str):
+        with engine.connect() as conn:
+            last, prev = (
+                conn.execute(
+                    text(
+                        f'SELECT timestamp FROM "{table_name}" '
+                        "ORDER BY timestamp DESC LIMIT 2"
+                    )
+                )
+                .scalars()
+                .all()
+            )
+        new_time = last + (last - prev)
+        try:
+            with engine.begin() as conn:
+                conn.execute(
+                    text(
+                        f'INSERT INTO "{table_name}" '
+                        "(timestamp, open, high, low, close, volume) "
+                        "VALUES (:t, 1, 2, 0.5, 1.5, 10)"
+                    ),
+                    {"t": new_time},
+                )
+                bump_catalog(conn, table_name, 1)
+            dataset_catalog.invalidate()
+            yield new_time
+        finally:
+            with engine.begin() as conn:
+                conn.execute(
+                    text(f'DELETE FROM "{table_name}" WHERE timestamp = :t'),
+                    {"t": new_time},
+                )
+                bump_catalog(conn, table_name, -1)
+            dataset_catalog.invalidate()
+
+    return append
+
+
+@pytest.fixture
+def hot_tables(tmp_path, monkeypatch):
+    # 공유 메모리 캐시를 임시 디렉토리의 지정한 테이블로 한정 (테스트가 끝나면 원래대로)
+    def configure(*tables: str):
+        monkeypatch.setattr(hot_cache, "directory", str(tmp_path))
+        monkeypatch.setattr(hot_cache, "tables", list(tables))
+        monkeypatch.setattr(
+            hot_cache, "table_locks", {name: threading.Lock() for name in tables}
+        )
+        monkeypatch.setattr(hot_cache, "mapped", {})
+        monkeypatch.setattr(hot_cache, "rewritten", {})
+        monkeypatch.setattr(hot_cache, "skipped", {})
+        monkeypatch.setattr(hot_cache, "counters", dict.fromkeys(hot_cache.counters, 0))
+        return hot_cache
+
+    return configure